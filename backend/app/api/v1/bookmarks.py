@@ -1,78 +1,125 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+from datetime import datetime, timezone
+from typing import Annotated
 
-from app.core.deps import CurrentUserId, SupabaseClient
-from app.models.bookmark import BookmarkCreate, BookmarkResponse, BookmarkUpdate
-from app.services.embedding import get_embedding
-from app.services.llm_ai import generate_categories, summarize_content
-from app.services.scraper import scrape_url
+from fastapi import APIRouter, File, Header, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
 
+from app.core.config import settings
+from app.core.deps import CurrentUserId, SupabaseClient
+from app.models.bookmark import (
+    BookmarkBulkDelete,
+    BookmarkBulkDeleteResponse,
+    BookmarkCreate,
+    BookmarkImportResponse,
+    BookmarkPage,
+    BookmarkResponse,
+    BookmarkStatusResponse,
+    BookmarkUpdate,
+    ProcessingStatus,
+)
+from app.services.export import ExportFormat, encode_export, gzip_stream, iter_bookmarks
+from app.services.importer import get_import_job, import_bookmarks, parse_import
+from app.services.ingestion import (
+    IngestionJob,
+    embedding_text,
+    ingestion_input,
+    ingestion_queue,
+    run_stages,
+    save_categories,
+    save_embedding,
+)
+from app.services.pagination import apply_keyset, encode_cursor, select_columns
 
 router = APIRouter()
 
 
-def get_or_create_category(
+@router.get("", response_model=BookmarkPage, response_model_exclude_unset=True)
+async def list_bookmarks(
+    user_id: CurrentUserId,
     supabase: SupabaseClient,
-    user_id: str,
-    category_name: str,
-) -> str:
-    """Get existing category ID or create a new one. Returns category UUID."""
-    name = category_name.strip().lower()
-
-    # Try to find existing AI category for this user with this name
-    response = (
-        supabase.table("categories")
-        .select("id")
-        .eq("user_id", user_id)
-        .eq("name", name)
-        .eq("type", "ai")
-        .execute()
-    )
-    if response.data:
-        return response.data[0]["id"]
-
-    # Create new AI category if not exists
-    response = (
-        supabase.table("categories")
-        .insert({
-            "user_id": user_id,
-            "name": name,
-            "type": "ai",
-        }).execute()
-    )
-    return response.data[0]["id"]
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+    fields: str | None = None,
+):
+    """
+    List the current user's bookmarks, newest first.
 
+    Pages are keyset-paginated: pass the previous page's ``next_cursor`` as
+    ``cursor`` to continue. Rows use a lean projection; heavier columns can be
+    requested with ``fields`` (comma-separated, e.g. ``fields=content,summary``).
+    """
+    try:
+        columns = select_columns(
+            [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+        )
+        query = apply_keyset(
+            supabase.table("bookmarks").select(columns).eq("user_id", user_id),
+            cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("", response_model=list[BookmarkResponse])
-async def list_bookmarks(
+    # Fetch one extra row to learn whether another page exists
+    response = await query.limit(limit + 1).execute()
+    rows = response.data or []
+    items = rows[:limit]
+    next_cursor = encode_cursor(items[-1]) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/export")
+async def export_bookmarks(
     user_id: CurrentUserId,
     supabase: SupabaseClient,
-    limit: int = 50,
-    offset: int = 0,
+    export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+    include_embeddings: bool = False,
+    accept_encoding: Annotated[str | None, Header()] = None,
 ):
-    """List all bookmarks for the current user."""
-    response = (
-        supabase.table("bookmarks")
-        .select("*")
-        .eq("user_id", user_id)
-        .order("created_at", desc=True)
-        .range(offset, offset + limit - 1)
-        .execute()
+    """
+    Stream the user's whole library (bookmarks with their categories).
+
+    ``format=ndjson`` writes one bookmark per line, ``format=json`` a single
+    document. Rows are read in keyset batches and gzipped on the fly when the
+    client accepts it, so the response never sits in memory.
+    """
+    chunks = encode_export(
+        iter_bookmarks(supabase, user_id, include_embeddings=include_embeddings),
+        export_format,
     )
-    return response.data
+    extension = "ndjson" if export_format == ExportFormat.NDJSON else "json"
+    filename = f"bookmarks-{datetime.now(timezone.utc):%Y%m%d}.{extension}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if accept_encoding and "gzip" in accept_encoding:
+        chunks = gzip_stream(chunks)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+
+    media_type = (
+        "application/x-ndjson"
+        if export_format == ExportFormat.NDJSON
+        else "application/json"
+    )
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
 
 
 MAX_BOOKMARKS = 50
 
 
-@router.post("", response_model=BookmarkResponse)
+@router.post("", response_model=BookmarkResponse, status_code=202)
 async def create_bookmark(
     bookmark: BookmarkCreate,
     user_id: CurrentUserId,
     supabase: SupabaseClient,
 ):
-    """Create a new bookmark with automatic URL scraping and embedding."""
+    """
+    Create a new bookmark and queue it for background processing.
+
+    Scraping, summarization, embedding and categorization run in the ingestion
+    workers; poll GET /{bookmark_id}/status for per-stage progress.
+    """
     # Check bookmark limit
-    count_response = (
+    count_response = await (
         supabase.table("bookmarks")
         .select("id", count="exact")
         .eq("user_id", user_id)
@@ -81,82 +128,152 @@ async def create_bookmark(
     if count_response.count >= MAX_BOOKMARKS:
         raise HTTPException(
             status_code=403,
-            detail=f"Bookmark limit reached. Maximum {MAX_BOOKMARKS} bookmarks allowed.",
+            detail=(
+                f"Bookmark limit reached. Maximum {MAX_BOOKMARKS} bookmarks allowed."
+            ),
+        )
+
+    if ingestion_queue.full():
+        raise HTTPException(
+            status_code=503,
+            detail="Bookmark processing queue is full, please retry shortly",
         )
 
     data = bookmark.model_dump(mode="json")
+    user_input = ingestion_input(data)
     data["user_id"] = user_id
+    data["processing_status"] = ProcessingStatus.PENDING.value
+    data["ingestion_input"] = user_input
 
-    # Scrape URL to extract title, description, content, and favicon
-    try:
-        scraped = await scrape_url(str(bookmark.url))
-        # Only fill in fields that weren't provided by the user
-        if not data.get("title") and scraped.title:
-            data["title"] = scraped.title
-        if not data.get("description") and scraped.description:
-            data["description"] = scraped.description
-        if not data.get("content") and scraped.content:
-            data["content"] = scraped.content
-        if not data.get("favicon_url") and scraped.favicon_url:
-            data["favicon_url"] = scraped.favicon_url
-        print(f"URL scraped for {bookmark.url} - {scraped.title}")
-    except Exception as e:
-        print(f"URL scraping failed for {bookmark.url}: {e}")
-        # Continue without scraped data - bookmark will still be created
-
-    # Generate AI summary if content is available
-    if data.get("content"):
-        try:
-            summary = await summarize_content(data.get("content"))
-            if summary:
-                data["summary"] = summary
-                print(f"AI summary generated for {bookmark.url}")
-        except Exception as e:
-            print(f"AI summary generation failed for {bookmark.url}: {e}")
-    else:
-        print(f"AI summary generation failed {bookmark.url} - no content scraped")
-
-    response = supabase.table("bookmarks").insert(data).execute()
+    response = await supabase.table("bookmarks").insert(data).execute()
 
     if not response.data:
         raise HTTPException(status_code=400, detail="Failed to create bookmark")
 
     bookmark_data = response.data[0]
 
-    # Generate embedding and save to bookmark_embeddings table
-    text_for_embedding = f"{data.get('title') or ''} {data.get('description') or ''} {data.get('content') or ''}"
-    if text_for_embedding.strip():
-        try:
-            embedding = await get_embedding(text_for_embedding)
-            supabase.table("bookmark_embeddings").insert({
-                "bookmark_id": bookmark_data["id"],
-                "embedding": embedding,
-            }).execute()
-            print(f"Embedding saved: {data.get('title')}")
-        except Exception as e:
-            print(f"Embedding generation error: {e}")
-
-    # Generate AI categories and save to bookmark_categories table
-    if data.get("title") or data.get("description") or data.get("content"):
-        try:
-            categories = await generate_categories(
-                title=data.get("title") or "",
-                description=data.get("description") or "",
-                content=data.get("content") or "",
-            )
-            for category_name in categories:
-                category_id = get_or_create_category(supabase, user_id, category_name)
-                supabase.table("bookmark_categories").insert({
-                    "bookmark_id": bookmark_data["id"],
-                    "category_id": category_id,
-                }).execute()
-            print(f"AI categories generated for {bookmark.url}: {categories}")
-        except Exception as e:
-            print(f"AI category generation failed for {bookmark.url}: {e}")
-    print(f"Processing completed for id: {bookmark_data.get('id')}")
+    job = IngestionJob(
+        bookmark_id=bookmark_data["id"],
+        user_id=user_id,
+        url=data["url"],
+        data=user_input,
+    )
+    try:
+        ingestion_queue.enqueue(job)
+    except asyncio.QueueFull:
+        # Filled up while the row was being inserted. The row exists and is
+        # pending, so hand the job over once there is space (or, if the app
+        # stops first, on the next start's recovery) rather than failing
+        ingestion_queue.defer(job)
+    print(f"Bookmark queued for processing, id: {bookmark_data.get('id')}")
     return bookmark_data
 
 
+@router.post("/import", response_model=BookmarkImportResponse, status_code=202)
+async def import_bookmarks_file(
+    user_id: CurrentUserId,
+    supabase: SupabaseClient,
+    file: UploadFile = File(...),
+):
+    """
+    Import a browser bookmark export (Netscape HTML) or a JSON/NDJSON file.
+
+    New URLs are inserted in bulk and processed in the background; poll
+    GET /imports/{import_id} for progress.
+    """
+    content = await file.read(settings.import_max_bytes + 1)
+    if len(content) > settings.import_max_bytes:
+        raise HTTPException(status_code=413, detail="Import file too large")
+    try:
+        # Up to IMPORT_MAX_BYTES of HTML/JSON: parse off the event loop
+        parsed = await asyncio.to_thread(parse_import, content)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = await import_bookmarks(supabase, user_id, parsed, MAX_BOOKMARKS)
+    return job.snapshot()
+
+
+@router.get("/imports/{import_id}", response_model=BookmarkImportResponse)
+async def get_import_status(import_id: str, user_id: CurrentUserId):
+    """Progress of a bookmark import."""
+    job = get_import_job(import_id, user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return job.snapshot()
+
+
+@router.get("/{bookmark_id}/status", response_model=BookmarkStatusResponse)
+async def get_bookmark_status(
+    bookmark_id: str,
+    user_id: CurrentUserId,
+    supabase: SupabaseClient,
+):
+    """Get background processing status for a bookmark, per stage."""
+    response = await (
+        supabase.table("bookmarks")
+        .select("id, processing_status, processing_stages")
+        .eq("id", bookmark_id)
+        .eq("user_id", user_id)
+        .single()
+        .execute()
+    )
+    if not response.data:
+        raise HTTPException(status_code=404, detail="Bookmark not found")
+    return {
+        **response.data,
+        "processing_stages": response.data.get("processing_stages") or {},
+    }
+
+
+@router.post(
+    "/{bookmark_id}/refresh", response_model=BookmarkStatusResponse, status_code=202
+)
+async def refresh_bookmark(
+    bookmark_id: str,
+    user_id: CurrentUserId,
+    supabase: SupabaseClient,
+    from_archive: bool = False,
+):
+    """
+    Queue a bookmark for re-processing.
+
+    By default the page is re-fetched conditionally (ETag / Last-Modified of
+    the archived copy) and nothing is redone if it hasn't changed. With
+    ``from_archive`` the archived HTML is re-extracted and re-embedded
+    without any network access.
+    """
+    response = await (
+        supabase.table("bookmarks")
+        .select("id, url, title, description, favicon_url")
+        .eq("id", bookmark_id)
+        .eq("user_id", user_id)
+        .single()
+        .execute()
+    )
+    if not response.data:
+        raise HTTPException(status_code=404, detail="Bookmark not found")
+    if ingestion_queue.full():
+        raise HTTPException(
+            status_code=503,
+            detail="Bookmark processing queue is full, please retry shortly",
+        )
+
+    row = response.data
+    ingestion_queue.enqueue(
+        IngestionJob(
+            bookmark_id=bookmark_id,
+            user_id=user_id,
+            url=row["url"],
+            # Keep the current title/description; content is re-extracted
+            data={k: row.get(k) for k in ("title", "description", "favicon_url")},
+            refresh=not from_archive,
+            from_archive=from_archive,
+        )
+    )
+    return {"id": bookmark_id, "processing_status": ProcessingStatus.PENDING}
+
+
 @router.get("/{bookmark_id}", response_model=BookmarkResponse)
 async def get_bookmark(
     bookmark_id: str,
@@ -164,7 +281,7 @@ async def get_bookmark(
     supabase: SupabaseClient,
 ):
     """Get a specific bookmark."""
-    response = (
+    response = await (
         supabase.table("bookmarks")
         .select("*")
         .eq("id", bookmark_id)
@@ -187,7 +304,7 @@ async def update_bookmark(
     """Update a bookmark."""
     data = bookmark.model_dump(exclude_unset=True)
 
-    response = (
+    response = await (
         supabase.table("bookmarks")
         .update(data)
         .eq("id", bookmark_id)
@@ -199,52 +316,59 @@ async def update_bookmark(
 
     bookmark_data = response.data[0]
 
-    # Regenerate embedding if content fields changed
+    # Regenerate embedding and AI categories concurrently if content fields changed
     if any(k in data for k in ["title", "description", "content"]):
-        text_for_embedding = f"{bookmark_data.get('title', '')} {bookmark_data.get('description', '')} {bookmark_data.get('content', '')}"
+        calls = {}
+        text_for_embedding = embedding_text(bookmark_data)
         if text_for_embedding.strip():
-            try:
-                embedding = await get_embedding(text_for_embedding)
-                # Upsert embedding (update if exists, insert if not)
-                supabase.table("bookmark_embeddings").upsert({
-                    "bookmark_id": bookmark_id,
-                    "embedding": embedding,
-                }).execute()
-                print(f"Embedding updated for {bookmark_data.get('title')}")
-            except Exception as e:
-                print(f"Embedding update error: {e}")
-
-        # Regenerate AI categories if content fields changed
-        try:
-            # Delete existing categories
-            supabase.table("bookmark_categories").delete().eq("bookmark_id", bookmark_id).execute()
-            # Generate new categories
-            categories = await generate_categories(
-                title=bookmark_data.get("title") or "",
-                description=bookmark_data.get("description") or "",
-                content=bookmark_data.get("content") or "",
-            )
-            for category_name in categories:
-                category_id = get_or_create_category(supabase, user_id, category_name)
-                supabase.table("bookmark_categories").insert({
-                    "bookmark_id": bookmark_id,
-                    "category_id": category_id,
-                }).execute()
-            print(f"AI categories regenerated for bookmark {bookmark_id}: {categories}")
-        except Exception as e:
-            print(f"AI category regeneration failed for bookmark {bookmark_id}: {e}")
+            calls["embed"] = save_embedding(supabase, bookmark_id, text_for_embedding)
+        calls["categorize"] = save_categories(
+            supabase, user_id, bookmark_id, bookmark_data, replace=True
+        )
+        outcome = await run_stages(calls)
+        statuses = {name: status.value for name, (status, _) in outcome.items()}
+        print(f"AI fields regenerated for bookmark {bookmark_id}: {statuses}")
 
     return bookmark_data
 
 
+@router.post("/bulk-delete", response_model=BookmarkBulkDeleteResponse)
+async def bulk_delete_bookmarks(
+    request: BookmarkBulkDelete,
+    user_id: CurrentUserId,
+    supabase: SupabaseClient,
+):
+    """
+    Delete many bookmarks in one statement.
+
+    Selects by ids and/or filters (category, dead links, created before a
+    date). Embeddings and category links are removed by ON DELETE CASCADE.
+    """
+    response = await supabase.rpc(
+        "delete_bookmarks",
+        {
+            "p_user_id": user_id,
+            "p_ids": [str(bookmark_id) for bookmark_id in request.ids]
+            if request.ids
+            else None,
+            "p_category_id": str(request.category_id) if request.category_id else None,
+            "p_is_dead": request.is_dead,
+            "p_older_than": request.older_than.isoformat()
+            if request.older_than
+            else None,
+        },
+    ).execute()
+    return {"deleted": response.data or 0}
+
+
 @router.delete("/{bookmark_id}")
 async def delete_bookmark(
     bookmark_id: str,
     user_id: CurrentUserId,
     supabase: SupabaseClient,
 ):
-    """Delete a bookmark and its associated embedding."""
-    response = (
+    """Delete a bookmark; its embedding and category links cascade."""
+    response = await (
         supabase.table("bookmarks")
         .delete()
         .eq("id", bookmark_id)
@@ -254,24 +378,4 @@ async def delete_bookmark(
     if not response.data:
         raise HTTPException(status_code=404, detail="Bookmark not found")
 
-    # Delete associated embedding if it exists
-    embedding_response = (
-        supabase.table("bookmark_embeddings")
-        .select("bookmark_id")
-        .eq("bookmark_id", bookmark_id)
-        .execute()
-    )
-    if embedding_response.data:
-        supabase.table("bookmark_embeddings").delete().eq("bookmark_id", bookmark_id).execute()
-
-    # Delete associated categories if they exist
-    categories_response = (
-        supabase.table("bookmark_categories")
-        .select("bookmark_id")
-        .eq("bookmark_id", bookmark_id)
-        .execute()
-    )
-    if categories_response.data:
-        supabase.table("bookmark_categories").delete().eq("bookmark_id", bookmark_id).execute()
-
     return {"message": "Bookmark deleted"}
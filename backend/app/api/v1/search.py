@@ -19,7 +19,7 @@ async def search_bookmarks(
     Modes:
     - SEMANTIC: Vector similarity search on embeddings
     - KEYWORD: Category name matching (faster, no embedding)
-    - HYBRID: Combines both using Reciprocal Rank Fusion
+    - HYBRID: Combines both (RRF by default; see FusionConfig)
     """
     return await hybrid_search(
         query=request.query,
@@ -28,4 +28,5 @@ async def search_bookmarks(
         limit=request.limit,
         semantic_threshold=request.threshold,
         mode=request.mode,
+        fusion=request.fusion,
     )
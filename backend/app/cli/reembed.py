@@ -0,0 +1,261 @@
+"""Rebuild bookmark embeddings offline, e.g. after changing the embedding model.
+
+Streams bookmarks in keyset-paginated chunks (ordered by id), embeds each
+chunk with the batch embedding API and upserts it in a single write. After
+every chunk the last processed id is saved to a checkpoint file, so a crashed
+run picks up where it stopped. Bookmarks whose embedding failed every retry
+are listed in the checkpoint too and retried at the end of each run, so a
+later run (even of a finished checkpoint) picks them up again.
+
+Zero-downtime model switch:
+
+1. Set ``EMBEDDING_SHADOW_TABLE=bookmark_embeddings_next`` (plus
+   ``EMBEDDING_SHADOW_MODEL`` / ``EMBEDDING_SHADOW_DIMENSIONS``) on the API so
+   new and edited bookmarks are dual-written.
+2. Run ``recollect-reembed --table bookmark_embeddings_next --model ...``.
+3. Cut search over to the new table, then drop the shadow settings.
+
+Usage:
+    recollect-reembed [--table T] [--model M] [--dimensions N]
+                      [--chunk-size 500] [--user-id UUID]
+                      [--checkpoint PATH] [--restart]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from supabase import AsyncClient
+
+from app.core.config import settings
+from app.core.deps import close_supabase_client, get_supabase_client
+from app.services.embedding import estimate_tokens
+from app.services.ingestion import embedding_text, save_embeddings
+
+
+@dataclass
+class Checkpoint:
+    table: str
+    model: str
+    dimensions: int
+    user_id: str | None = None
+    last_id: str | None = None
+    rows: int = 0
+    written: int = 0
+    tokens: int = 0
+    # Ids behind last_id that still have no embedding
+    failed: list[str] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, path: Path) -> "Checkpoint | None":
+        if not path.exists():
+            return None
+        return cls(**json.loads(path.read_text()))
+
+    def save(self, path: Path) -> None:
+        # Write-then-rename so a crash never leaves a truncated checkpoint
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(asdict(self)))
+        os.replace(tmp, path)
+
+    def matches(self, other: "Checkpoint") -> bool:
+        return (self.table, self.model, self.dimensions, self.user_id) == (
+            other.table,
+            other.model,
+            other.dimensions,
+            other.user_id,
+        )
+
+
+async def fetch_chunk(
+    supabase: AsyncClient,
+    after_id: str | None,
+    limit: int,
+    user_id: str | None = None,
+) -> list[dict]:
+    """Next page of bookmarks ordered by id (keyset pagination, no OFFSET)."""
+    query = supabase.table("bookmarks").select("id, title, description, content")
+    if user_id:
+        query = query.eq("user_id", user_id)
+    if after_id:
+        query = query.gt("id", after_id)
+    response = await query.order("id").limit(limit).execute()
+    return response.data or []
+
+
+async def fetch_by_ids(supabase: AsyncClient, ids: list[str]) -> list[dict]:
+    """The given bookmarks (those deleted since are simply missing)."""
+    response = await (
+        supabase.table("bookmarks")
+        .select("id, title, description, content")
+        .in_("id", ids)
+        .execute()
+    )
+    return response.data or []
+
+
+async def embed_rows(
+    supabase: AsyncClient, checkpoint: Checkpoint, rows: list[dict]
+) -> tuple[int, list[str], int]:
+    """Embed and upsert one chunk: (inputs, ids that failed, tokens sent)."""
+    items = [(row["id"], text) for row in rows if (text := embedding_text(row)).strip()]
+    written = set(
+        await save_embeddings(
+            supabase,
+            items,
+            table=checkpoint.table,
+            model=checkpoint.model,
+            dimensions=checkpoint.dimensions,
+            # Every text is embedded once; caching would only evict live entries
+            use_cache=False,
+        )
+    )
+    failed = [bookmark_id for bookmark_id, _ in items if bookmark_id not in written]
+    return len(items), failed, sum(estimate_tokens(text) for _, text in items)
+
+
+async def retry_failed(
+    supabase: AsyncClient,
+    checkpoint: Checkpoint,
+    checkpoint_path: Path,
+    chunk_size: int = 500,
+) -> Checkpoint:
+    """Embed the bookmarks that failed earlier; keep the ones that fail again."""
+    retry, still_failed = checkpoint.failed, []
+    for start in range(0, len(retry), chunk_size):
+        rows = await fetch_by_ids(supabase, retry[start : start + chunk_size])
+        inputs, failed, tokens = await embed_rows(supabase, checkpoint, rows)
+        still_failed += failed
+        checkpoint.written += inputs - len(failed)
+        checkpoint.tokens += tokens
+    checkpoint.failed = still_failed
+    checkpoint.save(checkpoint_path)
+    print(f"Retried {len(retry)} failed rows, {len(still_failed)} still failing")
+    return checkpoint
+
+
+async def reembed(
+    supabase: AsyncClient,
+    checkpoint: Checkpoint,
+    checkpoint_path: Path,
+    chunk_size: int = 500,
+) -> Checkpoint:
+    """Embed every remaining bookmark after ``checkpoint.last_id``, then retry
+    the ones that failed."""
+    started = time.perf_counter()
+    run_rows = run_tokens = 0
+
+    while True:
+        rows = await fetch_chunk(
+            supabase, checkpoint.last_id, chunk_size, checkpoint.user_id
+        )
+        if not rows:
+            break
+
+        inputs, failed, tokens = await embed_rows(supabase, checkpoint, rows)
+
+        checkpoint.last_id = rows[-1]["id"]
+        checkpoint.rows += len(rows)
+        checkpoint.written += inputs - len(failed)
+        checkpoint.tokens += tokens
+        checkpoint.failed += failed
+        checkpoint.save(checkpoint_path)
+
+        run_rows += len(rows)
+        run_tokens += tokens
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        print(
+            f"{checkpoint.rows} rows ({checkpoint.written} written, "
+            f"{len(failed)} failed in chunk) - "
+            f"{run_rows / elapsed:.1f} rows/s, {run_tokens / elapsed:.0f} tokens/s"
+        )
+
+    if checkpoint.failed:
+        checkpoint = await retry_failed(
+            supabase, checkpoint, checkpoint_path, chunk_size
+        )
+    return checkpoint
+
+
+async def run(
+    checkpoint: Checkpoint, checkpoint_path: Path, chunk_size: int
+) -> Checkpoint:
+    supabase = await get_supabase_client()
+    try:
+        return await reembed(supabase, checkpoint, checkpoint_path, chunk_size)
+    finally:
+        await close_supabase_client()
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--table",
+        default="bookmark_embeddings",
+        help="Target table (e.g. bookmark_embeddings_next)",
+    )
+    parser.add_argument("--model", default=settings.embedding_model)
+    parser.add_argument("--dimensions", type=int, default=settings.embedding_dimensions)
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=500,
+        help="Bookmarks fetched and upserted per round trip",
+    )
+    parser.add_argument("--user-id", help="Only re-embed this user's bookmarks")
+    parser.add_argument(
+        "--checkpoint", type=Path, default=Path(".reembed_checkpoint.json")
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore any existing checkpoint and start from the beginning",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    checkpoint = Checkpoint(
+        table=args.table,
+        model=args.model,
+        dimensions=args.dimensions,
+        user_id=args.user_id,
+    )
+
+    saved = None if args.restart else Checkpoint.load(args.checkpoint)
+    if saved is not None:
+        if not saved.matches(checkpoint):
+            print(
+                f"Checkpoint {args.checkpoint} was written for a different run "
+                f"({saved.table}, {saved.model}, {saved.dimensions}); "
+                "use --restart to discard it",
+                file=sys.stderr,
+            )
+            return 1
+        checkpoint = saved
+        print(f"Resuming after {checkpoint.last_id} ({checkpoint.rows} rows done)")
+
+    started = time.perf_counter()
+    checkpoint = asyncio.run(run(checkpoint, args.checkpoint, args.chunk_size))
+    print(
+        f"Done: {checkpoint.rows} rows, {checkpoint.written} embeddings written "
+        f"to {checkpoint.table} in {time.perf_counter() - started:.1f}s"
+    )
+    if checkpoint.failed:
+        print(
+            f"{len(checkpoint.failed)} bookmarks still have no embedding; "
+            f"run again to retry them (ids in {args.checkpoint})",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
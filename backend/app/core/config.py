@@ -1,16 +1,132 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
+from app.services.fusion import FusionMethod
+
 
 class Settings(BaseSettings):
     # Supabase
     supabase_url: str = ""
     supabase_service_role_key: str = ""
 
+    # Auth: local JWT verification (HS256 secret and/or the project's JWKS)
+    supabase_jwt_secret: str = ""
+    jwt_audience: str = "authenticated"
+    jwks_cache_ttl: float = 600.0
+    # Unknown key ids refetch the JWKS at most this often (seconds)
+    jwks_min_refresh_interval: float = 30.0
+    auth_token_cache_size: int = 10000
+    # Ask the auth server when a token can't be verified locally
+    auth_remote_fallback: bool = True
+    # Bearer token for GET /metrics; the endpoint is disabled when empty
+    metrics_token: str = ""
+
     # OpenRouter (OpenAI-compatible)
     openrouter_api_key: str = ""
     openrouter_base_url: str = "https://openrouter.ai/api/v1"
     embedding_model: str = "openai/text-embedding-3-small"
     llm_model: str = "openai/gpt-4o-mini"
+    embedding_dimensions: int = 1536
+    # Index for the semantic first pass: full (VECTOR), halfvec or binary.
+    # Quantized modes fetch rerank_factor x the matches and re-rank them on
+    # the full vectors. Their HNSW index is built by hand before switching
+    # (see 20260216_quantized_embeddings.sql)
+    embedding_search_index: Literal["full", "halfvec", "binary"] = "full"
+    embedding_rerank_factor: int = 4
+
+    # Embedding cache: in-process LRU (bytes) backed by the embedding_cache table
+    embedding_cache_max_bytes: int = 64 * 1024 * 1024
+    embedding_cache_persistent: bool = True
+
+    # Batch embedding (bulk indexing)
+    embedding_batch_max_tokens: int = 50000
+    embedding_batch_max_inputs: int = 128
+    embedding_batch_concurrency: int = 4
+    embedding_max_retries: int = 3
+    embedding_retry_backoff: float = 0.5
+
+    # Dual-write embeddings to a shadow table during a model migration
+    # (see app.cli.reembed); unset model/dimensions fall back to the above
+    embedding_shadow_table: str | None = None
+    embedding_shadow_model: str | None = None
+    embedding_shadow_dimensions: int | None = None
+
+    # Hybrid search fusion defaults (each can be overridden per request)
+    search_fusion_method: FusionMethod = FusionMethod.RRF  # rrf | weighted_rrf | linear
+    search_rrf_k: int = 60
+    search_semantic_weight: float = 1.0
+    search_category_weight: float = 1.0
+    search_text_weight: float = 1.0
+    # Full-text source over bookmarks.search_vector (KEYWORD and HYBRID)
+    search_full_text: bool = True
+    # Candidates fetched per source before fusion (0 = twice the result limit),
+    # and the cap on what a request may ask for
+    search_semantic_candidates: int = 0
+    search_category_candidates: int = 0
+    search_text_candidates: int = 0
+    search_max_candidates: int = 200
+    # HNSW candidate list size for semantic search (raised to the match count
+    # if lower); higher = better recall on the per-user filtered scan, slower
+    search_ef_search: int = 100
+
+    # Background ingestion (scrape -> summarize -> embed -> categorize)
+    ingestion_workers: int = 4
+    ingestion_queue_size: int = 1000
+    # Startup recovery skips unfinished bookmarks another worker process
+    # claimed within this many seconds (covers workers starting together)
+    ingestion_claim_lease: float = 600.0
+    # Max concurrent LLM/embedding calls, and per-stage timeouts (seconds)
+    ai_concurrency: int = 8
+    summary_timeout: float = 30.0
+    embedding_timeout: float = 15.0
+    categories_timeout: float = 30.0
+
+    # Outbound HTTP pool used for scraping
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    http_per_host_limit: int = 6
+    http2_enabled: bool = True
+    scrape_timeout: float = 10.0
+    # Stop downloading a page after this many bytes
+    scrape_max_bytes: int = 2 * 1024 * 1024
+    # Worker processes for HTML extraction (0 = parse on the event loop)
+    parse_workers: int = 2
+
+    # Scraping politeness: per-domain rate limit, robots.txt, 429/503 backoff
+    scrape_per_domain_rate: float = 1.0  # requests/second per domain
+    scrape_per_domain_burst: int = 3
+    scrape_per_domain_concurrency: int = 2  # ingestion jobs in flight per domain
+    scrape_respect_robots: bool = True
+    robots_user_agent: str = "Recollect"
+    # Sent with every scrape; its product token should match robots_user_agent
+    # so sites can address the crawler in robots.txt
+    scrape_user_agent: str = "Recollect/0.1 (+https://github.com/cranberrii/recollect)"
+    robots_cache_ttl: float = 86400.0
+    scrape_max_retries: int = 3
+    scrape_backoff_base: float = 2.0  # seconds, doubled per consecutive 429/503
+    scrape_backoff_max: float = 60.0  # longer backoffs fail the scrape instead
+
+    # Dead-link checker
+    link_checker_enabled: bool = True
+    link_check_interval: float = 3600.0  # seconds between scheduler runs
+    link_check_max_age_hours: float = 168.0  # re-check links older than this
+    link_check_batch_size: int = 200
+    link_check_concurrency: int = 20
+    link_check_per_domain_concurrency: int = 2
+    link_check_per_domain_rate: float = 1.0  # requests/second per domain
+    link_check_per_domain_burst: int = 2
+    link_check_timeout: float = 10.0
+    # Unreachable checks in a row (DNS failure, refused connection) before a
+    # link is marked dead; one failure alone may be a hiccup on our side
+    link_check_dead_after_failures: int = 2
+
+    # Library export: rows read per keyset batch
+    export_batch_size: int = 500
+    # Bulk import: max upload size and rows per bulk insert
+    import_max_bytes: int = 10 * 1024 * 1024
+    import_batch_size: int = 500
 
     # CORS
     cors_origins: list[str] = ["http://localhost:3000"]
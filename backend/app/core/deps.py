@@ -1,21 +1,46 @@
-from functools import lru_cache
+import asyncio
+import hmac
 from typing import Annotated
 
+import jwt
 from fastapi import Depends, Header, HTTPException
-from supabase import Client, create_client
+from supabase import AsyncClient, acreate_client
 
 from app.core.config import settings
+from app.core.security import LocalVerificationUnavailable, verify_token
 
+_supabase_client: AsyncClient | None = None
+_supabase_lock = asyncio.Lock()
 
-@lru_cache
-def get_supabase_client() -> Client:
-    """Get Supabase client with service role key."""
-    return create_client(settings.supabase_url, settings.supabase_service_role_key)
+
+async def get_supabase_client() -> AsyncClient:
+    """
+    Get the shared async Supabase client with service role key.
+
+    Created once (normally at app startup) and reused for every request; its
+    PostgREST session is a single keep-alive httpx connection pool.
+    """
+    global _supabase_client
+    if _supabase_client is None:
+        async with _supabase_lock:
+            if _supabase_client is None:
+                _supabase_client = await acreate_client(
+                    settings.supabase_url, settings.supabase_service_role_key
+                )
+    return _supabase_client
+
+
+async def close_supabase_client() -> None:
+    """Close the shared client's connection pool. Called at app shutdown."""
+    global _supabase_client
+    if _supabase_client is not None:
+        await _supabase_client.postgrest.aclose()
+        _supabase_client = None
 
 
 async def get_current_user_id(
     authorization: Annotated[str | None, Header()] = None,
-    supabase: Client = Depends(get_supabase_client),
+    supabase: AsyncClient = Depends(get_supabase_client),
 ) -> str:
     """Extract and verify user ID from JWT token."""
     if not authorization:
@@ -26,8 +51,20 @@ async def get_current_user_id(
 
     token = authorization.replace("Bearer ", "")
 
+    # Verify locally (JWT secret / cached JWKS) to avoid an auth server round trip
     try:
-        user = supabase.auth.get_user(token)
+        return await verify_token(token)
+    except LocalVerificationUnavailable as e:
+        if not settings.auth_remote_fallback:
+            raise HTTPException(
+                status_code=401, detail=f"Token verification failed: {e}"
+            )
+    except jwt.InvalidTokenError as e:
+        raise HTTPException(status_code=401, detail=f"Token verification failed: {e}")
+
+    # Fall back to asking the auth server
+    try:
+        user = await supabase.auth.get_user(token)
         if not user or not user.user:
             raise HTTPException(status_code=401, detail="Invalid token")
         return user.user.id
@@ -35,6 +72,23 @@ async def get_current_user_id(
         raise HTTPException(status_code=401, detail=f"Token verification failed: {e}")
 
 
+async def require_metrics_token(
+    authorization: Annotated[str | None, Header()] = None,
+) -> None:
+    """Guard /metrics with the METRICS_TOKEN bearer token.
+
+    Metrics expose internal state (queue and pool sizes, the hosts being
+    scraped), so the endpoint is off unless a token is configured.
+    """
+    if not settings.metrics_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    expected = f"Bearer {settings.metrics_token}".encode("utf-8")
+    if not authorization or not hmac.compare_digest(
+        authorization.encode("utf-8"), expected
+    ):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+
 # Type alias for dependency injection
 CurrentUserId = Annotated[str, Depends(get_current_user_id)]
-SupabaseClient = Annotated[Client, Depends(get_supabase_client)]
+SupabaseClient = Annotated[AsyncClient, Depends(get_supabase_client)]
@@ -0,0 +1,154 @@
+"""Local verification of Supabase access tokens.
+
+Tokens are checked in-process instead of calling the auth server on every
+request: HS256 tokens against the project's JWT secret, asymmetric tokens
+(RS256/ES256) against the project's JWKS, which is fetched once and cached.
+Verified tokens are remembered (keyed by their SHA-256) until they expire.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+
+import httpx
+import jwt
+
+from app.core.config import settings
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+
+
+class LocalVerificationUnavailable(Exception):
+    """No secret or signing key available to verify the token locally."""
+
+
+class VerifiedTokenCache:
+    """LRU of token hash -> (user id, expiry), bounded by size and by ``exp``."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> str | None:
+        key = self.key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        user_id, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return user_id
+
+    def set(self, token: str, user_id: str, expires_at: float) -> None:
+        key = self.key(token)
+        self._entries[key] = (user_id, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class JWKSCache:
+    """Project signing keys from ``/auth/v1/.well-known/jwks.json``, refreshed on TTL.
+
+    An unknown key id also triggers a refresh (key rotation). Fetches happen at
+    most once per ``min_refresh_interval`` seconds, so tokens with made-up
+    ``kid``s can't turn every request into a JWKS fetch.
+    """
+
+    def __init__(self, ttl: float, min_refresh_interval: float = 30.0):
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._fetched_at: float | None = None
+        self._attempted_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"{settings.supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json"
+
+    async def _fetch(self) -> dict:
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            response = await client.get(self.url)
+            response.raise_for_status()
+            return response.json()
+
+    async def _refresh(self) -> None:
+        self._attempted_at = time.monotonic()
+        jwks = jwt.PyJWKSet.from_dict(await self._fetch())
+        self._keys = {key.key_id: key for key in jwks.keys if key.key_id}
+        self._fetched_at = time.monotonic()
+
+    def _needs_refresh(self, kid: str | None) -> bool:
+        now = time.monotonic()
+        # Also covers failed fetches: keep serving the keys we have meanwhile
+        if (
+            self._attempted_at is not None
+            and now - self._attempted_at < self.min_refresh_interval
+        ):
+            return False
+        if self._fetched_at is None or now - self._fetched_at > self.ttl:
+            return True
+        return kid not in self._keys
+
+    async def get_key(self, kid: str | None) -> jwt.PyJWK:
+        if self._needs_refresh(kid):
+            async with self._lock:
+                if self._needs_refresh(kid):
+                    try:
+                        await self._refresh()
+                    except Exception as e:
+                        raise LocalVerificationUnavailable(f"JWKS fetch failed: {e}")
+        if kid not in self._keys:
+            raise LocalVerificationUnavailable(f"Unknown signing key: {kid}")
+        return self._keys[kid]
+
+
+token_cache = VerifiedTokenCache(max_size=settings.auth_token_cache_size)
+jwks_cache = JWKSCache(
+    ttl=settings.jwks_cache_ttl,
+    min_refresh_interval=settings.jwks_min_refresh_interval,
+)
+
+
+async def verify_token(token: str) -> str:
+    """
+    Verify a Supabase access token locally and return its user id (``sub``).
+
+    Raises jwt.InvalidTokenError for bad tokens, and
+    LocalVerificationUnavailable when there is no key to check it against.
+    """
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
+
+    header = jwt.get_unverified_header(token)
+    algorithm = header.get("alg")
+    if algorithm == "HS256":
+        if not settings.supabase_jwt_secret:
+            raise LocalVerificationUnavailable("SUPABASE_JWT_SECRET is not set")
+        key = settings.supabase_jwt_secret
+    elif algorithm in ASYMMETRIC_ALGORITHMS:
+        key = (await jwks_cache.get_key(header.get("kid"))).key
+    else:
+        raise jwt.InvalidAlgorithmError(f"Unsupported algorithm: {algorithm}")
+
+    claims = jwt.decode(
+        token,
+        key,
+        algorithms=[algorithm],
+        audience=settings.jwt_audience,
+        options={"require": ["exp", "sub"]},
+    )
+    token_cache.set(token, claims["sub"], float(claims["exp"]))
+    return claims["sub"]
@@ -1,13 +1,63 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1 import bookmarks, search
 from app.core.config import settings
+from app.core.deps import (
+    close_supabase_client,
+    get_supabase_client,
+    require_metrics_token,
+)
+from app.services.embedding import embedding_cache
+from app.services.http_client import (
+    PooledHttpClient,
+    get_http_client,
+    set_http_client,
+)
+from app.services.ingestion import ingestion_queue
+from app.services.link_checker import link_checker
+from app.services.parse_pool import parse_pool
+from app.services.politeness import politeness
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared async Supabase client (one pooled PostgREST session)
+    supabase = await get_supabase_client()
+    # Shared keep-alive connection pool for scraping
+    http_client = PooledHttpClient.from_settings()
+    set_http_client(http_client)
+    # Worker processes for HTML extraction, off the event loop
+    parse_pool.start()
+    # Per-domain rate limits, robots.txt and 429/503 backoff for scraping
+    politeness.start()
+    # Reclaim cache rows left over from a previous embedding model
+    await embedding_cache.purge_stale(
+        settings.embedding_model, settings.embedding_dimensions
+    )
+    # Start background ingestion workers, re-queueing bookmarks a previous
+    # run didn't finish
+    await ingestion_queue.start(settings.ingestion_workers, supabase)
+    # Periodic dead-link checks
+    if settings.link_checker_enabled:
+        link_checker.start(settings.link_check_interval)
+    yield
+    await link_checker.stop()
+    await ingestion_queue.stop()
+    await parse_pool.stop()
+    politeness.stop()
+    set_http_client(None)
+    await http_client.aclose()
+    await close_supabase_client()
+
 
 app = FastAPI(
     title="Bookmark Orchestrator API",
     description="AI-powered bookmark manager backend",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -25,6 +75,19 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", dependencies=[Depends(require_metrics_token)])
+async def metrics():
+    http_client = get_http_client()
+    return {
+        "http_pool": http_client.metrics.snapshot() if http_client else None,
+        "ingestion_queue_size": ingestion_queue.qsize(),
+        "embedding_cache": embedding_cache.stats.snapshot(),
+        "link_checker": link_checker.metrics.snapshot(),
+        "parse_pool": parse_pool.metrics.snapshot(),
+        "scrape_politeness": politeness.metrics.snapshot(),
+    }
+
+
 # Include routers
 app.include_router(bookmarks.router, prefix="/api/v1/bookmarks", tags=["bookmarks"])
 app.include_router(search.router, prefix="/api/v1/search", tags=["search"])
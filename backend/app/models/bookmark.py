@@ -1,7 +1,10 @@
 from datetime import datetime
 from enum import Enum
+from uuid import UUID
 
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl, model_validator
+
+from app.services.fusion import FusionMethod
 
 
 class SearchMode(str, Enum):
@@ -10,6 +13,26 @@ class SearchMode(str, Enum):
     KEYWORD = "keyword"
 
 
+class ProcessingStatus(str, Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class StageStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+
+
+class ImportStatus(str, Enum):
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+
+
 class BookmarkBase(BaseModel):
     url: HttpUrl
     title: str | None = None
@@ -38,22 +61,114 @@ class BookmarkResponse(BookmarkBase):
     created_at: datetime
     updated_at: datetime
     similarity: float | None = None
+    processing_status: ProcessingStatus | None = None
 
     class Config:
         from_attributes = True
 
 
+class BookmarkListItem(BaseModel):
+    """List row: the lean projection plus any opted-in fields."""
+
+    id: str
+    user_id: str
+    url: str
+    title: str | None = None
+    description: str | None = None
+    favicon_url: str | None = None
+    is_favorite: bool = False
+    processing_status: ProcessingStatus | None = None
+    created_at: datetime
+    updated_at: datetime
+    # Opt-in via ?fields=
+    content: str | None = None
+    summary: str | None = None
+    key_points: list[str] | None = None
+    notes: str | None = None
+    is_archived: bool | None = None
+    is_dead: bool | None = None
+    last_checked_at: datetime | None = None
+    last_visited_at: datetime | None = None
+    processing_stages: dict[str, StageStatus] | None = None
+
+
+class BookmarkPage(BaseModel):
+    items: list[BookmarkListItem]
+    next_cursor: str | None = None
+
+
+class BookmarkStatusResponse(BaseModel):
+    id: str
+    processing_status: ProcessingStatus
+    processing_stages: dict[str, StageStatus] = {}
+
+
+class BookmarkBulkDelete(BaseModel):
+    """Bookmarks to delete: explicit ids and/or filters, combined with AND."""
+
+    # Typed so a malformed id is a 422 here, not an error from the RPC
+    ids: list[UUID] | None = None
+    category_id: UUID | None = None
+    is_dead: bool | None = None
+    older_than: datetime | None = None
+
+    @model_validator(mode="after")
+    def require_selector(self):
+        if not any(
+            [self.ids, self.category_id, self.is_dead is not None, self.older_than]
+        ):
+            raise ValueError("Provide ids or at least one filter")
+        return self
+
+
+class BookmarkBulkDeleteResponse(BaseModel):
+    deleted: int
+
+
+class BookmarkImportResponse(BaseModel):
+    id: str
+    status: ImportStatus
+    # Bookmarks found in the uploaded file (after in-file dedupe)
+    total: int
+    inserted: int
+    # Already saved, over the bookmark limit, or not an http(s) URL
+    duplicates: int = 0
+    over_limit: int = 0
+    invalid: int = 0
+    # Background processing of the inserted bookmarks
+    processed: int = 0
+    failed: int = 0
+    created_at: datetime
+
+
 class SearchRequest(BaseModel):
     query: str
     limit: int = 10
     threshold: float = 0.7
 
 
+class FusionConfig(BaseModel):
+    """How HYBRID mode merges its sources; unset fields use the SEARCH_* settings."""
+
+    method: FusionMethod | None = None
+    rrf_k: int | None = Field(default=None, ge=1)
+    # Source weights (WEIGHTED_RRF and LINEAR; plain RRF ignores them)
+    semantic_weight: float | None = Field(default=None, ge=0)
+    category_weight: float | None = Field(default=None, ge=0)
+    text_weight: float | None = Field(default=None, ge=0)
+    # Candidates fetched from each source before fusion
+    semantic_candidates: int | None = Field(default=None, ge=1)
+    category_candidates: int | None = Field(default=None, ge=1)
+    text_candidates: int | None = Field(default=None, ge=1)
+
+
 class HybridSearchRequest(BaseModel):
     query: str
-    limit: int = 20
+    # Also the ANN match count, which hnsw.ef_search (max 1000) must cover
+    limit: int = Field(default=20, ge=1, le=100)
     threshold: float = 0.5
     mode: SearchMode = SearchMode.HYBRID
+    fusion: FusionConfig | None = None
 
 
 class HybridSearchResponse(BaseModel):
@@ -66,8 +181,9 @@ class HybridSearchResponse(BaseModel):
     created_at: datetime | None = None
     semantic_score: float = 0.0
     category_score: float = 0.0
+    text_score: float = 0.0
     rrf_score: float = 0.0
     matched_categories: list[str] = []
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
@@ -0,0 +1,111 @@
+"""Raw page archive in ``archived_content``.
+
+Every successful scrape stores the gzipped HTML and the extracted text, plus
+the ETag / Last-Modified validators used for conditional re-fetches. Because
+the raw HTML is kept, a bookmark can be re-extracted and re-embedded from the
+archive without touching the network, unless the download stopped early
+(``truncated``), in which case the page is fetched again.
+"""
+
+import gzip
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from supabase import AsyncClient
+
+from app.services.scraper import FetchedPage
+
+METADATA_COLUMNS = (
+    "bookmark_id, etag, last_modified, content_type, archived_at, checked_at, truncated"
+)
+
+
+@dataclass
+class ArchivedPage:
+    bookmark_id: str
+    etag: str | None = None
+    last_modified: str | None = None
+    content_type: str | None = None
+    archived_at: str | None = None
+    checked_at: str | None = None
+    # Only the start of the page was stored
+    truncated: bool = False
+    # Only loaded with ``with_html=True``
+    html: str | None = None
+    text_content: str | None = None
+
+
+def compress_html(html: str) -> str:
+    """Gzip HTML into PostgREST's bytea hex format (``\\x...``)."""
+    return "\\x" + gzip.compress(html.encode("utf-8")).hex()
+
+
+def decompress_html(value: str | bytes) -> str:
+    """Inverse of compress_html; accepts the hex string PostgREST returns."""
+    if isinstance(value, str):
+        value = bytes.fromhex(value[2:] if value.startswith("\\x") else value)
+    return gzip.decompress(value).decode("utf-8")
+
+
+async def load_archive(
+    supabase: AsyncClient,
+    bookmark_id: str,
+    with_html: bool = False,
+) -> ArchivedPage | None:
+    """The bookmark's archive row; the (large) HTML only when asked for."""
+    columns = METADATA_COLUMNS
+    if with_html:
+        columns += ", html_compressed, text_content"
+    response = await (
+        supabase.table("archived_content")
+        .select(columns)
+        .eq("bookmark_id", bookmark_id)
+        .limit(1)
+        .execute()
+    )
+    if not response.data:
+        return None
+    row = dict(response.data[0])
+    compressed = row.pop("html_compressed", None)
+    page = ArchivedPage(**row)
+    if compressed:
+        page.html = decompress_html(compressed)
+    return page
+
+
+async def save_archive(
+    supabase: AsyncClient,
+    bookmark_id: str,
+    page: FetchedPage,
+    text_content: str | None,
+) -> None:
+    """Store (or replace) the archived copy of a freshly fetched page."""
+    now = datetime.now(timezone.utc).isoformat()
+    await (
+        supabase.table("archived_content")
+        .upsert(
+            {
+                "bookmark_id": bookmark_id,
+                "html_compressed": compress_html(page.text or ""),
+                "text_content": text_content,
+                "content_type": page.content_type,
+                "truncated": page.truncated,
+                "etag": page.etag,
+                "last_modified": page.last_modified,
+                "archived_at": now,
+                "checked_at": now,
+            },
+            on_conflict="bookmark_id",
+        )
+        .execute()
+    )
+
+
+async def mark_checked(supabase: AsyncClient, bookmark_id: str) -> None:
+    """Record a 304: the archived copy is still current."""
+    await (
+        supabase.table("archived_content")
+        .update({"checked_at": datetime.now(timezone.utc).isoformat()})
+        .eq("bookmark_id", bookmark_id)
+        .execute()
+    )
@@ -1,6 +1,10 @@
-from openai import AsyncOpenAI
+import asyncio
+
+from openai import AsyncOpenAI, BadRequestError, UnprocessableEntityError
 
 from app.core.config import settings
+from app.core.deps import get_supabase_client
+from app.services.embedding_cache import EmbeddingCache, cache_key, normalize_text
 
 # OpenRouter client (OpenAI-compatible)
 client = AsyncOpenAI(
@@ -8,16 +12,176 @@ client = AsyncOpenAI(
     base_url=settings.openrouter_base_url,
 )
 
+embedding_cache = EmbeddingCache(
+    max_bytes=settings.embedding_cache_max_bytes,
+    supabase_factory=get_supabase_client
+    if settings.embedding_cache_persistent
+    else None,
+)
+
 
-async def get_embedding(text: str) -> list[float]:
-    """Generate embedding for text using OpenRouter."""
+async def get_embedding(
+    text: str,
+    model: str | None = None,
+    dimensions: int | None = None,
+) -> list[float]:
+    """Generate embedding for text using OpenRouter, via the embedding cache."""
     # Truncate text if too long (max ~8000 tokens for most models)
-    text = text[:32000]  # qwen3-8b 32K tokens
+    text = normalize_text(text[:32000])  # qwen3-8b 32K tokens
+
+    model = model or settings.embedding_model
+    dimensions = dimensions or settings.embedding_dimensions  # orig qwen3-8b: 4096
+    key = cache_key(model, dimensions, text)
+    cached = await embedding_cache.get(key)
+    if cached is not None:
+        return cached
 
     response = await client.embeddings.create(
-        model=settings.embedding_model,
+        model=model,
         input=text,
-        dimensions=1536  # orig qwen3-8b: 4096
+        dimensions=dimensions,
+    )
+
+    embedding = response.data[0].embedding
+    await embedding_cache.set(key, model, dimensions, embedding)
+    return embedding
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 chars per token) used for batch packing."""
+    return max(1, len(text) // 4)
+
+
+def _pack_batches(
+    texts: list[str], max_tokens: int, max_inputs: int
+) -> list[list[int]]:
+    """Group text indices into batches under a token and input-count budget."""
+    batches: list[list[int]] = []
+    current: list[int] = []
+    current_tokens = 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (
+            current_tokens + tokens > max_tokens or len(current) >= max_inputs
+        ):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def _embed_batch(
+    texts: list[str], model: str, dimensions: int
+) -> list[list[float]]:
+    response = await client.embeddings.create(
+        model=model,
+        input=texts,
+        dimensions=dimensions,
+    )
+    # The API returns one item per input, tagged with its position
+    return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+
+def _input_specific(error: Exception | None) -> bool:
+    """Whether the request was rejected for its inputs, so splitting may help."""
+    return isinstance(error, (BadRequestError, UnprocessableEntityError))
+
+
+async def _embed_with_retry(
+    texts: list[str], model: str, dimensions: int
+) -> list[list[float] | None]:
+    """Embed a batch, retrying with backoff; then retry inputs one by one.
+
+    Inputs are only retried one by one when the API rejected the batch
+    (400/422). Outages, rate limits and connection errors fail the whole
+    batch instead of costing one more request per input.
+    """
+    error: Exception | None = None
+    attempts = settings.embedding_max_retries
+    for attempt in range(attempts):
+        try:
+            return await _embed_batch(texts, model, dimensions)
+        except Exception as e:
+            error = e
+            print(
+                f"Embedding batch of {len(texts)} failed (attempt {attempt + 1}): {e}"
+            )
+            if attempt + 1 < attempts:
+                await asyncio.sleep(settings.embedding_retry_backoff * 2**attempt)
+
+    if len(texts) == 1 or not _input_specific(error):
+        return [None] * len(texts)
+    # Isolate the bad input(s) so the rest of the batch still succeeds
+    results = []
+    for text in texts:
+        results.extend(await _embed_with_retry([text], model, dimensions))
+    return results
+
+
+async def get_embeddings(
+    texts: list[str],
+    model: str | None = None,
+    dimensions: int | None = None,
+    use_cache: bool = True,
+) -> list[list[float] | None]:
+    """
+    Embed many texts, in order, using as few API requests as possible.
+
+    Cached texts are served from the embedding cache. The rest are packed into
+    token-budgeted batches that run with bounded concurrency. A failing batch
+    is retried, then split so only the inputs that keep failing come back as
+    None. ``model``/``dimensions`` default to the configured embedding model.
+    ``use_cache=False`` neither reads nor fills the cache (bulk jobs whose
+    texts won't be looked up again would only evict the useful entries).
+    """
+    model = model or settings.embedding_model
+    dimensions = dimensions or settings.embedding_dimensions
+    normalized = [normalize_text(text[:32000]) for text in texts]
+    keys = [cache_key(model, dimensions, text) for text in normalized]
+
+    found = (
+        await embedding_cache.get_many(
+            [key for key, text in zip(keys, normalized) if text]
+        )
+        if use_cache
+        else {}
     )
 
-    return response.data[0].embedding
+    # Embed each distinct uncached text once
+    pending: dict[str, str] = {}
+    for key, text in zip(keys, normalized):
+        if text and key not in found:
+            pending.setdefault(key, text)
+    pending_keys = list(pending)
+    pending_texts = list(pending.values())
+
+    limiter = asyncio.Semaphore(settings.embedding_batch_concurrency)
+
+    async def run(batch: list[int]) -> None:
+        async with limiter:
+            embeddings = await _embed_with_retry(
+                [pending_texts[i] for i in batch], model, dimensions
+            )
+        fresh = {
+            pending_keys[i]: embedding
+            for i, embedding in zip(batch, embeddings)
+            if embedding is not None
+        }
+        if use_cache:
+            await embedding_cache.set_many(fresh, model, dimensions)
+        found.update(fresh)
+
+    await asyncio.gather(
+        *(
+            run(batch)
+            for batch in _pack_batches(
+                pending_texts,
+                settings.embedding_batch_max_tokens,
+                settings.embedding_batch_max_inputs,
+            )
+        )
+    )
+    return [found.get(key) if text else None for key, text in zip(keys, normalized)]
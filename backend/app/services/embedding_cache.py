@@ -0,0 +1,249 @@
+"""Two-tier, content-addressed cache for embeddings.
+
+Keys are ``sha256(model, dimensions, normalized text)``, so changing
+``settings.embedding_model`` (or the dimensions) naturally misses every old
+entry. Tier 1 is an in-process LRU bounded by an approximate byte budget;
+tier 2 is the ``embedding_cache`` table, shared by every worker.
+"""
+
+import hashlib
+import json
+import sys
+import unicodedata
+from array import array
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from supabase import AsyncClient
+
+
+def parse_vector(value: Any) -> list[float]:
+    """A pgvector column value as a list (PostgREST returns '[0.1,0.2,...]')."""
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so whitespace-only edits map to the same cache key."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model: str, dimensions: int, text: str) -> str:
+    """Content address for an embedding of already-normalized text."""
+    payload = f"{model}\x00{dimensions}\x00{text}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    persistent_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.memory_hits + self.persistent_hits + self.misses
+        return (self.memory_hits + self.persistent_hits) / lookups if lookups else 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hit_ratio, 4),
+        }
+
+
+class EmbeddingLRU:
+    """LRU of key -> embedding, evicting by size in bytes.
+
+    Vectors are held as ``array("d")``: 8 bytes per element, against ~32 for
+    a list of float objects, so the byte budget matches real memory use. Each
+    ``get()`` hands out a fresh list.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._entries: OrderedDict[str, array] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _cost(key: str, vector: array) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(vector)
+
+    def get(self, key: str) -> list[float] | None:
+        vector = self._entries.get(key)
+        if vector is None:
+            return None
+        self._entries.move_to_end(key)
+        return vector.tolist()
+
+    def set(self, key: str, embedding: list[float]) -> None:
+        if key in self._entries:
+            self.size_bytes -= self._cost(key, self._entries.pop(key))
+        vector = array("d", embedding)
+        cost = self._cost(key, vector)
+        if cost > self.max_bytes:
+            return
+        self._entries[key] = vector
+        self.size_bytes += cost
+        while self.size_bytes > self.max_bytes:
+            old_key, old_vector = self._entries.popitem(last=False)
+            self.size_bytes -= self._cost(old_key, old_vector)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size_bytes = 0
+
+
+class EmbeddingCache:
+    """In-process LRU backed by the ``embedding_cache`` table.
+
+    Keys include the model and dimensions, so entries for several models (the
+    primary and a shadow re-embed target) live side by side in one LRU.
+    """
+
+    table = "embedding_cache"
+
+    def __init__(
+        self,
+        max_bytes: int,
+        supabase_factory: Callable[[], Awaitable[AsyncClient]] | None = None,
+    ):
+        self.memory = EmbeddingLRU(max_bytes)
+        self.stats = CacheStats()
+        self._supabase_factory = supabase_factory
+
+    async def get(self, key: str) -> list[float] | None:
+        """Look a key up in memory, then in the persistent table."""
+        embedding = self.memory.get(key)
+        if embedding is not None:
+            self.stats.memory_hits += 1
+            return embedding
+
+        embedding = await self._load(key)
+        if embedding is not None:
+            self.stats.persistent_hits += 1
+            self.memory.set(key, embedding)
+            return embedding
+
+        self.stats.misses += 1
+        return None
+
+    async def set(
+        self, key: str, model: str, dimensions: int, embedding: list[float]
+    ) -> None:
+        """Store an embedding in both tiers."""
+        self.memory.set(key, embedding)
+        await self._store(
+            [
+                {
+                    "key": key,
+                    "model": model,
+                    "dimensions": dimensions,
+                    "embedding": embedding,
+                }
+            ]
+        )
+
+    async def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        """Batch lookup; the persistent tier is queried once for all memory misses."""
+        found = {}
+        missing = []
+        for key in keys:
+            embedding = self.memory.get(key)
+            if embedding is not None:
+                found[key] = embedding
+                self.stats.memory_hits += 1
+            else:
+                missing.append(key)
+
+        for key, embedding in (await self._load_many(missing)).items():
+            found[key] = embedding
+            self.memory.set(key, embedding)
+            self.stats.persistent_hits += 1
+        self.stats.misses += len(keys) - len(found)
+        return found
+
+    async def set_many(
+        self, entries: dict[str, list[float]], model: str, dimensions: int
+    ) -> None:
+        """Store several embeddings with a single write to the persistent tier."""
+        for key, embedding in entries.items():
+            self.memory.set(key, embedding)
+        await self._store(
+            [
+                {
+                    "key": key,
+                    "model": model,
+                    "dimensions": dimensions,
+                    "embedding": embedding,
+                }
+                for key, embedding in entries.items()
+            ]
+        )
+
+    async def _load(self, key: str) -> list[float] | None:
+        if self._supabase_factory is None:
+            return None
+        try:
+            supabase = await self._supabase_factory()
+            response = await (
+                supabase.table(self.table)
+                .select("embedding")
+                .eq("key", key)
+                .limit(1)
+                .execute()
+            )
+        except Exception as e:
+            print(f"Embedding cache lookup failed: {e}")
+            return None
+        if not response.data:
+            return None
+        return parse_vector(response.data[0]["embedding"])
+
+    async def _load_many(self, keys: list[str]) -> dict[str, list[float]]:
+        if self._supabase_factory is None or not keys:
+            return {}
+        try:
+            supabase = await self._supabase_factory()
+            response = await (
+                supabase.table(self.table)
+                .select("key, embedding")
+                .in_("key", keys)
+                .execute()
+            )
+        except Exception as e:
+            print(f"Embedding cache lookup failed: {e}")
+            return {}
+        return {
+            row["key"]: parse_vector(row["embedding"]) for row in response.data or []
+        }
+
+    async def _store(self, rows: list[dict[str, Any]]) -> None:
+        if self._supabase_factory is None or not rows:
+            return
+        try:
+            supabase = await self._supabase_factory()
+            await supabase.table(self.table).upsert(rows, on_conflict="key").execute()
+        except Exception as e:
+            print(f"Embedding cache write failed: {e}")
+
+    async def purge_stale(self, model: str, dimensions: int) -> None:
+        """Drop persisted entries written for a different model or dimensions."""
+        if self._supabase_factory is None:
+            return
+        try:
+            supabase = await self._supabase_factory()
+            await (
+                supabase.table(self.table)
+                .delete()
+                .or_(f'model.neq."{model}",dimensions.neq.{dimensions}')
+                .execute()
+            )
+        except Exception as e:
+            print(f"Embedding cache purge failed: {e}")
@@ -0,0 +1,103 @@
+"""Streaming library export (backups and moving users between instances).
+
+Bookmarks are read in keyset batches and encoded as they arrive, so memory
+stays flat no matter how large the library is. Output is NDJSON (one bookmark
+per line) or a single JSON document written in chunks, optionally gzipped on
+the fly.
+"""
+
+import json
+import zlib
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any
+
+from supabase import AsyncClient
+
+from app.core.config import settings
+from app.services.embedding_cache import parse_vector
+from app.services.pagination import apply_keyset, encode_cursor
+
+EXPORT_VERSION = 1
+
+# Instance-specific or derived columns that don't belong in an export
+EXCLUDED_COLUMNS = ("user_id", "search_vector")
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    JSON = "json"
+
+
+def _export_row(row: dict[str, Any]) -> dict[str, Any]:
+    record = {k: v for k, v in row.items() if k not in EXCLUDED_COLUMNS}
+    record["categories"] = sorted(c["name"] for c in row.get("categories") or [])
+    if "bookmark_embeddings" in row:
+        embedding = record.pop("bookmark_embeddings")
+        # One-to-one embeds come back as an object, older schemas as a list
+        if isinstance(embedding, list):
+            embedding = embedding[0] if embedding else None
+        record["embedding"] = (
+            parse_vector(embedding["embedding"]) if embedding else None
+        )
+    return record
+
+
+async def iter_bookmarks(
+    supabase: AsyncClient,
+    user_id: str,
+    include_embeddings: bool = False,
+    batch_size: int | None = None,
+) -> AsyncIterator[dict[str, Any]]:
+    """Yield every bookmark of a user (with categories), one batch query at a time."""
+    batch_size = batch_size or settings.export_batch_size
+    columns = "*, categories(name)"
+    if include_embeddings:
+        columns += ", bookmark_embeddings(embedding)"
+
+    cursor = None
+    while True:
+        query = supabase.table("bookmarks").select(columns).eq("user_id", user_id)
+        response = await apply_keyset(query, cursor).limit(batch_size).execute()
+        rows = response.data or []
+        for row in rows:
+            yield _export_row(row)
+        if len(rows) < batch_size:
+            return
+        cursor = encode_cursor(rows[-1])
+
+
+async def encode_export(
+    bookmarks: AsyncIterator[dict[str, Any]],
+    fmt: ExportFormat = ExportFormat.NDJSON,
+) -> AsyncIterator[bytes]:
+    """Serialize bookmarks as NDJSON lines or one chunked JSON document."""
+    if fmt == ExportFormat.NDJSON:
+        async for bookmark in bookmarks:
+            yield json.dumps(bookmark, default=str).encode("utf-8") + b"\n"
+        return
+
+    header = {
+        "version": EXPORT_VERSION,
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+    }
+    # Open the document, then append bookmarks to its array as they stream in
+    yield json.dumps(header)[:-1].encode("utf-8") + b', "bookmarks": ['
+    separator = b""
+    async for bookmark in bookmarks:
+        yield separator + json.dumps(bookmark, default=str).encode("utf-8")
+        separator = b",\n"
+    yield b"]}\n"
+
+
+async def gzip_stream(
+    chunks: AsyncIterator[bytes], level: int = 6
+) -> AsyncIterator[bytes]:
+    """Gzip a byte stream incrementally."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,517 @@
+"""Single-pass, incremental page extraction on lxml's pull parser.
+
+``PageExtractor`` is fed the response body chunk by chunk while it downloads.
+Everything is collected from the parse events in one pass: the first
+candidate for each metadata source (og/twitter/meta tags, ``<title>``, each
+favicon ``rel``) and for each content container (``<main>``, ``<article>``,
+*content* divs, ``<body>``), outside script/nav/footer-style subtrees. The
+result then picks the best candidate of each kind by priority, so no field
+needs another search of the tree. Body text is counted as elements close, so
+the fetch can stop reading as soon as enough text has been collected instead
+of downloading and parsing the whole page only to truncate it. When the page
+is parsed in another process instead, ``TextCounter`` gives the fetch the
+same stopping point from a cheap regex scan.
+
+The main content block is found Readability-style: as each paragraph-like
+element closes it scores its parent and grandparent (more for longer,
+comma-rich text), containers are weighted by tag and by class/id hints, and
+the final score is discounted by link density. The best block and any
+high-scoring siblings are emitted as deduplicated paragraphs, with link
+lists, forms and cookie/share/related-style widgets pruned. Pages with no
+scoreable paragraphs fall back to the semantic container.
+"""
+
+import codecs
+import re
+from urllib.parse import urljoin, urlparse
+
+from lxml import etree
+
+# Subtrees that never contribute to the page's readable text
+SKIP_TAGS = frozenset(
+    {"script", "style", "nav", "header", "footer", "aside", "noscript"}
+)
+
+MAX_CONTENT_CHARS = 50000
+
+# Meta tags we care about, keyed by (attribute, value)
+META_KEYS = {
+    ("property", "og:title"),
+    ("name", "twitter:title"),
+    ("property", "og:description"),
+    ("name", "twitter:description"),
+    ("name", "description"),
+}
+
+# Favicon link rel values, in order of preference
+ICON_RELS = ("icon", "apple-touch-icon", "apple-touch-icon-precomposed")
+
+# Main content container candidates, in order of preference: <main>,
+# <article>, a div whose class or id mentions "content", else <body>
+CONTAINERS = ("main", "article", "class", "id", "body")
+
+# Paragraph boundaries when emitting text
+BLOCK_TAGS = frozenset(
+    {
+        "address",
+        "article",
+        "aside",
+        "blockquote",
+        "dd",
+        "div",
+        "dl",
+        "dt",
+        "fieldset",
+        "figcaption",
+        "figure",
+        "footer",
+        "form",
+        "h1",
+        "h2",
+        "h3",
+        "h4",
+        "h5",
+        "h6",
+        "header",
+        "hr",
+        "li",
+        "main",
+        "nav",
+        "ol",
+        "p",
+        "pre",
+        "section",
+        "table",
+        "td",
+        "th",
+        "tr",
+        "ul",
+    }
+)
+
+# Elements scored as paragraphs (as are divs/sections with no block children)
+PARAGRAPH_TAGS = frozenset({"p", "pre", "td", "blockquote"})
+MIN_PARAGRAPH_CHARS = 25
+
+# Never readable text, even inside the main block
+PRUNE_TAGS = frozenset({"form", "button", "select", "iframe", "svg"})
+# Containers dropped from the main block when they are mostly links
+LINK_LIST_TAGS = frozenset({"div", "dl", "ol", "section", "table", "ul"})
+
+# Starting score of a candidate container, by tag
+TAG_WEIGHTS = {
+    "main": 10,
+    "article": 10,
+    "div": 5,
+    "pre": 3,
+    "td": 3,
+    "blockquote": 3,
+    "address": -3,
+    "dd": -3,
+    "dl": -3,
+    "dt": -3,
+    "form": -3,
+    "li": -3,
+    "ol": -3,
+    "ul": -3,
+    "h1": -5,
+    "h2": -5,
+    "h3": -5,
+    "h4": -5,
+    "h5": -5,
+    "h6": -5,
+    "th": -5,
+}
+CLASS_WEIGHT = 25
+_POSITIVE_RE = re.compile(
+    r"\b(?:article|blog|body|content|entry|h-?entry|main|page|post|story|text)\b"
+)
+_NEGATIVE_RE = re.compile(
+    r"\b(?:ads?|advert\w*|banner|breadcrumbs?|comments?|consent|cookies?|footer|footnotes?"
+    r"|gdpr|menu|meta|modal|nav|newsletter|outbrain|pager|pagination|popup|promo\w*"
+    r"|related|share|sharing|sidebar|social|sponsor\w*|subscribe|taboola|widget)\b"
+)
+
+_CHARSET_RE = re.compile(rb"""<meta[^>]+charset=["']?([\w.:-]+)""", re.IGNORECASE)
+
+
+def sniff_encoding(content_type: str | None, head: bytes) -> str:
+    """Charset from Content-Type, else a <meta> in the first bytes, else UTF-8."""
+    candidates = []
+    if content_type:
+        for param in content_type.split(";")[1:]:
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "charset" and value:
+                candidates.append(value.strip("\"'"))
+    match = _CHARSET_RE.search(head[:2048])
+    if match:
+        candidates.append(match.group(1).decode("ascii"))
+    for candidate in candidates:
+        try:
+            return codecs.lookup(candidate).name
+        except LookupError:
+            continue
+    return "utf-8"
+
+
+def _tag(el) -> str:
+    # libxml2's HTML parser already lowercases tag names. Comments and
+    # processing instructions have a non-string tag.
+    tag = el.tag
+    return tag if isinstance(tag, str) else ""
+
+
+def _class_tokens(el, attribute: str) -> list[str]:
+    return (el.get(attribute) or "").lower().split()
+
+
+def _class_weight(el) -> int:
+    """+25 for content-like class/id names, -25 for boilerplate-like ones."""
+    names = f"{el.get('class') or ''} {el.get('id') or ''}".lower()
+    if names == " ":
+        return 0
+    weight = 0
+    if _NEGATIVE_RE.search(names):
+        weight -= CLASS_WEIGHT
+    if _POSITIVE_RE.search(names):
+        weight += CLASS_WEIGHT
+    return weight
+
+
+def visible_text(el) -> str:
+    """Whitespace-normalized text of ``el``, leaving out SKIP_TAGS subtrees."""
+    parts = []
+    walker = etree.iterwalk(el, events=("start", "end"))
+    for event, node in walker:
+        if event == "start":
+            if node is not el and _tag(node) in SKIP_TAGS:
+                walker.skip_subtree()
+            elif node.text:
+                parts.append(node.text)
+        elif node is not el and node.tail:
+            parts.append(node.tail)
+    return " ".join(" ".join(parts).split())
+
+
+class PageExtractor:
+    """Feed HTML bytes with ``feed()``; call ``result()`` once at the end."""
+
+    def __init__(self, encoding: str = "utf-8", max_chars: int = MAX_CONTENT_CHARS):
+        self.encoding = encoding
+        self.max_chars = max_chars
+        # First occurrence of each candidate; emptiness is only judged at the
+        # end, so an empty og:title falls back to twitter:title, not to a
+        # second og:title
+        self.title: str | None = None
+        self.meta: dict[tuple[str, str], str] = {}
+        self.icons: dict[str, str] = {}
+        self.containers: dict[str, etree._Element] = {}
+        # Readability scores of candidate blocks, and per-element text and
+        # link-text lengths (for link density), filled in as elements close
+        self.scores: dict[etree._Element, float] = {}
+        self._text_len: dict[etree._Element, int] = {}
+        self._link_len: dict[etree._Element, int] = {}
+        self.text_chars = 0
+        self._seen_title = False
+        self._in_body = False
+        self._skip_depth = 0
+        # Decode in Python (any codec, split multi-byte sequences handled) and
+        # feed text, so libxml2's own encoding support doesn't matter
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._parser = etree.HTMLPullParser(
+            events=("start", "end"), remove_comments=True
+        )
+
+    @property
+    def done(self) -> bool:
+        """Enough body text has been seen; the rest of the page can be dropped."""
+        return self.text_chars >= self.max_chars
+
+    def feed(self, chunk: bytes) -> bool:
+        """Parse another chunk. Returns True once no more input is needed."""
+        text = self._decoder.decode(chunk)
+        if text:
+            self._parser.feed(text)
+            self._handle_events()
+        return self.done
+
+    def _handle_events(self) -> None:
+        for event, el in self._parser.read_events():
+            tag = _tag(el)
+            if event == "start":
+                if tag in SKIP_TAGS:
+                    self._skip_depth += 1
+                elif not self._skip_depth:
+                    self._handle_container(tag, el)
+                continue
+
+            if tag in SKIP_TAGS:
+                self._skip_depth -= 1
+            elif tag == "title":
+                if not self._seen_title:
+                    self._seen_title = True
+                    self.title = el.text
+            elif tag == "meta":
+                self._handle_meta(el)
+            elif tag == "link":
+                self._handle_link(el)
+
+            if self._in_body and not self._skip_depth and tag not in SKIP_TAGS:
+                self._handle_body_end(tag, el)
+
+    def _handle_body_end(self, tag: str, el) -> None:
+        # Each text node is counted once: own text here, tails at the parent.
+        # Children have already closed, so their totals are known.
+        own = len(el.text or "")
+        total = links = 0
+        has_blocks = False
+        for child in el:
+            own += len(child.tail or "")
+            total += self._text_len.get(child, 0)
+            links += self._link_len.get(child, 0)
+            has_blocks = has_blocks or _tag(child) in BLOCK_TAGS
+        self.text_chars += own
+        total += own
+        self._text_len[el] = total
+        if tag == "a":
+            links = total
+        if links:
+            self._link_len[el] = links
+        # Raw length bounds the normalized one, so short elements are skipped
+        # without building their text
+        if total >= MIN_PARAGRAPH_CHARS and (
+            tag in PARAGRAPH_TAGS or (tag in ("div", "section") and not has_blocks)
+        ):
+            self._score_paragraph(el)
+
+    def _score_paragraph(self, el) -> None:
+        text = visible_text(el)
+        if len(text) < MIN_PARAGRAPH_CHARS:
+            return
+        score = 1 + text.count(",") + min(len(text) // 100, 3)
+        parent = el.getparent()
+        if parent is None:
+            return
+        self._add_score(parent, score)
+        grandparent = parent.getparent()
+        if grandparent is not None:
+            self._add_score(grandparent, score / 2)
+
+    def _add_score(self, el, score: float) -> None:
+        if el not in self.scores:
+            self.scores[el] = TAG_WEIGHTS.get(_tag(el), 0) + _class_weight(el)
+        self.scores[el] += score
+
+    def _link_density(self, el) -> float:
+        total = self._text_len.get(el, 0)
+        return self._link_len.get(el, 0) / total if total else 0.0
+
+    def _content_blocks(self) -> list:
+        """The best-scoring block plus siblings that look like part of it."""
+        final = {
+            el: score * (1 - self._link_density(el))
+            for el, score in self.scores.items()
+        }
+        top = max(final, key=final.get, default=None)
+        if top is None or final[top] <= 0:
+            # Nothing scoreable (short or paragraph-less page)
+            fallback = next(
+                (self.containers[c] for c in CONTAINERS if c in self.containers), None
+            )
+            return [fallback] if fallback is not None else []
+
+        parent = top.getparent()
+        if parent is None or _tag(top) == "body":
+            return [top]
+        threshold = max(10.0, final[top] * 0.2)
+        return [
+            sibling
+            for sibling in parent
+            if sibling is top
+            or final.get(sibling, 0) >= threshold
+            or (
+                _tag(sibling) == "p"
+                and self._text_len.get(sibling, 0) > 80
+                and self._link_density(sibling) < 0.25
+            )
+        ]
+
+    def _is_boilerplate(self, el) -> bool:
+        tag = _tag(el)
+        if tag in SKIP_TAGS or tag in PRUNE_TAGS or _class_weight(el) < 0:
+            return True
+        return tag in LINK_LIST_TAGS and self._link_density(el) > 0.5
+
+    def _paragraphs(self, blocks: list) -> list[str]:
+        """Whitespace-normalized, deduplicated paragraphs of ``blocks``."""
+        paragraphs: list[str] = []
+        seen: set[str] = set()
+        parts: list[str] = []
+
+        def flush() -> None:
+            text = " ".join(" ".join(parts).split())
+            parts.clear()
+            if text and text.casefold() not in seen:
+                seen.add(text.casefold())
+                paragraphs.append(text)
+
+        for block in blocks:
+            walker = etree.iterwalk(block, events=("start", "end"))
+            for event, node in walker:
+                tag = _tag(node)
+                if event == "start":
+                    if node is not block and self._is_boilerplate(node):
+                        walker.skip_subtree()
+                        continue
+                    if tag in BLOCK_TAGS:
+                        flush()
+                    if node.text:
+                        parts.append(node.text)
+                else:
+                    if tag in BLOCK_TAGS:
+                        flush()
+                    if node is not block and node.tail:
+                        parts.append(node.tail)
+            flush()
+        return paragraphs
+
+    def _handle_container(self, tag: str, el) -> None:
+        if tag == "body":
+            self._in_body = True
+            self.containers.setdefault("body", el)
+        elif tag in ("main", "article"):
+            self.containers.setdefault(tag, el)
+        elif tag == "div":
+            # Attributes are complete on the start event
+            for attribute in ("class", "id"):
+                if attribute not in self.containers and any(
+                    "content" in token for token in _class_tokens(el, attribute)
+                ):
+                    self.containers[attribute] = el
+
+    def _handle_meta(self, el) -> None:
+        content = el.get("content") or ""
+        for attribute in ("property", "name"):
+            key = (attribute, el.get(attribute) or "")
+            if key in META_KEYS:
+                self.meta.setdefault(key, content)
+
+    def _handle_link(self, el) -> None:
+        rels = _class_tokens(el, "rel")
+        for rel in ICON_RELS:
+            if rel in rels:
+                self.icons.setdefault(rel, el.get("href") or "")
+
+    def _first_meta(self, *keys: tuple[str, str]) -> str | None:
+        return next(
+            (self.meta[key].strip() for key in keys if self.meta.get(key)), None
+        )
+
+    def result(self, url: str) -> dict[str, str | None]:
+        """Close the parser and return title, description, content and favicon_url."""
+        tail = self._decoder.decode(b"", final=True)
+        if tail:
+            self._parser.feed(tail)
+        try:
+            self._parser.close()
+        except etree.XMLSyntaxError:  # nothing was fed
+            pass
+        self._handle_events()
+
+        content = "\n\n".join(self._paragraphs(self._content_blocks()))
+        if len(content) > self.max_chars:
+            content = content[: self.max_chars] + "..."
+        content = content or None
+
+        icon = next((self.icons[rel] for rel in ICON_RELS if self.icons.get(rel)), None)
+        if icon:
+            favicon_url = urljoin(url, icon)
+        else:
+            parsed = urlparse(url)
+            favicon_url = f"{parsed.scheme}://{parsed.netloc}/favicon.ico"
+
+        return {
+            "title": self._first_meta(
+                ("property", "og:title"), ("name", "twitter:title")
+            )
+            or (self.title.strip() if self.title else None),
+            "description": self._first_meta(
+                ("property", "og:description"),
+                ("name", "twitter:description"),
+                ("name", "description"),
+            ),
+            "content": content,
+            "favicon_url": favicon_url,
+        }
+
+
+_TAG_RE = re.compile(r"<!--.*?-->|<(/?)([a-zA-Z][\w:-]*)?[^>]*>", re.DOTALL)
+
+# An unclosed "<" longer than this at the end of a chunk isn't held back
+MAX_PENDING_CHARS = 4096
+
+
+class TextCounter:
+    """Running count of body text, without parsing.
+
+    Used while a page downloads when it will be extracted elsewhere (the
+    parse pool): the fetch can still stop once enough text has arrived, at
+    the cost of a regex scan instead of building a tree on the event loop.
+    Counts roughly what ``PageExtractor.text_chars`` does: raw text outside
+    ``<head>`` and SKIP_TAGS subtrees.
+    """
+
+    def __init__(self, encoding: str = "utf-8", max_chars: int = MAX_CONTENT_CHARS):
+        self.max_chars = max_chars
+        self.text_chars = 0
+        self._in_head = False
+        self._skip_depth = 0
+        # A tag split across chunks waits here for the rest of it
+        self._pending = ""
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+
+    @property
+    def done(self) -> bool:
+        return self.text_chars >= self.max_chars
+
+    def feed(self, chunk: bytes) -> bool:
+        """Count another chunk. Returns True once no more input is needed."""
+        text = self._pending + self._decoder.decode(chunk)
+        self._pending = ""
+        cut = text.rfind("<")
+        if cut != -1 and ">" not in text[cut:]:
+            if len(text) - cut <= MAX_PENDING_CHARS:
+                self._pending = text[cut:]
+            text = text[:cut]
+
+        position = 0
+        for match in _TAG_RE.finditer(text):
+            self._count(text[position : match.start()])
+            position = match.end()
+            closing, tag = match.groups()
+            if not tag:
+                continue
+            tag = tag.lower()
+            if tag in SKIP_TAGS:
+                self._skip_depth = max(0, self._skip_depth + (-1 if closing else 1))
+            elif tag == "head":
+                self._in_head = not closing
+        self._count(text[position:])
+        return self.done
+
+    def _count(self, text: str) -> None:
+        if text and not self._in_head and not self._skip_depth:
+            self.text_chars += len(text)
+
+
+# Input slice size for whole documents, so parsing can stop early there too
+CHUNK_SIZE = 64 * 1024
+
+
+def extract(html: bytes, url: str, encoding: str = "utf-8") -> dict[str, str | None]:
+    """Extract from a complete document (a buffered fetch or an archived page)."""
+    extractor = PageExtractor(encoding=encoding)
+    for start in range(0, len(html), CHUNK_SIZE):
+        if extractor.feed(html[start : start + CHUNK_SIZE]):
+            break
+    return extractor.result(url)
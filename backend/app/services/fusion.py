@@ -0,0 +1,83 @@
+"""Result fusion for hybrid search.
+
+Each search source (semantic similarity, category match, ...) returns its own
+ranked candidate list; ``fuse`` merges them into one ranking by bookmark id.
+
+- RRF: ``sum(1 / (k + rank))`` over the lists a bookmark appears in. Only
+  ranks matter, so sources with incomparable scores mix safely.
+- WEIGHTED_RRF: the same, with each source's term multiplied by its weight.
+- LINEAR: each source's raw scores are min-max normalised to [0, 1] over its
+  candidates, then summed with the source weights. Keeps score gaps (a 0.9
+  vs 0.5 similarity) that rank-based fusion throws away.
+
+A bookmark missing from a list contributes nothing for that source.
+"""
+
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any
+
+
+class FusionMethod(str, Enum):
+    RRF = "rrf"
+    WEIGHTED_RRF = "weighted_rrf"
+    LINEAR = "linear"
+
+
+@dataclass
+class RankedList:
+    """One source's candidates, best first, with the row key holding its score."""
+
+    source: str
+    rows: list[dict[str, Any]]
+    score_key: str
+    weight: float = 1.0
+
+
+@dataclass
+class FusedHit:
+    row: dict[str, Any]
+    score: float = 0.0
+    # Raw score per source the bookmark was found by
+    source_scores: dict[str, float] = field(default_factory=dict)
+
+
+def _normalized(scores: list[float]) -> list[float]:
+    low, high = min(scores), max(scores)
+    if high == low:
+        # One candidate, or all tied: each is as good as the source's best
+        return [1.0] * len(scores)
+    return [(s - low) / (high - low) for s in scores]
+
+
+def fuse(
+    lists: list[RankedList],
+    method: FusionMethod = FusionMethod.RRF,
+    rrf_k: int = 60,
+    limit: int = 20,
+) -> list[FusedHit]:
+    """Merge ranked lists into the top ``limit`` hits, best first."""
+    hits: dict[str, FusedHit] = {}
+
+    for ranked in lists:
+        scores = [float(row.get(ranked.score_key) or 0.0) for row in ranked.rows]
+        if method == FusionMethod.LINEAR and scores:
+            contributions = [ranked.weight * s for s in _normalized(scores)]
+        else:
+            weight = ranked.weight if method == FusionMethod.WEIGHTED_RRF else 1.0
+            contributions = [
+                weight / (rrf_k + rank) for rank in range(1, len(ranked.rows) + 1)
+            ]
+
+        for row, score, contribution in zip(ranked.rows, scores, contributions):
+            hit = hits.get(row["id"])
+            if hit is None:
+                hit = hits[row["id"]] = FusedHit(row=row)
+            else:
+                # Fill in columns only this source returns (e.g. matched_categories)
+                hit.row = {**row, **hit.row}
+            hit.score += contribution
+            hit.source_scores[ranked.source] = score
+
+    # sorted() is stable: ties keep the order of the first list they appeared in
+    return sorted(hits.values(), key=lambda hit: hit.score, reverse=True)[:limit]
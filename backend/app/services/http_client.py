@@ -0,0 +1,170 @@
+"""Shared, pooled HTTP client for outbound page fetches.
+
+One ``PooledHttpClient`` is created in the app lifespan (see ``app/main.py``)
+so every scrape reuses keep-alive / HTTP/2 connections instead of paying a
+fresh TCP+TLS handshake per URL. On top of httpx's global connection cap it
+enforces a per-host concurrency cap, which keeps bulk imports from a single
+domain from monopolising the pool.
+"""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.core.config import settings
+
+
+@dataclass
+class PoolMetrics:
+    requests: int = 0
+    connections_opened: int = 0
+    in_flight: int = 0
+    waiting: int = 0
+    wait_time_total: float = 0.0
+    wait_time_max: float = 0.0
+
+    @property
+    def reuse_ratio(self) -> float:
+        """Fraction of requests served on an already-open connection."""
+        if not self.requests:
+            return 0.0
+        return max(0.0, 1 - self.connections_opened / self.requests)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "connections_in_use": self.in_flight,
+            "waiting": self.waiting,
+            "wait_time_avg_ms": (
+                self.wait_time_total / self.requests * 1000 if self.requests else 0.0
+            ),
+            "wait_time_max_ms": self.wait_time_max * 1000,
+            "reuse_ratio": round(self.reuse_ratio, 4),
+        }
+
+
+@dataclass
+class _HostSlot:
+    semaphore: asyncio.Semaphore
+    users: int = 0  # requests holding or waiting for the semaphore
+
+
+class PooledHttpClient:
+    """httpx.AsyncClient wrapper with per-host concurrency caps and pool metrics."""
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        per_host_limit: int = 6,
+        timeout: float = 10.0,
+        http2: bool = True,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.per_host_limit = per_host_limit
+        self.metrics = PoolMetrics()
+        self._host_slots: dict[str, _HostSlot] = {}
+        self._client = httpx.AsyncClient(
+            http2=http2,
+            follow_redirects=True,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            transport=transport,
+        )
+
+    @classmethod
+    def from_settings(cls) -> "PooledHttpClient":
+        return cls(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+            per_host_limit=settings.http_per_host_limit,
+            timeout=settings.scrape_timeout,
+            http2=settings.http2_enabled,
+        )
+
+    async def _trace(self, event_name: str, info: dict) -> None:
+        # httpcore only emits connect events when it has to open a new connection
+        if event_name == "connection.connect_tcp.complete":
+            self.metrics.connections_opened += 1
+
+    @asynccontextmanager
+    async def _host_slot(self, url: str) -> AsyncIterator[None]:
+        host = urlsplit(url).netloc.lower()
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = _HostSlot(asyncio.Semaphore(self.per_host_limit))
+            self._host_slots[host] = slot
+
+        slot.users += 1
+        try:
+            self.metrics.waiting += 1
+            started = time.perf_counter()
+            try:
+                await slot.semaphore.acquire()
+            finally:
+                self.metrics.waiting -= 1
+            waited = time.perf_counter() - started
+            self.metrics.requests += 1
+            self.metrics.wait_time_total += waited
+            self.metrics.wait_time_max = max(self.metrics.wait_time_max, waited)
+
+            self.metrics.in_flight += 1
+            try:
+                yield
+            finally:
+                self.metrics.in_flight -= 1
+                slot.semaphore.release()
+        finally:
+            slot.users -= 1
+            # Forget idle hosts, or the map grows with every host ever requested
+            if slot.users == 0:
+                del self._host_slots[host]
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a request, waiting for a free slot on the target host first."""
+        kwargs.setdefault("extensions", {})["trace"] = self._trace
+        async with self._host_slot(url):
+            return await self._client.request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(
+        self, method: str, url: str, **kwargs: Any
+    ) -> AsyncIterator[httpx.Response]:
+        """Stream a response; the host slot is held until the body is closed."""
+        kwargs.setdefault("extensions", {})["trace"] = self._trace
+        async with self._host_slot(url):
+            async with self._client.stream(method, url, **kwargs) as response:
+                yield response
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_http_client: PooledHttpClient | None = None
+
+
+def set_http_client(client: PooledHttpClient | None) -> None:
+    """Install (or clear) the process-wide client. Called from the lifespan."""
+    global _http_client
+    _http_client = client
+
+
+def get_http_client() -> PooledHttpClient | None:
+    """Return the shared client, or None outside the app lifespan."""
+    return _http_client
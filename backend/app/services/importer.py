@@ -0,0 +1,290 @@
+"""Bulk import of browser bookmark exports.
+
+Parses Netscape bookmark HTML (what every browser exports) and JSON (this
+app's export, Chrome/Firefox bookmark files, or a plain list), drops URLs the
+user already has, bulk-inserts the rest in a few round trips and then feeds
+them to the ingestion workers, which bound how much scraping/AI work runs at
+once. Progress is tracked per import in memory.
+"""
+
+import asyncio
+import json
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+
+from bs4 import BeautifulSoup
+from pydantic import HttpUrl, TypeAdapter, ValidationError
+from supabase import AsyncClient
+
+from app.core.config import settings
+from app.models.bookmark import ImportStatus, ProcessingStatus
+from app.services.ingestion import IngestionJob, ingestion_input, ingestion_queue
+
+# Seconds between 1601-01-01 (Chrome/WebKit epoch) and 1970-01-01
+WEBKIT_EPOCH_OFFSET = 11644473600
+
+# Finished imports kept around for progress polling
+MAX_TRACKED_IMPORTS = 1000
+
+# Same validation BookmarkCreate.url gets on a single save
+_http_url = TypeAdapter(HttpUrl)
+
+
+@dataclass
+class ImportedBookmark:
+    url: str
+    title: str | None = None
+    description: str | None = None
+    created_at: str | None = None
+
+
+@dataclass
+class ImportJob:
+    user_id: str
+    total: int
+    inserted: int = 0
+    duplicates: int = 0
+    over_limit: int = 0
+    invalid: int = 0
+    processed: int = 0
+    failed: int = 0
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    @property
+    def status(self) -> ImportStatus:
+        if self.processed + self.failed >= self.inserted:
+            return ImportStatus.COMPLETED
+        return ImportStatus.PROCESSING
+
+    def on_done(self, status: ProcessingStatus) -> None:
+        if status == ProcessingStatus.COMPLETED:
+            self.processed += 1
+        else:
+            self.failed += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "over_limit": self.over_limit,
+            "invalid": self.invalid,
+            "processed": self.processed,
+            "failed": self.failed,
+            "created_at": self.created_at,
+        }
+
+
+import_jobs: OrderedDict[str, ImportJob] = OrderedDict()
+# Strong references to feeder tasks so they aren't garbage collected mid-run
+_feeders: set[asyncio.Task] = set()
+
+
+def _timestamp(seconds: float) -> str | None:
+    try:
+        return datetime.fromtimestamp(seconds, tz=timezone.utc).isoformat()
+    except (OverflowError, OSError, ValueError):
+        return None
+
+
+def _microseconds(value: Any) -> float | None:
+    """Seconds from a microsecond timestamp; None if missing or not a number."""
+    try:
+        return int(value) / 1_000_000
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_netscape_html(text: str) -> list[ImportedBookmark]:
+    """Parse the Netscape bookmark file format exported by browsers."""
+    soup = BeautifulSoup(text, "html.parser")
+    bookmarks = []
+    for link in soup.find_all("a", href=True):
+        description = None
+        following = link.find_next(["a", "dd"])
+        if following is not None and following.name == "dd" and following.contents:
+            first = following.contents[0]
+            if isinstance(first, str) and first.strip():
+                description = first.strip()
+        add_date = link.get("add_date")
+        bookmarks.append(
+            ImportedBookmark(
+                url=link["href"].strip(),
+                title=link.get_text(strip=True) or None,
+                description=description,
+                created_at=_timestamp(int(add_date))
+                if add_date and add_date.isdigit()
+                else None,
+            )
+        )
+    return bookmarks
+
+
+def _json_entry(node: dict[str, Any]) -> ImportedBookmark | None:
+    url = node.get("url") or node.get("uri")
+    if not isinstance(url, str):
+        return None
+    created_at = node.get("created_at")
+    if "dateAdded" in node:  # Firefox: microseconds since 1970
+        seconds = _microseconds(node["dateAdded"])
+        created_at = _timestamp(seconds) if seconds is not None else None
+    elif "date_added" in node:  # Chrome: microseconds since 1601
+        seconds = _microseconds(node["date_added"])
+        created_at = (
+            _timestamp(seconds - WEBKIT_EPOCH_OFFSET) if seconds is not None else None
+        )
+    return ImportedBookmark(
+        url=url.strip(),
+        title=node.get("title") or node.get("name") or None,
+        description=node.get("description") or None,
+        created_at=created_at,
+    )
+
+
+def _walk_json(node: Any, out: list[ImportedBookmark]) -> None:
+    if isinstance(node, list):
+        for item in node:
+            _walk_json(item, out)
+    elif isinstance(node, dict):
+        entry = _json_entry(node)
+        if entry is not None:
+            out.append(entry)
+            return
+        for value in node.values():
+            if isinstance(value, (dict, list)):
+                _walk_json(value, out)
+
+
+def parse_json(text: str) -> list[ImportedBookmark]:
+    """Parse a JSON document (any nesting of bookmark objects) or NDJSON."""
+    try:
+        documents = [json.loads(text)]
+    except json.JSONDecodeError:
+        documents = [json.loads(line) for line in text.splitlines() if line.strip()]
+    bookmarks: list[ImportedBookmark] = []
+    _walk_json(documents, bookmarks)
+    return bookmarks
+
+
+def parse_import(content: bytes) -> list[ImportedBookmark]:
+    """Detect the format from the content and parse it. Raises ValueError.
+
+    Parsing a large export is CPU-bound; call it off the event loop.
+    """
+    text = content.decode("utf-8-sig", errors="replace").lstrip()
+    if text.startswith("<"):
+        return parse_netscape_html(text)
+    try:
+        return parse_json(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Unrecognized bookmark file: {e}")
+
+
+def _web_url(url: str) -> str | None:
+    """The URL as a single save would store it, or None if it isn't valid."""
+    try:
+        return str(_http_url.validate_python(url))
+    except ValidationError:
+        return None
+
+
+async def import_bookmarks(
+    supabase: AsyncClient,
+    user_id: str,
+    bookmarks: list[ImportedBookmark],
+    max_bookmarks: int,
+) -> ImportJob:
+    """
+    Insert new bookmarks in bulk and queue them for background processing.
+
+    URLs already saved are skipped, and nothing beyond ``max_bookmarks`` total
+    is inserted. Returns the import job, which keeps counting as workers finish.
+    """
+    unique: dict[str, ImportedBookmark] = {}
+    invalid = 0
+    for bookmark in bookmarks:
+        url = _web_url(bookmark.url)
+        if url is None:
+            invalid += 1
+        else:
+            bookmark.url = url
+            unique.setdefault(url, bookmark)
+
+    job = ImportJob(user_id=user_id, total=len(unique), invalid=invalid)
+
+    # One query for the user's existing URLs and the remaining quota
+    existing_response = await (
+        supabase.table("bookmarks")
+        .select("url", count="exact")
+        .eq("user_id", user_id)
+        .execute()
+    )
+    existing = {row["url"] for row in existing_response.data or []}
+    new = [b for url, b in unique.items() if url not in existing]
+    job.duplicates = len(unique) - len(new)
+    remaining = max(0, max_bookmarks - (existing_response.count or 0))
+    job.over_limit = max(0, len(new) - remaining)
+    new = new[:remaining]
+
+    inserted: list[dict[str, Any]] = []
+    for start in range(0, len(new), settings.import_batch_size):
+        rows = []
+        for bookmark in new[start : start + settings.import_batch_size]:
+            row = {
+                "user_id": user_id,
+                "url": bookmark.url,
+                "title": bookmark.title,
+                "description": bookmark.description,
+                "processing_status": ProcessingStatus.PENDING.value,
+            }
+            row["ingestion_input"] = ingestion_input(row)
+            if bookmark.created_at:
+                row["created_at"] = bookmark.created_at
+            rows.append(row)
+        # ON CONFLICT (user_id, url) DO NOTHING: a concurrent save is a duplicate
+        response = await (
+            supabase.table("bookmarks")
+            .upsert(rows, on_conflict="user_id,url", ignore_duplicates=True)
+            .execute()
+        )
+        inserted.extend(response.data or [])
+    job.inserted = len(inserted)
+    job.duplicates += len(new) - len(inserted)
+
+    import_jobs[job.id] = job
+    while len(import_jobs) > MAX_TRACKED_IMPORTS:
+        import_jobs.popitem(last=False)
+
+    if inserted:
+        task = asyncio.create_task(_feed(job, inserted))
+        _feeders.add(task)
+        task.add_done_callback(_feeders.discard)
+    print(f"Import {job.id}: {job.inserted} inserted, {job.duplicates} duplicates")
+    return job
+
+
+async def _feed(job: ImportJob, rows: list[dict[str, Any]]) -> None:
+    """Push imported bookmarks onto the ingestion queue, waiting when it is full."""
+    for row in rows:
+        await ingestion_queue.put(
+            IngestionJob(
+                bookmark_id=row["id"],
+                user_id=job.user_id,
+                url=row["url"],
+                data={"title": row.get("title"), "description": row.get("description")},
+                on_done=job.on_done,
+            )
+        )
+
+
+def get_import_job(import_id: str, user_id: str) -> ImportJob | None:
+    job = import_jobs.get(import_id)
+    if job is None or job.user_id != user_id:
+        return None
+    return job
@@ -0,0 +1,472 @@
+"""Background ingestion pipeline: scrape -> summarize -> embed -> categorize.
+
+Bookmarks are inserted by the API with ``processing_status = 'pending'`` and a
+job is pushed onto an in-process asyncio queue. A pool of workers started in
+the app lifespan drains the queue and records per-stage progress on the
+bookmark row (``processing_status`` / ``processing_stages``), so clients can
+either poll ``GET /api/v1/bookmarks/{id}/status`` or subscribe to row changes
+through Supabase Realtime.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, TypeVar
+
+from supabase import AsyncClient
+
+from app.core.config import settings
+from app.core.deps import get_supabase_client
+from app.models.bookmark import ProcessingStatus, StageStatus
+from app.services.archive import load_archive, mark_checked, save_archive
+from app.services.embedding import get_embedding, get_embeddings
+from app.services.llm_ai import generate_categories, summarize_content
+from app.services.politeness import DomainFairQueue, domain_of
+from app.services.scraper import ScrapedData, fetch_page, parse_page
+
+STAGES = ("scrape", "summarize", "embed", "categorize")
+
+# Bookmark fields the scraper may fill in when the user didn't provide them
+SCRAPED_FIELDS = ("title", "description", "content", "favicon_url")
+
+T = TypeVar("T")
+
+
+def ingestion_input(data: dict[str, Any]) -> dict[str, Any]:
+    """The user-provided fields of a new bookmark, stored for recovery."""
+    return {name: data[name] for name in SCRAPED_FIELDS if data.get(name)}
+
+
+@dataclass
+class IngestionJob:
+    bookmark_id: str
+    user_id: str
+    url: str
+    # User-provided fields; these always take precedence over scraped data
+    data: dict[str, Any] = field(default_factory=dict)
+    # Re-scrape conditionally against the archived copy's ETag/Last-Modified
+    refresh: bool = False
+    # Re-extract from the archived HTML instead of fetching (no network)
+    from_archive: bool = False
+    # Called by the worker with the final status (e.g. import progress)
+    on_done: Callable[[ProcessingStatus], None] | None = field(default=None, repr=False)
+
+
+async def assign_categories(
+    supabase: AsyncClient,
+    user_id: str,
+    bookmark_id: str,
+    category_names: list[str],
+    replace: bool = False,
+) -> list[str]:
+    """
+    Upsert categories by name and link them to the bookmark in one RPC call.
+
+    With ``replace`` the bookmark's existing links are diffed against the new
+    set: links that are gone are removed, unchanged ones are left alone.
+    Returns the category ids.
+    """
+    response = await supabase.rpc(
+        "assign_bookmark_categories",
+        {
+            "p_bookmark_id": bookmark_id,
+            "p_user_id": user_id,
+            "p_names": category_names,
+            "p_replace": replace,
+        },
+    ).execute()
+    return [row["category_id"] for row in response.data or []]
+
+
+def embedding_text(data: dict[str, Any]) -> str:
+    """Build the text that gets embedded for a bookmark."""
+    fields = ("title", "description", "content")
+    return " ".join(data.get(field) or "" for field in fields)
+
+
+async def _save_progress(
+    supabase: AsyncClient,
+    bookmark_id: str,
+    status: ProcessingStatus,
+    stages: dict[str, StageStatus],
+    fields: dict[str, Any] | None = None,
+) -> None:
+    """Persist processing status (and optionally scraped fields) on the bookmark."""
+    update = {
+        **(fields or {}),
+        "processing_status": status.value,
+        "processing_stages": {name: s.value for name, s in stages.items()},
+    }
+    await supabase.table("bookmarks").update(update).eq("id", bookmark_id).execute()
+
+
+# Caps in-flight LLM/embedding calls across all workers and requests
+ai_limiter = asyncio.Semaphore(settings.ai_concurrency)
+
+
+async def _limited(call: Awaitable[T], timeout: float) -> T:
+    """Await a remote AI call under the shared concurrency cap and a timeout."""
+    async with ai_limiter:
+        return await asyncio.wait_for(call, timeout)
+
+
+async def run_stages(
+    calls: dict[str, Awaitable[Any]],
+) -> dict[str, tuple[StageStatus, Any]]:
+    """Run independent stages concurrently; one failing doesn't cancel the rest."""
+    results = await asyncio.gather(*calls.values(), return_exceptions=True)
+    outcome = {}
+    for name, result in zip(calls, results):
+        if isinstance(result, BaseException):
+            print(f"Stage {name} failed: {result!r}")
+            outcome[name] = (StageStatus.FAILED, None)
+        else:
+            outcome[name] = (StageStatus.COMPLETED, result)
+    return outcome
+
+
+async def generate_summary(content: str) -> str:
+    """Summarize bookmark content (summary stage)."""
+    return await _limited(summarize_content(content), settings.summary_timeout)
+
+
+async def save_embedding(supabase: AsyncClient, bookmark_id: str, text: str) -> None:
+    """Embed text and upsert it into bookmark_embeddings (embed stage)."""
+    embedding = await _limited(get_embedding(text), settings.embedding_timeout)
+    await upsert_embeddings(
+        supabase, [{"bookmark_id": bookmark_id, "embedding": embedding}]
+    )
+
+    # Dual-write to the shadow table while a re-embedding backfill is running
+    if settings.embedding_shadow_table:
+        try:
+            shadow = await _limited(
+                get_embedding(
+                    text,
+                    model=settings.embedding_shadow_model,
+                    dimensions=settings.embedding_shadow_dimensions,
+                ),
+                settings.embedding_timeout,
+            )
+            await upsert_embeddings(
+                supabase,
+                [{"bookmark_id": bookmark_id, "embedding": shadow}],
+                table=settings.embedding_shadow_table,
+            )
+        except Exception as e:
+            print(f"Shadow embedding write failed for {bookmark_id}: {e!r}")
+
+
+async def upsert_embeddings(
+    supabase: AsyncClient,
+    rows: list[dict[str, Any]],
+    table: str = "bookmark_embeddings",
+) -> None:
+    """Write many bookmark embeddings in a single upsert."""
+    if rows:
+        await supabase.table(table).upsert(rows, on_conflict="bookmark_id").execute()
+
+
+async def save_embeddings(
+    supabase: AsyncClient,
+    items: list[tuple[str, str]],
+    table: str = "bookmark_embeddings",
+    model: str | None = None,
+    dimensions: int | None = None,
+    use_cache: bool = True,
+) -> list[str]:
+    """Embed (bookmark_id, text) pairs in batches and upsert them in one write.
+
+    Returns the bookmark ids written; inputs that failed every retry are
+    skipped.
+    """
+    embeddings = await get_embeddings(
+        [text for _, text in items],
+        model=model,
+        dimensions=dimensions,
+        use_cache=use_cache,
+    )
+    rows = [
+        {"bookmark_id": bookmark_id, "embedding": embedding}
+        for (bookmark_id, _), embedding in zip(items, embeddings)
+        if embedding is not None
+    ]
+    await upsert_embeddings(supabase, rows, table=table)
+    return [row["bookmark_id"] for row in rows]
+
+
+async def save_categories(
+    supabase: AsyncClient,
+    user_id: str,
+    bookmark_id: str,
+    data: dict[str, Any],
+    replace: bool = False,
+) -> list[str]:
+    """Generate AI categories and link them to the bookmark (categorize stage)."""
+    categories = await _limited(
+        generate_categories(
+            title=data.get("title") or "",
+            description=data.get("description") or "",
+            content=data.get("content") or "",
+        ),
+        settings.categories_timeout,
+    )
+    await assign_categories(supabase, user_id, bookmark_id, categories, replace=replace)
+    return categories
+
+
+async def scrape_bookmark(
+    supabase: AsyncClient, job: IngestionJob
+) -> ScrapedData | None:
+    """Scrape stage: fetch (or read the archive), parse, archive the raw page.
+
+    Returns None when a conditional re-fetch says the page is unchanged.
+    """
+    if job.from_archive:
+        archive = await load_archive(supabase, job.bookmark_id, with_html=True)
+        if archive is None or archive.html is None:
+            raise ValueError(f"No archived copy of {job.url}")
+        if not archive.truncated:
+            return await parse_page(archive.html, job.url)
+        # Only the start of the page was archived; re-extract from a fresh fetch
+        print(f"Archived copy of {job.url} is truncated, re-fetching")
+        archive = None
+    else:
+        archive = await load_archive(supabase, job.bookmark_id) if job.refresh else None
+    page = await fetch_page(
+        job.url,
+        timeout=settings.scrape_timeout,
+        etag=archive.etag if archive else None,
+        last_modified=archive.last_modified if archive else None,
+    )
+    if page.not_modified:
+        await mark_checked(supabase, job.bookmark_id)
+        return None
+
+    scraped = page.scraped
+    try:
+        await save_archive(supabase, job.bookmark_id, page, scraped.content)
+    except Exception as e:
+        print(f"Archiving failed for {job.url}: {e}")
+    return scraped
+
+
+async def process_bookmark(
+    job: IngestionJob, supabase: AsyncClient
+) -> ProcessingStatus:
+    """Run every ingestion stage for a bookmark and return its final status.
+
+    Scraping runs first; summary, embedding and categories only depend on the
+    scraped text so they are fanned out concurrently afterwards. Stage
+    failures are isolated: a failed scrape still lets the remaining stages
+    run on whatever the user provided. When a refresh finds the page
+    unchanged (HTTP 304) nothing downstream is redone.
+    """
+    stages = {name: StageStatus.PENDING for name in STAGES}
+    data = dict(job.data)
+    stages["scrape"] = StageStatus.RUNNING
+    await _save_progress(supabase, job.bookmark_id, ProcessingStatus.PROCESSING, stages)
+
+    # Scrape URL to extract title, description, content, and favicon
+    fields: dict[str, Any] = {}
+    try:
+        scraped = await scrape_bookmark(supabase, job)
+        if scraped is None:
+            stages["scrape"] = StageStatus.COMPLETED
+            for name in ("summarize", "embed", "categorize"):
+                stages[name] = StageStatus.SKIPPED
+            await _save_progress(
+                supabase, job.bookmark_id, ProcessingStatus.COMPLETED, stages
+            )
+            print(f"Not modified since last scrape: {job.url}")
+            return ProcessingStatus.COMPLETED
+        # Only fill in fields that weren't provided by the user
+        for name in SCRAPED_FIELDS:
+            value = getattr(scraped, name)
+            if not data.get(name) and value:
+                data[name] = fields[name] = value
+        stages["scrape"] = StageStatus.COMPLETED
+        print(f"URL scraped for {job.url} - {scraped.title}")
+    except Exception as e:
+        stages["scrape"] = StageStatus.FAILED
+        print(f"URL scraping failed for {job.url}: {e}")
+
+    calls: dict[str, Awaitable[Any]] = {}
+    if data.get("content"):
+        calls["summarize"] = generate_summary(data["content"])
+    text_for_embedding = embedding_text(data)
+    if text_for_embedding.strip():
+        calls["embed"] = save_embedding(supabase, job.bookmark_id, text_for_embedding)
+    if data.get("title") or data.get("description") or data.get("content"):
+        # A re-scrape replaces the AI categories instead of piling up more
+        calls["categorize"] = save_categories(
+            supabase,
+            job.user_id,
+            job.bookmark_id,
+            data,
+            replace=job.refresh or job.from_archive,
+        )
+    for name in ("summarize", "embed", "categorize"):
+        stages[name] = StageStatus.RUNNING if name in calls else StageStatus.SKIPPED
+    await _save_progress(
+        supabase, job.bookmark_id, ProcessingStatus.PROCESSING, stages, fields
+    )
+
+    outcome = await run_stages(calls)
+    for name, (stage_status, _) in outcome.items():
+        stages[name] = stage_status
+
+    summary_fields = {}
+    summary_status, summary = outcome.get("summarize", (StageStatus.SKIPPED, None))
+    if summary_status == StageStatus.COMPLETED and summary:
+        summary_fields["summary"] = summary
+
+    status = (
+        ProcessingStatus.FAILED
+        if StageStatus.FAILED in stages.values()
+        else ProcessingStatus.COMPLETED
+    )
+    await _save_progress(supabase, job.bookmark_id, status, stages, summary_fields)
+    print(f"Processing {status.value} for id: {job.bookmark_id}")
+    return status
+
+
+class IngestionQueue:
+    """In-process job queue drained by a fixed pool of asyncio workers.
+
+    Jobs are handed out round-robin across the domains of their URLs, with
+    at most ``per_domain_limit`` of a domain's jobs in flight, so a bulk
+    import from one site doesn't occupy every worker.
+    """
+
+    def __init__(self, maxsize: int = 0, per_domain_limit: int = 0):
+        self._maxsize = maxsize
+        self._per_domain_limit = per_domain_limit
+        self._queue: DomainFairQueue[IngestionJob] | None = None
+        self._workers: list[asyncio.Task] = []
+        # Producers waiting for space (deferred jobs, startup recovery)
+        self._pending_puts: set[asyncio.Task] = set()
+
+    @property
+    def queue(self) -> DomainFairQueue[IngestionJob]:
+        if self._queue is None:
+            self._queue = DomainFairQueue(
+                key=lambda job: domain_of(job.url),
+                maxsize=self._maxsize,
+                per_domain_limit=self._per_domain_limit,
+            )
+        return self._queue
+
+    def full(self) -> bool:
+        return self.queue.full()
+
+    def qsize(self) -> int:
+        return self.queue.qsize()
+
+    def enqueue(self, job: IngestionJob) -> None:
+        """Add a job without blocking. Raises asyncio.QueueFull when saturated."""
+        self.queue.put_nowait(job)
+
+    async def put(self, job: IngestionJob) -> None:
+        """Add a job, waiting for space. Used by bulk producers for backpressure."""
+        await self.queue.put(job)
+
+    def defer(self, job: IngestionJob) -> None:
+        """Queue a job once there is space, without blocking the caller."""
+        self._spawn(self.put(job))
+
+    def _spawn(self, coro: Awaitable[Any]) -> None:
+        task = asyncio.create_task(coro)
+        self._pending_puts.add(task)
+        task.add_done_callback(self._pending_puts.discard)
+
+    async def start(self, workers: int, supabase: AsyncClient | None = None) -> None:
+        """Spawn the worker pool. Safe to call once per process.
+
+        With ``supabase``, bookmarks a previous run left pending or processing
+        are re-queued in the background (see ``recover``).
+        """
+        for i in range(workers):
+            self._workers.append(asyncio.create_task(self._worker(i)))
+        if supabase is not None:
+            self._spawn(self.recover(supabase, datetime.now(timezone.utc)))
+
+    async def stop(self) -> None:
+        """Cancel all workers; jobs still queued are dropped.
+
+        Their bookmarks stay pending/processing in the database, so the next
+        start picks them up again.
+        """
+        tasks = [*self._workers, *self._pending_puts]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers.clear()
+        self._pending_puts.clear()
+
+    async def recover(
+        self, supabase: AsyncClient, before: datetime, batch_size: int = 500
+    ) -> int:
+        """Re-queue bookmarks left unfinished by a restart. Returns the count.
+
+        Only rows last updated before ``before`` (this process's start) are
+        taken, so bookmarks created since aren't queued twice. Each batch is
+        claimed atomically by ``claim_unfinished_bookmarks``, so when several
+        worker processes start together every bookmark goes to one of them.
+        Jobs carry the inputs saved with the bookmark (``ingestion_input``),
+        not fields an interrupted run already scraped. Rows are handed over
+        with ``put``, so a large backlog waits for queue space.
+        """
+        recovered = 0
+        last_id = None
+        while True:
+            response = await supabase.rpc(
+                "claim_unfinished_bookmarks",
+                {
+                    "p_before": before.isoformat(),
+                    "p_lease_seconds": settings.ingestion_claim_lease,
+                    "p_limit": batch_size,
+                    "p_after": last_id,
+                },
+            ).execute()
+            rows = response.data or []
+            for row in rows:
+                await self.put(
+                    IngestionJob(
+                        bookmark_id=row["id"],
+                        user_id=row["user_id"],
+                        url=row["url"],
+                        data=row.get("ingestion_input") or {},
+                    )
+                )
+            recovered += len(rows)
+            if len(rows) < batch_size:
+                break
+            last_id = rows[-1]["id"]
+        if recovered:
+            print(f"Re-queued {recovered} unfinished bookmarks")
+        return recovered
+
+    async def join(self) -> None:
+        """Wait until every queued job has been processed."""
+        await self.queue.join()
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job = await self.queue.get()
+            status = ProcessingStatus.FAILED
+            try:
+                status = await process_bookmark(job, await get_supabase_client())
+            except Exception as e:
+                print(f"Ingestion worker {worker_id} failed on {job.bookmark_id}: {e}")
+            finally:
+                if job.on_done is not None:
+                    job.on_done(status)
+                self.queue.task_done(job)
+
+
+ingestion_queue = IngestionQueue(
+    maxsize=settings.ingestion_queue_size,
+    per_domain_limit=settings.scrape_per_domain_concurrency,
+)
@@ -0,0 +1,340 @@
+"""Dead-link checker: keeps ``bookmarks.is_dead`` / ``last_checked_at`` current.
+
+A background loop (started in the app lifespan) picks bookmarks whose link
+hasn't been checked recently, never-checked ones first, and probes them with
+HEAD, falling back to a one-byte ranged GET for servers that reject HEAD.
+Requests go through the pooled HTTP client under a global concurrency cap
+plus a per-domain concurrency cap and token-bucket rate limit, so one big
+site in a library is never hammered. Each batch's results are written back
+with a single RPC call.
+"""
+
+import asyncio
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+from supabase import AsyncClient
+
+from app.core.config import settings
+from app.core.deps import get_supabase_client
+from app.services.http_client import PooledHttpClient, get_http_client
+from app.services.politeness import TokenBucket
+
+# Statuses that mean the page is gone
+DEAD_STATUSES = frozenset({404, 410, 451})
+
+
+def _status_verdict(status_code: int) -> bool | None:
+    """True if the page is gone, None if the response doesn't say (rate
+    limited, server error), False otherwise."""
+    if status_code in DEAD_STATUSES:
+        return True
+    if status_code == 429 or status_code >= 500:
+        return None
+    return False
+
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus style)."""
+
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        cumulative, running = {}, 0
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            running += count
+            cumulative[bound] = running
+        return {"count": self.count, "sum": round(self.sum, 4), "buckets": cumulative}
+
+
+@dataclass
+class LinkCheckMetrics:
+    checked: int = 0
+    dead: int = 0
+    errors: int = 0
+    batches: int = 0
+    last_batch_rate: float = 0.0  # links/second in the most recent batch
+    latency: Histogram = field(default_factory=lambda: Histogram(LATENCY_BUCKETS))
+    batch_duration: Histogram = field(default_factory=lambda: Histogram(BATCH_BUCKETS))
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "checked": self.checked,
+            "dead": self.dead,
+            "errors": self.errors,
+            "batches": self.batches,
+            "last_batch_links_per_second": round(self.last_batch_rate, 2),
+            "latency_seconds": self.latency.snapshot(),
+            "batch_duration_seconds": self.batch_duration.snapshot(),
+        }
+
+
+@dataclass
+class _DomainLimit:
+    slot: asyncio.Semaphore
+    bucket: TokenBucket
+    users: int = 0  # checks holding or waiting for the slot
+
+
+@dataclass
+class LinkCheckResult:
+    bookmark_id: str
+    url: str
+    # None: inconclusive, the stored value is kept and only last_checked_at moves
+    is_dead: bool | None
+    status_code: int | None = None
+    error: str | None = None
+    # The host couldn't be reached. Inconclusive on its own (DNS hiccup, our
+    # own network down); the link is marked dead once it happens repeatedly
+    unreachable: bool = False
+    latency: float = 0.0
+
+
+def _domain(url: str) -> str:
+    try:
+        return urlsplit(url).netloc.lower()
+    except ValueError:
+        # Malformed (e.g. unbalanced IPv6 brackets); the probe reports it
+        return ""
+
+
+async def fetch_stale(
+    supabase: AsyncClient, limit: int, max_age_hours: float
+) -> list[dict]:
+    """Bookmarks due for a check: never checked first, then the oldest checks."""
+    cutoff = (datetime.now(timezone.utc) - timedelta(hours=max_age_hours)).isoformat()
+    response = await (
+        supabase.table("bookmarks")
+        .select("id, url")
+        .or_(f'last_checked_at.is.null,last_checked_at.lt."{cutoff}"')
+        .order("last_checked_at", nullsfirst=True)
+        .limit(limit)
+        .execute()
+    )
+    return response.data or []
+
+
+async def record_results(
+    supabase: AsyncClient, results: list[LinkCheckResult], dead_after: int = 2
+) -> None:
+    """Write a batch of results back in one statement.
+
+    ``dead_after`` is how many unreachable checks in a row mark a link dead.
+    """
+    if not results:
+        return
+    checked_at = datetime.now(timezone.utc).isoformat()
+    await supabase.rpc(
+        "record_link_checks",
+        {
+            "p_results": [
+                {
+                    "id": r.bookmark_id,
+                    "is_dead": r.is_dead,
+                    "unreachable": r.unreachable,
+                    "checked_at": checked_at,
+                }
+                for r in results
+            ],
+            "p_dead_after": dead_after,
+        },
+    ).execute()
+
+
+class LinkChecker:
+    def __init__(
+        self,
+        batch_size: int = 200,
+        concurrency: int = 20,
+        per_domain_concurrency: int = 2,
+        per_domain_rate: float = 1.0,
+        per_domain_burst: int = 2,
+        timeout: float = 10.0,
+        max_age_hours: float = 168.0,
+        dead_after_failures: int = 2,
+        client: PooledHttpClient | None = None,
+    ):
+        self.batch_size = batch_size
+        self.per_domain_concurrency = per_domain_concurrency
+        self.per_domain_rate = per_domain_rate
+        self.per_domain_burst = per_domain_burst
+        self.timeout = timeout
+        self.max_age_hours = max_age_hours
+        self.dead_after_failures = dead_after_failures
+        self.metrics = LinkCheckMetrics()
+        self._client = client
+        self._owns_client = False
+        self._limit = asyncio.Semaphore(concurrency)
+        self._domains: dict[str, _DomainLimit] = {}
+        self._task: asyncio.Task | None = None
+
+    @classmethod
+    def from_settings(cls) -> "LinkChecker":
+        return cls(
+            batch_size=settings.link_check_batch_size,
+            concurrency=settings.link_check_concurrency,
+            per_domain_concurrency=settings.link_check_per_domain_concurrency,
+            per_domain_rate=settings.link_check_per_domain_rate,
+            per_domain_burst=settings.link_check_per_domain_burst,
+            timeout=settings.link_check_timeout,
+            max_age_hours=settings.link_check_max_age_hours,
+            dead_after_failures=settings.link_check_dead_after_failures,
+        )
+
+    @property
+    def client(self) -> PooledHttpClient:
+        if self._client is not None:
+            return self._client
+        shared = get_http_client()
+        if shared is not None:
+            return shared
+        # Outside the app lifespan (e.g. scripts): use a private pool
+        self._client = PooledHttpClient.from_settings()
+        self._owns_client = True
+        return self._client
+
+    async def _probe(self, url: str) -> int:
+        """HEAD the URL; retry as a one-byte ranged GET if HEAD is refused."""
+        response = await self.client.request("HEAD", url, timeout=self.timeout)
+        if response.status_code < 400:
+            return response.status_code
+        # Many servers answer HEAD with 403/404/405 but serve GET fine
+        async with self.client.stream(
+            "GET", url, headers={"Range": "bytes=0-0"}, timeout=self.timeout
+        ) as response:
+            return response.status_code
+
+    async def _check(self, bookmark_id: str, url: str) -> LinkCheckResult:
+        started = time.perf_counter()
+        try:
+            status_code = await self._probe(url)
+            result = LinkCheckResult(
+                bookmark_id,
+                url,
+                is_dead=_status_verdict(status_code),
+                status_code=status_code,
+            )
+        except (httpx.UnsupportedProtocol, httpx.TooManyRedirects) as e:
+            # Not an http(s) link, or a redirect loop: the link is broken
+            result = LinkCheckResult(bookmark_id, url, is_dead=True, error=repr(e))
+        except httpx.ConnectError as e:
+            # DNS failure or refused connection: dead only if it keeps happening
+            result = LinkCheckResult(
+                bookmark_id, url, is_dead=None, error=repr(e), unreachable=True
+            )
+        except Exception as e:
+            # Timeouts, transient errors, and URLs httpx can't even parse
+            # (InvalidURL, IDNAError, ValueError): not enough evidence either
+            # way. Caught broadly so one bad row can't sink the whole batch.
+            result = LinkCheckResult(bookmark_id, url, is_dead=None, error=repr(e))
+            self.metrics.errors += 1
+        result.latency = time.perf_counter() - started
+        return result
+
+    async def check(self, bookmark_id: str, url: str) -> LinkCheckResult:
+        """Check one link under the global and per-domain limits."""
+        domain = _domain(url)
+        limit = self._domains.get(domain)
+        if limit is None:
+            limit = self._domains[domain] = _DomainLimit(
+                asyncio.Semaphore(self.per_domain_concurrency),
+                TokenBucket(self.per_domain_rate, self.per_domain_burst),
+            )
+        # Wait for the domain's turn before taking a global slot, so a
+        # rate-limited domain doesn't hold up checks of other domains
+        limit.users += 1
+        try:
+            async with limit.slot:
+                await limit.bucket.acquire()
+                async with self._limit:
+                    result = await self._check(bookmark_id, url)
+        finally:
+            limit.users -= 1
+            # A batch checks a domain's links together, so its entry lives
+            # for the batch; drop it after that instead of keeping every
+            # domain ever checked
+            if limit.users == 0:
+                del self._domains[domain]
+
+        self.metrics.latency.observe(result.latency)
+        self.metrics.checked += 1
+        self.metrics.dead += result.is_dead is True
+        return result
+
+    async def run_once(self, supabase: AsyncClient) -> int:
+        """Check one batch of stale links. Returns how many were checked."""
+        rows = await fetch_stale(supabase, self.batch_size, self.max_age_hours)
+        if not rows:
+            return 0
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(self.check(row["id"], row["url"]) for row in rows)
+        )
+        await record_results(supabase, list(results), self.dead_after_failures)
+
+        elapsed = time.perf_counter() - started
+        self.metrics.batches += 1
+        self.metrics.batch_duration.observe(elapsed)
+        self.metrics.last_batch_rate = len(results) / elapsed if elapsed else 0.0
+        dead = sum(r.is_dead is True for r in results)
+        print(
+            f"Link check batch: {len(results)} checked, {dead} dead in {elapsed:.1f}s"
+        )
+        return len(results)
+
+    async def run_until_done(self, supabase: AsyncClient) -> int:
+        """Check batches until nothing is stale."""
+        total = 0
+        while True:
+            checked = await self.run_once(supabase)
+            total += checked
+            if checked < self.batch_size:
+                return total
+
+    async def _loop(self, interval: float) -> None:
+        while True:
+            try:
+                await self.run_until_done(await get_supabase_client())
+            except Exception as e:
+                print(f"Link checker run failed: {e}")
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float) -> None:
+        """Run the checker every ``interval`` seconds in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(interval))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._owns_client = False
+
+
+link_checker = LinkChecker.from_settings()
@@ -0,0 +1,81 @@
+"""Keyset (cursor) pagination over bookmarks ordered by (created_at, id) desc.
+
+A cursor is the (created_at, id) of the last row on a page, base64-encoded so
+clients treat it as opaque. The next page is everything strictly after it,
+which the (user_id, created_at, id) index serves without an OFFSET scan.
+"""
+
+import base64
+import binascii
+import json
+from typing import Any
+
+# Lean projection for list views: no content, no AI payloads
+LIST_COLUMNS = (
+    "id",
+    "user_id",
+    "url",
+    "title",
+    "description",
+    "favicon_url",
+    "is_favorite",
+    "processing_status",
+    "created_at",
+    "updated_at",
+)
+
+# Heavier columns a client may opt into with ?fields=
+OPTIONAL_COLUMNS = (
+    "content",
+    "summary",
+    "key_points",
+    "notes",
+    "is_archived",
+    "is_dead",
+    "last_checked_at",
+    "last_visited_at",
+    "processing_stages",
+)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(row: dict[str, Any]) -> str:
+    """Opaque cursor pointing just past ``row``."""
+    raw = json.dumps([row["created_at"], row["id"]]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """Inverse of encode_cursor. Raises InvalidCursor on anything malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(created_at, str) or not isinstance(row_id, str):
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+    return created_at, row_id
+
+
+def select_columns(fields: list[str] | None = None) -> str:
+    """PostgREST select string: the lean list columns plus requested extras."""
+    extras = [f for f in fields or [] if f not in LIST_COLUMNS]
+    unknown = [f for f in extras if f not in OPTIONAL_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return ", ".join([*LIST_COLUMNS, *dict.fromkeys(extras)])
+
+
+def apply_keyset(query, cursor: str | None):
+    """Order a bookmarks query newest-first and start it after ``cursor``."""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        # (created_at, id) < (cursor.created_at, cursor.id), spelled for PostgREST
+        query = query.or_(
+            f'created_at.lt."{created_at}",'
+            f'and(created_at.eq."{created_at}",id.lt."{row_id}")'
+        )
+    return query.order("created_at", desc=True).order("id", desc=True)
@@ -0,0 +1,107 @@
+"""Process pool for HTML extraction.
+
+Parsing and walking a large page is pure CPU work; done on the event loop it
+stalls every other request served by the same worker. When the pool is
+running (started in the app lifespan, sized by ``PARSE_WORKERS``), fetched
+pages are handed to worker processes as raw bytes, which pickle cheaply, and
+come back as a plain dict of extracted fields.
+
+Outside the lifespan (scripts, tests) or with ``PARSE_WORKERS=0`` nothing is
+started and callers parse in-process.
+"""
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any
+
+from app.core.config import settings
+from app.services.extractor import extract
+
+
+@dataclass
+class ParsePoolMetrics:
+    pages: int = 0
+    bytes: int = 0
+    in_flight: int = 0
+    failures: int = 0
+    restarts: int = 0
+    time_total: float = 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "pages": self.pages,
+            "bytes": self.bytes,
+            "in_flight": self.in_flight,
+            "failures": self.failures,
+            "restarts": self.restarts,
+            "parse_time_avg_ms": (
+                self.time_total / self.pages * 1000 if self.pages else 0.0
+            ),
+        }
+
+
+class ParsePool:
+    def __init__(self, workers: int = 2):
+        self.workers = workers
+        self.metrics = ParsePoolMetrics()
+        self._executor: ProcessPoolExecutor | None = None
+
+    @classmethod
+    def from_settings(cls) -> "ParsePool":
+        return cls(workers=settings.parse_workers)
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn, not fork: forking a process that runs an event loop and
+        # client threads can deadlock the child
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def start(self) -> None:
+        if self._executor is None and self.workers > 0:
+            self._executor = self._new_executor()
+
+    async def stop(self) -> None:
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    async def extract(
+        self, body: bytes, url: str, encoding: str = "utf-8"
+    ) -> dict[str, Any]:
+        """Extract a page in a worker process (in-process if the pool isn't running)."""
+        if self._executor is None:
+            return extract(body, url, encoding)
+
+        executor = self._executor
+        self.metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(executor, extract, body, url, encoding)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory on a pathological page);
+            # replace the pool once so later pages aren't failed too
+            self.metrics.failures += 1
+            if self._executor is executor:
+                self.metrics.restarts += 1
+                self._executor = self._new_executor()
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            self.metrics.in_flight -= 1
+        self.metrics.pages += 1
+        self.metrics.bytes += len(body)
+        self.metrics.time_total += time.perf_counter() - started
+        return result
+
+
+parse_pool = ParsePool.from_settings()
@@ -0,0 +1,414 @@
+"""Per-domain politeness for page fetches.
+
+Scraping goes through ``PolitenessScheduler`` (enabled in the app lifespan):
+
+* each domain gets a token bucket, slowed down further by a ``Crawl-delay``
+  in its robots.txt, and URLs robots.txt disallows are not fetched;
+* robots.txt is fetched once per origin and cached;
+* a 429/503 puts the domain into exponential backoff (at least as long as
+  its ``Retry-After``), and the fetch is retried once the backoff is over,
+  unless that is too far away to keep a worker waiting for.
+
+``DomainFairQueue`` feeds the ingestion workers round-robin across domains,
+with a cap on jobs in flight per domain, so a bulk import from one site
+waits on that site's rate limit without holding up everyone else's saves.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Generic, TypeVar
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+
+from app.core.config import settings
+from app.services.http_client import get_http_client
+
+T = TypeVar("T")
+
+# Statuses that mean "slow down" rather than "this page is broken"
+THROTTLE_STATUSES = frozenset({429, 503})
+
+# How long an unreachable robots.txt (5xx, network error) is cached
+ROBOTS_ERROR_TTL = 300.0
+MAX_CACHED_ROBOTS = 10000
+# Domains whose rate-limit/backoff state is kept (least recently used dropped)
+MAX_TRACKED_DOMAINS = 10000
+
+
+class RobotsDisallowed(Exception):
+    """robots.txt doesn't allow fetching this URL."""
+
+
+class RateLimited(Exception):
+    """The domain asked us to back off for longer than we'll wait."""
+
+
+def domain_of(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """Allows ``rate`` acquisitions per second with bursts up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def slow_down(self, rate: float) -> None:
+        """Lower the rate (never raise it) and stop allowing bursts."""
+        self.rate = min(self.rate, rate)
+        self.capacity = 1
+        self.tokens = min(self.tokens, 1.0)
+
+    async def acquire(self) -> None:
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+@dataclass
+class _RobotsEntry:
+    parser: RobotFileParser
+    expires: float
+
+
+class RobotsCache:
+    """robots.txt per origin, fetched on first use and kept for ``ttl`` seconds."""
+
+    def __init__(self, user_agent: str, ttl: float = 86400.0, timeout: float = 5.0):
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.timeout = timeout
+        self.fetches = 0
+        self._entries: OrderedDict[str, _RobotsEntry] = OrderedDict()
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def _download(self, robots_url: str) -> httpx.Response:
+        pooled = get_http_client()
+        if pooled is not None:
+            return await pooled.get(robots_url, timeout=self.timeout)
+        async with httpx.AsyncClient(
+            follow_redirects=True, timeout=self.timeout
+        ) as client:
+            return await client.get(robots_url)
+
+    async def _fetch(self, origin: str) -> _RobotsEntry:
+        self.fetches += 1
+        parser = RobotFileParser(f"{origin}/robots.txt")
+        ttl = self.ttl
+        try:
+            response = await self._download(f"{origin}/robots.txt")
+            if response.status_code >= 500:
+                raise httpx.HTTPStatusError(
+                    "robots.txt unavailable",
+                    request=response.request,
+                    response=response,
+                )
+            # Any 4xx (including 401/403) means there are no rules (RFC 9309)
+            parser.parse(
+                response.text.splitlines() if response.status_code < 400 else []
+            )
+        except httpx.HTTPError as e:
+            # We fetch pages a user chose to save, so an unreachable robots.txt
+            # doesn't block them; ask again soon
+            print(f"robots.txt unavailable for {origin}: {e!r}")
+            parser.parse([])
+            ttl = ROBOTS_ERROR_TTL
+        return _RobotsEntry(parser, time.monotonic() + ttl)
+
+    async def get(self, url: str) -> RobotFileParser:
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}".lower()
+        entry = self._entries.get(origin)
+        if entry is None or entry.expires <= time.monotonic():
+            # One fetch per origin, however many of its pages are waiting
+            lock = self._locks.setdefault(origin, asyncio.Lock())
+            async with lock:
+                entry = self._entries.get(origin)
+                if entry is None or entry.expires <= time.monotonic():
+                    entry = self._entries[origin] = await self._fetch(origin)
+            self._locks.pop(origin, None)
+        self._entries.move_to_end(origin)
+        while len(self._entries) > MAX_CACHED_ROBOTS:
+            self._entries.popitem(last=False)
+        return entry.parser
+
+    async def allowed(self, url: str) -> tuple[bool, float | None]:
+        """Whether ``url`` may be fetched, and the origin's crawl delay if any."""
+        parser = await self.get(url)
+        delay = parser.crawl_delay(self.user_agent)
+        return parser.can_fetch(self.user_agent, url), float(delay) if delay else None
+
+
+@dataclass
+class _DomainState:
+    bucket: TokenBucket
+    failures: int = 0
+    blocked_until: float = 0.0
+
+
+@dataclass
+class PolitenessMetrics:
+    requests: int = 0
+    throttled: int = 0
+    retries: int = 0
+    disallowed: int = 0
+    rate_limited: int = 0
+    wait_time_total: float = 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "disallowed": self.disallowed,
+            "rate_limited": self.rate_limited,
+            "wait_time_avg_ms": (
+                self.wait_time_total / self.requests * 1000 if self.requests else 0.0
+            ),
+        }
+
+
+class PolitenessScheduler:
+    def __init__(
+        self,
+        rate: float = 1.0,
+        burst: int = 3,
+        respect_robots: bool = True,
+        user_agent: str = "*",
+        robots_ttl: float = 86400.0,
+        max_retries: int = 3,
+        backoff_base: float = 2.0,
+        backoff_max: float = 60.0,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.respect_robots = respect_robots
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.robots = RobotsCache(user_agent, ttl=robots_ttl)
+        self.metrics = PolitenessMetrics()
+        self.active = False
+        self._domains: OrderedDict[str, _DomainState] = OrderedDict()
+
+    @classmethod
+    def from_settings(cls) -> "PolitenessScheduler":
+        return cls(
+            rate=settings.scrape_per_domain_rate,
+            burst=settings.scrape_per_domain_burst,
+            respect_robots=settings.scrape_respect_robots,
+            user_agent=settings.robots_user_agent,
+            robots_ttl=settings.robots_cache_ttl,
+            max_retries=settings.scrape_max_retries,
+            backoff_base=settings.scrape_backoff_base,
+            backoff_max=settings.scrape_backoff_max,
+        )
+
+    def start(self) -> None:
+        self.active = True
+
+    def stop(self) -> None:
+        self.active = False
+        self._domains.clear()
+
+    def _state(self, url: str) -> _DomainState:
+        domain = domain_of(url)
+        state = self._domains.get(domain)
+        if state is None:
+            state = self._domains[domain] = _DomainState(
+                TokenBucket(self.rate, self.burst)
+            )
+            while len(self._domains) > MAX_TRACKED_DOMAINS:
+                self._domains.popitem(last=False)
+        else:
+            self._domains.move_to_end(domain)
+        return state
+
+    async def wait_turn(self, url: str) -> None:
+        """Wait until ``url`` may be requested: robots rules, backoff, rate limit."""
+        started = time.perf_counter()
+        state = self._state(url)
+        if self.respect_robots:
+            allowed, crawl_delay = await self.robots.allowed(url)
+            if not allowed:
+                self.metrics.disallowed += 1
+                raise RobotsDisallowed(f"Disallowed by robots.txt: {url}")
+            if crawl_delay:
+                state.bucket.slow_down(1 / crawl_delay)
+
+        blocked = state.blocked_until - time.monotonic()
+        if blocked > self.backoff_max:
+            self.metrics.rate_limited += 1
+            raise RateLimited(
+                f"{domain_of(url)} asked us to back off for {blocked:.0f}s"
+            )
+        if blocked > 0:
+            await asyncio.sleep(blocked)
+        await state.bucket.acquire()
+        self.metrics.requests += 1
+        self.metrics.wait_time_total += time.perf_counter() - started
+
+    def record(
+        self, url: str, status_code: int, retry_after: str | None = None
+    ) -> float | None:
+        """Note a response. For 429/503, start backing off and return the delay."""
+        state = self._state(url)
+        if status_code not in THROTTLE_STATUSES:
+            state.failures = 0
+            return None
+        self.metrics.throttled += 1
+        delay = self.backoff_base * 2**state.failures
+        state.failures += 1
+        requested = parse_retry_after(retry_after)
+        if requested is not None:
+            delay = max(delay, requested)
+        state.blocked_until = max(state.blocked_until, time.monotonic() + delay)
+        return delay
+
+    async def run(self, url: str, fetch: Callable[[], Any]) -> Any:
+        """Call ``fetch`` politely, retrying after 429/503 with backoff."""
+        attempt = 0
+        while True:
+            await self.wait_turn(url)
+            try:
+                result = await fetch()
+            except httpx.HTTPStatusError as e:
+                response = e.response
+                delay = self.record(
+                    url, response.status_code, response.headers.get("retry-after")
+                )
+                if delay is None or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self.metrics.retries += 1
+                print(f"{response.status_code} from {url}, retrying in {delay:.1f}s")
+                continue
+            self.record(url, getattr(result, "status_code", 200))
+            return result
+
+
+class DomainFairQueue(Generic[T]):
+    """Bounded queue handing out items round-robin across domains.
+
+    At most ``per_domain_limit`` items per domain are out at once (0 = no
+    cap); ``task_done(item)`` returns the slot. Mirrors the parts of
+    ``asyncio.Queue`` the ingestion workers use.
+    """
+
+    def __init__(
+        self,
+        key: Callable[[T], str],
+        maxsize: int = 0,
+        per_domain_limit: int = 0,
+    ):
+        self.key = key
+        self.maxsize = maxsize
+        self.per_domain_limit = per_domain_limit
+        # Insertion order is the round-robin order; a served domain moves to the back
+        self._pending: OrderedDict[str, deque[T]] = OrderedDict()
+        self._active: dict[str, int] = {}
+        self._size = 0
+        self._unfinished = 0
+        self._changed = asyncio.Event()
+        self._all_done = asyncio.Event()
+        self._all_done.set()
+
+    def qsize(self) -> int:
+        return self._size
+
+    def full(self) -> bool:
+        return 0 < self.maxsize <= self._size
+
+    def put_nowait(self, item: T) -> None:
+        if self.full():
+            raise asyncio.QueueFull
+        self._pending.setdefault(self.key(item), deque()).append(item)
+        self._size += 1
+        self._unfinished += 1
+        self._all_done.clear()
+        self._changed.set()
+
+    async def put(self, item: T) -> None:
+        while self.full():
+            self._changed.clear()
+            await self._changed.wait()
+        self.put_nowait(item)
+
+    def _pop_ready(self) -> T | None:
+        for key, items in self._pending.items():
+            if (
+                not self.per_domain_limit
+                or self._active.get(key, 0) < self.per_domain_limit
+            ):
+                break
+        else:
+            return None
+        item = items.popleft()
+        if items:
+            self._pending.move_to_end(key)
+        else:
+            del self._pending[key]
+        self._active[key] = self._active.get(key, 0) + 1
+        self._size -= 1
+        self._changed.set()  # space freed for producers
+        return item
+
+    async def get(self) -> T:
+        while (item := self._pop_ready()) is None:
+            self._changed.clear()
+            await self._changed.wait()
+        return item
+
+    def task_done(self, item: T) -> None:
+        key = self.key(item)
+        remaining = self._active.get(key, 0) - 1
+        if remaining > 0:
+            self._active[key] = remaining
+        else:
+            self._active.pop(key, None)
+        self._unfinished -= 1
+        if self._unfinished <= 0:
+            self._all_done.set()
+        self._changed.set()  # a domain slot freed up
+
+    async def join(self) -> None:
+        await self._all_done.wait()
+
+
+politeness = PolitenessScheduler.from_settings()
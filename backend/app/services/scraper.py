@@ -1,7 +1,17 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from functools import partial
+
 import httpx
-from bs4 import BeautifulSoup
 from pydantic import BaseModel
 
+from app.core.config import settings
+from app.services.extractor import PageExtractor, TextCounter, sniff_encoding
+from app.services.http_client import get_http_client
+from app.services.parse_pool import parse_pool
+from app.services.politeness import politeness
+
 
 class ScrapedData(BaseModel):
     title: str | None = None
@@ -10,6 +20,181 @@ class ScrapedData(BaseModel):
     favicon_url: str | None = None
 
 
+REQUEST_HEADERS = {
+    # Identify as the crawler robots.txt rules are checked for
+    "User-Agent": settings.scrape_user_agent,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+}
+
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+
+class UnsupportedContentType(ValueError):
+    """The URL doesn't serve an HTML page (PDF, image, binary download, ...)."""
+
+
+@dataclass
+class FetchedPage:
+    """Raw result of fetching a page, including its cache validators."""
+
+    url: str
+    status_code: int
+    body: bytes | None = None
+    encoding: str = "utf-8"
+    content_type: str | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+    # Download stopped before the end of the body (byte cap, or enough text)
+    truncated: bool = False
+    scraped: ScrapedData | None = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status_code == 304
+
+    @property
+    def text(self) -> str | None:
+        if self.body is None:
+            return None
+        return self.body.decode(self.encoding, errors="replace")
+
+
+def _is_html(content_type: str | None) -> bool:
+    # A missing Content-Type is given the benefit of the doubt
+    if not content_type:
+        return True
+    return content_type.split(";")[0].strip().lower() in HTML_CONTENT_TYPES
+
+
+@asynccontextmanager
+async def _stream(
+    url: str, headers: dict[str, str], timeout: float
+) -> AsyncIterator[httpx.Response]:
+    # Reuse the lifespan-managed connection pool when running inside the app
+    pooled = get_http_client()
+    if pooled is not None:
+        async with pooled.stream(
+            "GET", url, headers=headers, timeout=timeout
+        ) as response:
+            yield response
+    else:
+        async with httpx.AsyncClient(follow_redirects=True, timeout=timeout) as client:
+            async with client.stream("GET", url, headers=headers) as response:
+                yield response
+
+
+async def fetch_page(
+    url: str,
+    timeout: float = 10.0,
+    etag: str | None = None,
+    last_modified: str | None = None,
+    max_bytes: int | None = None,
+) -> FetchedPage:
+    """
+    Stream a page and extract title, description, content and favicon.
+
+    Non-HTML responses are rejected from their headers, before any body is
+    read, and reading stops at ``max_bytes``. When the parse pool is running
+    the raw body is extracted in a worker process; otherwise it is fed to an
+    incremental parser while it downloads. Either way reading stops as soon
+    as enough body text has arrived (counted cheaply on the loop when the
+    pool does the parsing).
+
+    Inside the app, requests go through the politeness scheduler: robots.txt
+    and per-domain rate limits are respected, and 429/503 responses are
+    retried with backoff.
+
+    Sends a conditional request when validators from a previous fetch are
+    given; a 304 comes back with ``not_modified`` set and no body.
+    """
+    fetch = partial(_fetch_page, url, timeout, etag, last_modified, max_bytes)
+    if not politeness.active:
+        return await fetch()
+    return await politeness.run(url, fetch)
+
+
+async def _fetch_page(
+    url: str,
+    timeout: float,
+    etag: str | None,
+    last_modified: str | None,
+    max_bytes: int | None,
+) -> FetchedPage:
+    max_bytes = max_bytes or settings.scrape_max_bytes
+    headers = dict(REQUEST_HEADERS)
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    async with _stream(url, headers, timeout) as response:
+        # Checked first: httpx counts 304 as an error status
+        if response.status_code == 304:
+            return FetchedPage(
+                url=url,
+                status_code=304,
+                etag=response.headers.get("etag") or etag,
+                last_modified=response.headers.get("last-modified") or last_modified,
+            )
+        response.raise_for_status()
+
+        content_type = response.headers.get("content-type")
+        if not _is_html(content_type):
+            raise UnsupportedContentType(f"Not an HTML page ({content_type}): {url}")
+
+        body = bytearray()
+        truncated = False
+        extractor: PageExtractor | None = None
+        progress: PageExtractor | TextCounter | None = None
+        encoding = "utf-8"
+        async for chunk in response.aiter_bytes():
+            if not chunk:
+                continue
+            if progress is None:
+                encoding = sniff_encoding(content_type, chunk)
+                # Without a parse pool, extract on the loop while downloading;
+                # with one, only count text so the download still stops early
+                if parse_pool.running:
+                    progress = TextCounter(encoding=encoding)
+                else:
+                    progress = extractor = PageExtractor(encoding=encoding)
+            elif progress.done or len(body) >= max_bytes:
+                # Enough already and the server has more: stop reading
+                truncated = True
+                break
+            truncated = len(chunk) > max_bytes - len(body)
+            chunk = chunk[: max_bytes - len(body)]
+            body += chunk
+            progress.feed(chunk)
+            if truncated:
+                break
+
+        page = FetchedPage(
+            url=url,
+            status_code=response.status_code,
+            body=bytes(body),
+            encoding=encoding,
+            content_type=content_type,
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
+            truncated=truncated,
+        )
+
+    if extractor is not None:
+        page.scraped = ScrapedData(**extractor.result(url))
+    else:
+        # Raw bytes go to a worker process; the loop only waits for the result
+        page.scraped = ScrapedData(**await parse_pool.extract(page.body, url, encoding))
+    return page
+
+
+async def parse_page(html: str, url: str) -> ScrapedData:
+    """Extract title, description, content, and favicon from page HTML."""
+    return ScrapedData(**await parse_pool.extract(html.encode("utf-8"), url))
+
+
 async def scrape_url(url: str, timeout: float = 10.0) -> ScrapedData:
     """
     Scrape a URL and extract title, description, content, and favicon.
@@ -21,124 +206,5 @@ async def scrape_url(url: str, timeout: float = 10.0) -> ScrapedData:
     Returns:
         ScrapedData with extracted information
     """
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.5",
-    }
-
-    async with httpx.AsyncClient(follow_redirects=True, timeout=timeout) as client:
-        response = await client.get(url, headers=headers)
-        response.raise_for_status()
-
-    soup = BeautifulSoup(response.text, "lxml")
-
-    title = _extract_title(soup)
-    description = _extract_description(soup)
-    content = _extract_content(soup)
-    favicon_url = _extract_favicon(soup, url)
-
-    return ScrapedData(
-        title=title,
-        description=description,
-        content=content,
-        favicon_url=favicon_url,
-    )
-
-
-def _extract_title(soup: BeautifulSoup) -> str | None:
-    """Extract title from page, preferring og:title over <title>."""
-    # Try Open Graph title first
-    og_title = soup.find("meta", property="og:title")
-    if og_title and og_title.get("content"):
-        return og_title["content"].strip()
-
-    # Try Twitter title
-    twitter_title = soup.find("meta", attrs={"name": "twitter:title"})
-    if twitter_title and twitter_title.get("content"):
-        return twitter_title["content"].strip()
-
-    # Fall back to <title> tag
-    title_tag = soup.find("title")
-    if title_tag and title_tag.string:
-        return title_tag.string.strip()
-
-    return None
-
-
-def _extract_description(soup: BeautifulSoup) -> str | None:
-    """Extract description from meta tags."""
-    # Try Open Graph description
-    og_desc = soup.find("meta", property="og:description")
-    if og_desc and og_desc.get("content"):
-        return og_desc["content"].strip()
-
-    # Try Twitter description
-    twitter_desc = soup.find("meta", attrs={"name": "twitter:description"})
-    if twitter_desc and twitter_desc.get("content"):
-        return twitter_desc["content"].strip()
-
-    # Try standard meta description
-    meta_desc = soup.find("meta", attrs={"name": "description"})
-    if meta_desc and meta_desc.get("content"):
-        return meta_desc["content"].strip()
-
-    return None
-
-
-def _extract_content(soup: BeautifulSoup) -> str | None:
-    """Extract main text content from the page."""
-    # Remove script, style, and other non-content elements
-    for element in soup(["script", "style", "nav", "header", "footer", "aside", "noscript"]):
-        element.decompose()
-
-    # Try to find main content area
-    main_content = (
-        soup.find("main")
-        or soup.find("article")
-        or soup.find("div", class_=lambda x: x and "content" in x.lower() if x else False)
-        or soup.find("div", id=lambda x: x and "content" in x.lower() if x else False)
-        or soup.body
-    )
-
-    if not main_content:
-        return None
-
-    # Get text and clean it up
-    text = main_content.get_text(separator=" ", strip=True)
-
-    # Normalize whitespace
-    text = " ".join(text.split())
-
-    # Limit content length to avoid storing huge amounts of text
-    max_length = 50000
-    if len(text) > max_length:
-        text = text[:max_length] + "..."
-
-    return text if text else None
-
-
-def _extract_favicon(soup: BeautifulSoup, url: str) -> str | None:
-    """Extract favicon URL from the page."""
-    from urllib.parse import urljoin
-
-    # Try various favicon link tags
-    favicon_selectors = [
-        ("link", {"rel": "icon"}),
-        ("link", {"rel": "shortcut icon"}),
-        ("link", {"rel": "apple-touch-icon"}),
-        ("link", {"rel": "apple-touch-icon-precomposed"}),
-    ]
-
-    for tag, attrs in favicon_selectors:
-        link = soup.find(tag, attrs)
-        if link and link.get("href"):
-            href = link["href"]
-            # Handle relative URLs
-            return urljoin(url, href)
-
-    # Fall back to /favicon.ico
-    from urllib.parse import urlparse
-
-    parsed = urlparse(url)
-    return f"{parsed.scheme}://{parsed.netloc}/favicon.ico"
+    page = await fetch_page(url, timeout=timeout)
+    return page.scraped
@@ -1,9 +1,18 @@
-"""Hybrid search service combining semantic and category-based search."""
+"""Hybrid search service combining semantic, category and full-text search."""
 
-from supabase import Client
+import asyncio
+from collections.abc import Awaitable
 
-from app.models.bookmark import HybridSearchResponse, SearchMode
+from supabase import AsyncClient
+
+from app.core.config import settings
+from app.models.bookmark import (
+    FusionConfig,
+    HybridSearchResponse,
+    SearchMode,
+)
 from app.services.embedding import get_embedding
+from app.services.fusion import RankedList, fuse
 
 
 def _tokenize_query(query: str) -> list[str]:
@@ -11,65 +20,99 @@ def _tokenize_query(query: str) -> list[str]:
     return [term.strip().lower() for term in query.split() if term.strip()]
 
 
+def _resolve_fusion(fusion: FusionConfig | None, limit: int) -> FusionConfig:
+    """Fill unset fusion fields from settings and cap the candidate budgets."""
+    fusion = fusion or FusionConfig()
+    cap = settings.search_max_candidates
+
+    def candidates(requested: int | None, default: int) -> int:
+        return min(requested or default or limit * 2, cap)
+
+    return FusionConfig(
+        method=fusion.method or settings.search_fusion_method,
+        rrf_k=fusion.rrf_k or settings.search_rrf_k,
+        semantic_weight=(
+            settings.search_semantic_weight
+            if fusion.semantic_weight is None
+            else fusion.semantic_weight
+        ),
+        category_weight=(
+            settings.search_category_weight
+            if fusion.category_weight is None
+            else fusion.category_weight
+        ),
+        semantic_candidates=candidates(
+            fusion.semantic_candidates, settings.search_semantic_candidates
+        ),
+        category_candidates=candidates(
+            fusion.category_candidates, settings.search_category_candidates
+        ),
+        text_weight=(
+            settings.search_text_weight
+            if fusion.text_weight is None
+            else fusion.text_weight
+        ),
+        text_candidates=candidates(
+            fusion.text_candidates, settings.search_text_candidates
+        ),
+    )
+
+
+async def _semantic_source(
+    query: str,
+    user_id: str,
+    supabase: AsyncClient,
+    semantic_threshold: float,
+    match_count: int,
+):
+    """Nearest bookmarks by embedding, through the EMBEDDING_SEARCH_INDEX index."""
+    query_embedding = await get_embedding(query)
+    params = {
+        "query_embedding": query_embedding,
+        "match_threshold": semantic_threshold,
+        "match_count": match_count,
+        "p_user_id": user_id,
+        "ef_search": settings.search_ef_search,
+    }
+    if settings.embedding_search_index == "full":
+        return await supabase.rpc("search_bookmarks", params).execute()
+
+    # First pass on the halfvec/binary index, exact re-ranking in the RPC
+    return await supabase.rpc(
+        "search_bookmarks_quantized",
+        {
+            **params,
+            "index_mode": settings.embedding_search_index,
+            "rerank_factor": settings.embedding_rerank_factor,
+        },
+    ).execute()
+
+
 async def hybrid_search(
     query: str,
     user_id: str,
-    supabase: Client,
+    supabase: AsyncClient,
     limit: int = 20,
     semantic_threshold: float = 0.5,
     mode: SearchMode = SearchMode.HYBRID,
+    fusion: FusionConfig | None = None,
 ) -> list[HybridSearchResponse]:
     """
     Perform search based on the specified mode.
 
-    - KEYWORD mode: calls search_by_categories() RPC (no embedding)
-    - SEMANTIC mode: calls existing search_bookmarks() RPC
-    - HYBRID mode: calls hybrid_search_bookmarks() RPC
-    """
-    query_terms = _tokenize_query(query)
-
-    if mode == SearchMode.KEYWORD:
-        # Category-only search - no embedding needed
-        response = supabase.rpc(
-            "search_by_categories",
-            {
-                "query_terms": query_terms,
-                "p_user_id": user_id,
-                "match_count": limit,
-            },
-        ).execute()
-
-        return [
-            HybridSearchResponse(
-                id=row["id"],
-                url=row["url"],
-                title=row.get("title"),
-                description=row.get("description"),
-                summary=row.get("summary"),
-                favicon_url=row.get("favicon_url"),
-                created_at=row.get("created_at"),
-                semantic_score=0.0,
-                category_score=row.get("category_score", 0.0),
-                rrf_score=row.get("category_score", 0.0),  # Use category score as rank
-                matched_categories=row.get("matched_categories", []),
-            )
-            for row in (response.data or [])
-        ]
-
-    # For SEMANTIC and HYBRID modes, we need the query embedding
-    query_embedding = await get_embedding(query)
+    - SEMANTIC mode: calls search_bookmarks() (or search_bookmarks_quantized()
+      when EMBEDDING_SEARCH_INDEX is halfvec/binary)
+    - KEYWORD mode: search_by_categories() and, with SEARCH_FULL_TEXT, the
+      search_bookmarks_text() full-text RPC (no embedding)
+    - HYBRID mode: the keyword sources plus the semantic one
 
+    Each source is capped at its candidate budget and the lists are merged
+    with the configured fusion method.
+    """
     if mode == SearchMode.SEMANTIC:
-        # Semantic-only search using existing RPC
-        response = supabase.rpc(
-            "search_bookmarks",
-            {
-                "query_embedding": query_embedding,
-                "match_threshold": semantic_threshold,
-                "match_count": limit,
-                "p_user_id": user_id,
-            },
-        ).execute()
+        response = await _semantic_source(
+            query, user_id, supabase, semantic_threshold, limit
+        )
 
         return [
             HybridSearchResponse(
@@ -88,31 +131,92 @@ async def hybrid_search(
             for row in (response.data or [])
         ]
 
-    # HYBRID mode - combine semantic and category search
-    response = supabase.rpc(
-        "hybrid_search_bookmarks",
-        {
-            "query_embedding": query_embedding,
-            "query_terms": query_terms,
-            "p_user_id": user_id,
-            "semantic_threshold": semantic_threshold,
-            "match_count": limit,
-        },
-    ).execute()
+    # KEYWORD and HYBRID - each source is its own bounded query, all run
+    # concurrently (the semantic one after its embedding) and fused here
+    fusion = _resolve_fusion(fusion, limit)
+    sources: list[tuple[str, str, float, Awaitable]] = []
+
+    if mode == SearchMode.HYBRID:
+        sources.append(
+            (
+                "semantic",
+                "similarity",
+                fusion.semantic_weight,
+                _semantic_source(
+                    query,
+                    user_id,
+                    supabase,
+                    semantic_threshold,
+                    fusion.semantic_candidates,
+                ),
+            )
+        )
+    sources.append(
+        (
+            "category",
+            "category_score",
+            fusion.category_weight,
+            supabase.rpc(
+                "search_by_categories",
+                {
+                    "query_terms": _tokenize_query(query),
+                    "p_user_id": user_id,
+                    "match_count": fusion.category_candidates,
+                },
+            ).execute(),
+        )
+    )
+    if settings.search_full_text:
+        sources.append(
+            (
+                "text",
+                "text_score",
+                fusion.text_weight,
+                supabase.rpc(
+                    "search_bookmarks_text",
+                    {
+                        "query_text": query,
+                        "p_user_id": user_id,
+                        "match_count": fusion.text_candidates,
+                    },
+                ).execute(),
+            )
+        )
+
+    # One failing source (embedding API down, a slow RPC) degrades the
+    # results to the other sources instead of failing the whole search
+    responses = await asyncio.gather(
+        *(pending for *_, pending in sources), return_exceptions=True
+    )
+    ranked = []
+    for (name, score_key, weight, _), response in zip(sources, responses):
+        if isinstance(response, Exception):
+            print(f"Search source {name} failed: {response!r}")
+            continue
+        ranked.append(RankedList(name, response.data or [], score_key, weight))
+    if not ranked:
+        raise responses[0]
+    hits = fuse(
+        ranked,
+        method=fusion.method,
+        rrf_k=fusion.rrf_k,
+        limit=limit,
+    )
 
     return [
         HybridSearchResponse(
-            id=row["id"],
-            url=row["url"],
-            title=row.get("title"),
-            description=row.get("description"),
-            summary=row.get("summary"),
-            favicon_url=row.get("favicon_url"),
-            created_at=row.get("created_at"),
-            semantic_score=row.get("semantic_score", 0.0),
-            category_score=row.get("category_score", 0.0),
-            rrf_score=row.get("rrf_score", 0.0),
-            matched_categories=row.get("matched_categories", []),
+            id=hit.row["id"],
+            url=hit.row["url"],
+            title=hit.row.get("title"),
+            description=hit.row.get("description"),
+            summary=hit.row.get("summary"),
+            favicon_url=hit.row.get("favicon_url"),
+            created_at=hit.row.get("created_at"),
+            semantic_score=hit.source_scores.get("semantic", 0.0),
+            category_score=hit.source_scores.get("category", 0.0),
+            text_score=hit.source_scores.get("text", 0.0),
+            rrf_score=hit.score,  # The fused score, whichever method produced it
+            matched_categories=hit.row.get("matched_categories") or [],
         )
-        for row in (response.data or [])
+        for hit in hits
     ]
@@ -1,5 +1,7 @@
+import threading
 from datetime import datetime, timezone
-from unittest.mock import MagicMock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from fastapi.testclient import TestClient
@@ -10,10 +12,19 @@ from app.main import app
 TEST_USER_ID = "test-user-123"
 
 
+class SupabaseMock(MagicMock):
+    """MagicMock with an awaitable ``execute()`` on query builders, like AsyncClient."""
+
+    def _get_child_mock(self, /, **kwargs):
+        if kwargs.get("name") == "execute":
+            return AsyncMock(**kwargs)
+        return SupabaseMock(**kwargs)
+
+
 @pytest.fixture
 def mock_supabase():
     """Create a mock Supabase client."""
-    return MagicMock()
+    return SupabaseMock()
 
 
 @pytest.fixture
@@ -50,3 +61,50 @@ def sample_bookmark():
         "created_at": datetime.now(timezone.utc).isoformat(),
         "updated_at": datetime.now(timezone.utc).isoformat(),
     }
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Serves canned responses from the server's ``routes`` dict.
+
+    Routes are keyed by path, or by ``(method, path)`` for method-specific
+    responses (e.g. a server that rejects HEAD).
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def _respond(self, with_body: bool):
+        routes = self.server.routes
+        status, headers, body = routes.get((self.command, self.path)) or routes.get(
+            self.path, (404, {"Content-Type": "text/plain"}, b"not found")
+        )
+        self.server.requests.append((self.command, self.path, dict(self.headers)))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if with_body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond(with_body=True)
+
+    def do_HEAD(self):
+        self._respond(with_body=False)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    """Local HTTP server; set ``server.routes[path] = (status, headers, body)``."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.routes = {}
+    server.requests = []
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -1,60 +1,124 @@
-from unittest.mock import MagicMock, patch, AsyncMock
+import asyncio
+from unittest.mock import MagicMock, patch
 
-from app.services.scraper import ScrapedData
+import pytest
+
+from app.services.pagination import decode_cursor
 from tests.conftest import TEST_USER_ID
 
 
+def _list_query(mock_supabase):
+    """The bookmarks list query chain: select -> eq -> order -> order -> limit."""
+    return mock_supabase.table.return_value.select.return_value.eq.return_value
+
+
 class TestListBookmarks:
     def test_list_bookmarks_success(self, client, mock_supabase, sample_bookmark):
-        mock_supabase.table.return_value.select.return_value.eq.return_value.order.return_value.range.return_value.execute.return_value = MagicMock(
-            data=[sample_bookmark]
-        )
+        query = _list_query(mock_supabase).order.return_value.order.return_value
+        query = query.limit.return_value
+        query.execute.return_value = MagicMock(data=[sample_bookmark])
 
         response = client.get("/api/v1/bookmarks")
 
         assert response.status_code == 200
         data = response.json()
-        assert len(data) == 1
-        assert data[0]["id"] == "bookmark-1"
+        assert len(data["items"]) == 1
+        assert data["items"][0]["id"] == "bookmark-1"
+        assert data["next_cursor"] is None
 
     def test_list_bookmarks_empty(self, client, mock_supabase):
-        mock_supabase.table.return_value.select.return_value.eq.return_value.order.return_value.range.return_value.execute.return_value = MagicMock(
-            data=[]
-        )
+        query = _list_query(mock_supabase).order.return_value.order.return_value
+        query = query.limit.return_value
+        query.execute.return_value = MagicMock(data=[])
 
         response = client.get("/api/v1/bookmarks")
 
         assert response.status_code == 200
-        assert response.json() == []
-
-    def test_list_bookmarks_with_pagination(self, client, mock_supabase, sample_bookmark):
-        mock_supabase.table.return_value.select.return_value.eq.return_value.order.return_value.range.return_value.execute.return_value = MagicMock(
-            data=[sample_bookmark]
+        assert response.json() == {"items": [], "next_cursor": None}
+
+    def test_lean_projection_by_default(self, client, mock_supabase, sample_bookmark):
+        query = _list_query(mock_supabase).order.return_value.order.return_value
+        query = query.limit.return_value
+        query.execute.return_value = MagicMock(data=[])
+
+        client.get("/api/v1/bookmarks")
+
+        columns = mock_supabase.table.return_value.select.call_args[0][0]
+        assert "content" not in columns
+        assert "*" not in columns
+
+    def test_opt_in_fields(self, client, mock_supabase, sample_bookmark):
+        query = _list_query(mock_supabase).order.return_value.order.return_value
+        query = query.limit.return_value
+        query.execute.return_value = MagicMock(data=[sample_bookmark])
+
+        response = client.get("/api/v1/bookmarks?fields=content")
+
+        columns = mock_supabase.table.return_value.select.call_args[0][0]
+        assert columns.endswith(", content")
+        assert response.json()["items"][0]["content"] == "Example content"
+
+    def test_unknown_field_rejected(self, client, mock_supabase):
+        response = client.get("/api/v1/bookmarks?fields=embedding")
+
+        assert response.status_code == 400
+
+    def test_next_cursor_round_trip(self, client, mock_supabase, sample_bookmark):
+        rows = [
+            {
+                **sample_bookmark,
+                "id": f"bookmark-{i}",
+                "created_at": f"2026-01-0{9 - i}T00:00:00+00:00",
+            }
+            for i in range(3)
+        ]
+        query = _list_query(mock_supabase).order.return_value.order.return_value
+        query = query.limit.return_value
+        query.execute.return_value = MagicMock(data=rows)
+
+        page = client.get("/api/v1/bookmarks?limit=2").json()
+
+        _list_query(
+            mock_supabase
+        ).order.return_value.order.return_value.limit.assert_called_with(3)
+        assert [item["id"] for item in page["items"]] == ["bookmark-0", "bookmark-1"]
+        assert decode_cursor(page["next_cursor"]) == (
+            "2026-01-08T00:00:00+00:00",
+            "bookmark-1",
         )
 
-        response = client.get("/api/v1/bookmarks?limit=10&offset=5")
+        query = _list_query(
+            mock_supabase
+        ).or_.return_value.order.return_value.order.return_value
+        query = query.limit.return_value
+        query.execute.return_value = MagicMock(data=rows[2:])
+        response = client.get(f"/api/v1/bookmarks?limit=2&cursor={page['next_cursor']}")
 
-        assert response.status_code == 200
-        mock_supabase.table.return_value.select.return_value.eq.return_value.order.return_value.range.assert_called_with(
-            5, 14
-        )
+        keyset = _list_query(mock_supabase).or_.call_args[0][0]
+        assert 'created_at.lt."2026-01-08T00:00:00+00:00"' in keyset
+        assert 'id.lt."bookmark-1"' in keyset
+        assert response.json()["items"][0]["id"] == "bookmark-2"
+
+    def test_invalid_cursor_rejected(self, client, mock_supabase):
+        response = client.get("/api/v1/bookmarks?cursor=not-a-cursor")
+
+        assert response.status_code == 400
 
 
 class TestCreateBookmark:
-    @patch("app.api.v1.bookmarks.scrape_url")
-    @patch("app.api.v1.bookmarks.get_embedding")
+    @staticmethod
+    def _mock_count(mock_supabase, count=0):
+        query = mock_supabase.table.return_value.select.return_value.eq.return_value
+        query.execute.return_value = MagicMock(count=count)
+
+    @patch("app.api.v1.bookmarks.ingestion_queue")
     def test_create_bookmark_success(
-        self, mock_get_embedding, mock_scrape_url, client, mock_supabase, sample_bookmark
+        self, mock_queue, client, mock_supabase, sample_bookmark
     ):
-        mock_get_embedding.return_value = [0.1] * 4096
-        mock_scrape_url.return_value = ScrapedData(
-            title="Scraped Title",
-            description="Scraped description",
-            content="Scraped content",
-            favicon_url="https://example.com/favicon.ico",
-        )
-        mock_supabase.table.return_value.insert.return_value.execute.return_value = MagicMock(
-            data=[sample_bookmark]
+        mock_queue.full.return_value = False
+        self._mock_count(mock_supabase)
+        mock_supabase.table.return_value.insert.return_value.execute.return_value = (
+            MagicMock(data=[{**sample_bookmark, "processing_status": "pending"}])
         )
 
         response = client.post(
@@ -66,23 +130,18 @@ class TestCreateBookmark:
             },
         )
 
-        assert response.status_code == 200
+        assert response.status_code == 202
         assert response.json()["url"] == "https://example.com/"
+        assert response.json()["processing_status"] == "pending"
 
-    @patch("app.api.v1.bookmarks.scrape_url")
-    @patch("app.api.v1.bookmarks.get_embedding")
+    @patch("app.api.v1.bookmarks.ingestion_queue")
     def test_create_bookmark_without_optional_fields(
-        self, mock_get_embedding, mock_scrape_url, client, mock_supabase, sample_bookmark
+        self, mock_queue, client, mock_supabase, sample_bookmark
     ):
-        mock_get_embedding.return_value = [0.1] * 4096
-        mock_scrape_url.return_value = ScrapedData(
-            title="Scraped Title",
-            description="Scraped description",
-            content="Scraped content",
-            favicon_url="https://example.com/favicon.ico",
-        )
-        mock_supabase.table.return_value.insert.return_value.execute.return_value = MagicMock(
-            data=[sample_bookmark]
+        mock_queue.full.return_value = False
+        self._mock_count(mock_supabase)
+        mock_supabase.table.return_value.insert.return_value.execute.return_value = (
+            MagicMock(data=[sample_bookmark])
         )
 
         response = client.post(
@@ -90,97 +149,74 @@ class TestCreateBookmark:
             json={"url": "https://example.com"},
         )
 
-        assert response.status_code == 200
+        assert response.status_code == 202
 
-    @patch("app.api.v1.bookmarks.scrape_url")
-    @patch("app.api.v1.bookmarks.get_embedding")
-    def test_create_bookmark_uses_scraped_data_when_not_provided(
-        self, mock_get_embedding, mock_scrape_url, client, mock_supabase, sample_bookmark
+    @patch("app.api.v1.bookmarks.ingestion_queue")
+    def test_create_bookmark_enqueues_job_with_user_data(
+        self, mock_queue, client, mock_supabase, sample_bookmark
     ):
-        """Test that scraped data is used when user doesn't provide title/description."""
-        mock_get_embedding.return_value = [0.1] * 4096
-        mock_scrape_url.return_value = ScrapedData(
-            title="Scraped Title",
-            description="Scraped description",
-            content="Scraped content",
-            favicon_url="https://example.com/scraped-favicon.ico",
-        )
-        mock_supabase.table.return_value.insert.return_value.execute.return_value = MagicMock(
-            data=[{**sample_bookmark, "title": "Scraped Title", "description": "Scraped description"}]
+        """Test that the row is inserted as pending and handed to the workers."""
+        mock_queue.full.return_value = False
+        self._mock_count(mock_supabase)
+        mock_supabase.table.return_value.insert.return_value.execute.return_value = (
+            MagicMock(data=[sample_bookmark])
         )
 
         response = client.post(
             "/api/v1/bookmarks",
-            json={"url": "https://example.com"},
+            json={"url": "https://example.com", "title": "User Title"},
         )
 
-        assert response.status_code == 200
-        # Verify scraper was called
-        mock_scrape_url.assert_called_once_with("https://example.com/")
-        # Verify the insert was called with scraped data
-        insert_call = mock_supabase.table.return_value.insert.call_args
-        inserted_data = insert_call[0][0]
-        assert inserted_data["title"] == "Scraped Title"
-        assert inserted_data["description"] == "Scraped description"
-        assert inserted_data["content"] == "Scraped content"
-        assert inserted_data["favicon_url"] == "https://example.com/scraped-favicon.ico"
-
-    @patch("app.api.v1.bookmarks.scrape_url")
-    @patch("app.api.v1.bookmarks.get_embedding")
-    def test_create_bookmark_user_data_takes_precedence(
-        self, mock_get_embedding, mock_scrape_url, client, mock_supabase, sample_bookmark
-    ):
-        """Test that user-provided data takes precedence over scraped data."""
-        mock_get_embedding.return_value = [0.1] * 4096
-        mock_scrape_url.return_value = ScrapedData(
-            title="Scraped Title",
-            description="Scraped description",
-            content="Scraped content",
-            favicon_url="https://example.com/scraped-favicon.ico",
-        )
-        mock_supabase.table.return_value.insert.return_value.execute.return_value = MagicMock(
-            data=[sample_bookmark]
-        )
+        assert response.status_code == 202
+        inserted_data = mock_supabase.table.return_value.insert.call_args[0][0]
+        assert inserted_data["user_id"] == TEST_USER_ID
+        assert inserted_data["processing_status"] == "pending"
+        # Kept on the row so startup recovery re-queues the same inputs
+        assert inserted_data["ingestion_input"] == {"title": "User Title"}
 
-        response = client.post(
-            "/api/v1/bookmarks",
-            json={
-                "url": "https://example.com",
-                "title": "User Title",
-                "description": "User description",
-            },
-        )
+        job = mock_queue.enqueue.call_args[0][0]
+        assert job.bookmark_id == "bookmark-1"
+        assert job.user_id == TEST_USER_ID
+        assert job.url == "https://example.com/"
+        assert job.data == {"title": "User Title"}
 
-        assert response.status_code == 200
-        # Verify the insert was called with user-provided data, not scraped data
-        insert_call = mock_supabase.table.return_value.insert.call_args
-        inserted_data = insert_call[0][0]
-        assert inserted_data["title"] == "User Title"
-        assert inserted_data["description"] == "User description"
-        # Content should be from scraper since user didn't provide it
-        assert inserted_data["content"] == "Scraped content"
-
-    @patch("app.api.v1.bookmarks.scrape_url")
-    @patch("app.api.v1.bookmarks.get_embedding")
-    def test_create_bookmark_scraper_failure_doesnt_block(
-        self, mock_get_embedding, mock_scrape_url, client, mock_supabase, sample_bookmark
+    @patch("app.api.v1.bookmarks.ingestion_queue")
+    def test_create_bookmark_limit_reached(self, mock_queue, client, mock_supabase):
+        mock_queue.full.return_value = False
+        self._mock_count(mock_supabase, count=50)
+
+        response = client.post("/api/v1/bookmarks", json={"url": "https://example.com"})
+
+        assert response.status_code == 403
+        mock_queue.enqueue.assert_not_called()
+
+    @patch("app.api.v1.bookmarks.ingestion_queue")
+    def test_create_bookmark_queue_full(self, mock_queue, client, mock_supabase):
+        mock_queue.full.return_value = True
+        self._mock_count(mock_supabase)
+
+        response = client.post("/api/v1/bookmarks", json={"url": "https://example.com"})
+
+        assert response.status_code == 503
+        mock_supabase.table.return_value.insert.assert_not_called()
+
+    @patch("app.api.v1.bookmarks.ingestion_queue")
+    def test_create_bookmark_queue_fills_during_insert(
+        self, mock_queue, client, mock_supabase, sample_bookmark
     ):
-        """Test that scraper failure doesn't prevent bookmark creation."""
-        mock_get_embedding.return_value = [0.1] * 4096
-        mock_scrape_url.side_effect = Exception("Network error")
-        mock_supabase.table.return_value.insert.return_value.execute.return_value = MagicMock(
-            data=[sample_bookmark]
+        """The row is already pending, so the job is deferred instead of a 500."""
+        mock_queue.full.return_value = False
+        mock_queue.enqueue.side_effect = asyncio.QueueFull
+        self._mock_count(mock_supabase)
+        mock_supabase.table.return_value.insert.return_value.execute.return_value = (
+            MagicMock(data=[sample_bookmark])
         )
 
-        response = client.post(
-            "/api/v1/bookmarks",
-            json={
-                "url": "https://example.com",
-                "title": "Manual Title",
-            },
-        )
+        response = client.post("/api/v1/bookmarks", json={"url": "https://example.com"})
 
-        assert response.status_code == 200
+        assert response.status_code == 202
+        job = mock_queue.defer.call_args[0][0]
+        assert job.bookmark_id == "bookmark-1"
 
     def test_create_bookmark_invalid_url(self, client):
         response = client.post(
@@ -191,11 +227,73 @@ class TestCreateBookmark:
         assert response.status_code == 422
 
 
+class TestBookmarkStatus:
+    def test_get_status(self, client, mock_supabase):
+        query = mock_supabase.table.return_value.select.return_value.eq.return_value
+        query = query.eq.return_value.single.return_value
+        query.execute.return_value = MagicMock(
+            data={
+                "id": "bookmark-1",
+                "processing_status": "processing",
+                "processing_stages": {"scrape": "completed", "summarize": "running"},
+            }
+        )
+
+        response = client.get("/api/v1/bookmarks/bookmark-1/status")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["processing_status"] == "processing"
+        assert data["processing_stages"]["scrape"] == "completed"
+
+    def test_get_status_not_found(self, client, mock_supabase):
+        query = mock_supabase.table.return_value.select.return_value.eq.return_value
+        query = query.eq.return_value.single.return_value
+        query.execute.return_value = MagicMock(data=None)
+
+        response = client.get("/api/v1/bookmarks/nonexistent/status")
+
+        assert response.status_code == 404
+
+
+class TestRefreshBookmark:
+    @patch("app.api.v1.bookmarks.ingestion_queue")
+    def test_refresh_queues_conditional_rescrape(
+        self, mock_queue, client, mock_supabase, sample_bookmark
+    ):
+        mock_queue.full.return_value = False
+        query = mock_supabase.table.return_value.select.return_value.eq.return_value
+        query = query.eq.return_value.single.return_value
+        query.execute.return_value = MagicMock(data=sample_bookmark)
+
+        response = client.post("/api/v1/bookmarks/bookmark-1/refresh")
+
+        assert response.status_code == 202
+        job = mock_queue.enqueue.call_args[0][0]
+        assert job.refresh is True
+        assert job.from_archive is False
+        assert job.data["title"] == "Example Site"
+
+    @patch("app.api.v1.bookmarks.ingestion_queue")
+    def test_refresh_from_archive(
+        self, mock_queue, client, mock_supabase, sample_bookmark
+    ):
+        mock_queue.full.return_value = False
+        query = mock_supabase.table.return_value.select.return_value.eq.return_value
+        query = query.eq.return_value.single.return_value
+        query.execute.return_value = MagicMock(data=sample_bookmark)
+
+        client.post("/api/v1/bookmarks/bookmark-1/refresh?from_archive=true")
+
+        job = mock_queue.enqueue.call_args[0][0]
+        assert (job.refresh, job.from_archive) == (False, True)
+
+
 class TestGetBookmark:
     def test_get_bookmark_success(self, client, mock_supabase, sample_bookmark):
-        mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.single.return_value.execute.return_value = MagicMock(
-            data=sample_bookmark
-        )
+        query = mock_supabase.table.return_value.select.return_value.eq.return_value
+        query = query.eq.return_value.single.return_value
+        query.execute.return_value = MagicMock(data=sample_bookmark)
 
         response = client.get("/api/v1/bookmarks/bookmark-1")
 
@@ -203,9 +301,9 @@ class TestGetBookmark:
         assert response.json()["id"] == "bookmark-1"
 
     def test_get_bookmark_not_found(self, client, mock_supabase):
-        mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.single.return_value.execute.return_value = MagicMock(
-            data=None
-        )
+        query = mock_supabase.table.return_value.select.return_value.eq.return_value
+        query = query.eq.return_value.single.return_value
+        query.execute.return_value = MagicMock(data=None)
 
         response = client.get("/api/v1/bookmarks/nonexistent")
 
@@ -213,15 +311,24 @@ class TestGetBookmark:
 
 
 class TestUpdateBookmark:
-    @patch("app.api.v1.bookmarks.get_embedding")
+    @patch("app.services.ingestion.generate_categories")
+    @patch("app.services.ingestion.get_embedding")
     def test_update_bookmark_success(
-        self, mock_get_embedding, client, mock_supabase, sample_bookmark
+        self,
+        mock_get_embedding,
+        mock_generate_categories,
+        client,
+        mock_supabase,
+        sample_bookmark,
     ):
         mock_get_embedding.return_value = [0.1] * 4096
-        mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.single.return_value.execute.return_value = MagicMock(
-            data=sample_bookmark
-        )
-        mock_supabase.table.return_value.update.return_value.eq.return_value.eq.return_value.execute.return_value = MagicMock(
+        mock_generate_categories.return_value = []
+        query = mock_supabase.table.return_value.select.return_value.eq.return_value
+        query = query.eq.return_value.single.return_value
+        query.execute.return_value = MagicMock(data=sample_bookmark)
+        query = mock_supabase.table.return_value.update.return_value.eq.return_value
+        query = query.eq.return_value
+        query.execute.return_value = MagicMock(
             data=[{**sample_bookmark, "title": "Updated Title"}]
         )
 
@@ -232,15 +339,42 @@ class TestUpdateBookmark:
 
         assert response.status_code == 200
         assert response.json()["title"] == "Updated Title"
-
-    def test_update_bookmark_not_found(self, client, mock_supabase):
-        mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.single.return_value.execute.return_value = MagicMock(
-            data=None
+        mock_get_embedding.assert_called_once()
+        mock_generate_categories.assert_called_once()
+
+    @patch("app.services.ingestion.generate_categories")
+    @patch("app.services.ingestion.get_embedding")
+    def test_update_favorite_skips_regeneration(
+        self,
+        mock_get_embedding,
+        mock_generate_categories,
+        client,
+        mock_supabase,
+        sample_bookmark,
+    ):
+        query = mock_supabase.table.return_value.update.return_value.eq.return_value
+        query = query.eq.return_value
+        query.execute.return_value = MagicMock(
+            data=[{**sample_bookmark, "is_favorite": True}]
         )
-        mock_supabase.table.return_value.update.return_value.eq.return_value.eq.return_value.execute.return_value = MagicMock(
-            data=None
+
+        response = client.patch(
+            "/api/v1/bookmarks/bookmark-1",
+            json={"is_favorite": True},
         )
 
+        assert response.status_code == 200
+        mock_get_embedding.assert_not_called()
+        mock_generate_categories.assert_not_called()
+
+    def test_update_bookmark_not_found(self, client, mock_supabase):
+        query = mock_supabase.table.return_value.select.return_value.eq.return_value
+        query = query.eq.return_value.single.return_value
+        query.execute.return_value = MagicMock(data=None)
+        query = mock_supabase.table.return_value.update.return_value.eq.return_value
+        query = query.eq.return_value
+        query.execute.return_value = MagicMock(data=None)
+
         response = client.patch(
             "/api/v1/bookmarks/nonexistent",
             json={"title": "Updated Title"},
@@ -251,9 +385,9 @@ class TestUpdateBookmark:
 
 class TestDeleteBookmark:
     def test_delete_bookmark_success(self, client, mock_supabase, sample_bookmark):
-        mock_supabase.table.return_value.delete.return_value.eq.return_value.eq.return_value.execute.return_value = MagicMock(
-            data=[sample_bookmark]
-        )
+        query = mock_supabase.table.return_value.delete.return_value.eq.return_value
+        query = query.eq.return_value
+        query.execute.return_value = MagicMock(data=[sample_bookmark])
 
         response = client.delete("/api/v1/bookmarks/bookmark-1")
 
@@ -261,10 +395,68 @@ class TestDeleteBookmark:
         assert response.json()["message"] == "Bookmark deleted"
 
     def test_delete_bookmark_not_found(self, client, mock_supabase):
-        mock_supabase.table.return_value.delete.return_value.eq.return_value.eq.return_value.execute.return_value = MagicMock(
-            data=None
-        )
+        query = mock_supabase.table.return_value.delete.return_value.eq.return_value
+        query = query.eq.return_value
+        query.execute.return_value = MagicMock(data=None)
 
         response = client.delete("/api/v1/bookmarks/nonexistent")
 
         assert response.status_code == 404
+
+    def test_delete_is_single_round_trip(self, client, mock_supabase, sample_bookmark):
+        query = mock_supabase.table.return_value.delete.return_value.eq.return_value
+        query = query.eq.return_value
+        query.execute.return_value = MagicMock(data=[sample_bookmark])
+
+        client.delete("/api/v1/bookmarks/bookmark-1")
+
+        # Embeddings and category links go via ON DELETE CASCADE
+        mock_supabase.table.assert_called_once_with("bookmarks")
+
+
+class TestBulkDeleteBookmarks:
+    def test_bulk_delete_by_ids(self, client, mock_supabase):
+        mock_supabase.rpc.return_value.execute.return_value = MagicMock(data=2)
+
+        ids = [
+            "5d6c2a4e-0b1f-4c8e-9a57-3f2e1d0c9b8a",
+            "9e8d7c6b-5a4f-4e3d-8c2b-1a0f9e8d7c6b",
+        ]
+
+        response = client.post("/api/v1/bookmarks/bulk-delete", json={"ids": ids})
+
+        assert response.status_code == 200
+        assert response.json() == {"deleted": 2}
+        name, params = mock_supabase.rpc.call_args[0]
+        assert name == "delete_bookmarks"
+        assert params["p_ids"] == ids
+        assert params["p_is_dead"] is None
+
+    def test_bulk_delete_by_filters(self, client, mock_supabase):
+        mock_supabase.rpc.return_value.execute.return_value = MagicMock(data=7)
+
+        response = client.post(
+            "/api/v1/bookmarks/bulk-delete",
+            json={"is_dead": True, "older_than": "2025-01-01T00:00:00+00:00"},
+        )
+
+        assert response.json() == {"deleted": 7}
+        params = mock_supabase.rpc.call_args[0][1]
+        assert params["p_is_dead"] is True
+        assert params["p_older_than"] == "2025-01-01T00:00:00+00:00"
+        assert params["p_ids"] is None
+
+    @pytest.mark.parametrize(
+        "body", [{"ids": ["bookmark-1"]}, {"category_id": "not-a-uuid"}]
+    )
+    def test_bulk_delete_rejects_malformed_ids(self, client, mock_supabase, body):
+        response = client.post("/api/v1/bookmarks/bulk-delete", json=body)
+
+        assert response.status_code == 422
+        mock_supabase.rpc.assert_not_called()
+
+    def test_bulk_delete_requires_selector(self, client, mock_supabase):
+        response = client.post("/api/v1/bookmarks/bulk-delete", json={})
+
+        assert response.status_code == 422
+        mock_supabase.rpc.assert_not_called()
@@ -0,0 +1,293 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import openai
+import pytest
+
+from app.services.embedding import _pack_batches, get_embedding, get_embeddings
+from app.services.embedding_cache import (
+    EmbeddingCache,
+    EmbeddingLRU,
+    cache_key,
+    normalize_text,
+)
+from tests.conftest import SupabaseMock
+
+
+def _api_error(cls, status_code):
+    request = httpx.Request("POST", "https://openrouter.test/embeddings")
+    return cls(
+        "error",
+        response=httpx.Response(status_code, request=request),
+        body=None,
+    )
+
+
+def _embedding_response(vector):
+    return MagicMock(data=[MagicMock(embedding=vector)])
+
+
+@pytest.fixture
+def cache():
+    """Fresh memory-only cache installed in place of the module cache."""
+    fresh = EmbeddingCache(max_bytes=1024 * 1024)
+    with patch("app.services.embedding.embedding_cache", fresh):
+        yield fresh
+
+
+class TestCacheKey:
+    def test_normalize_collapses_whitespace(self):
+        assert normalize_text("  Hello \n\t world  ") == "Hello world"
+
+    def test_key_depends_on_model_and_dimensions(self):
+        base = cache_key("model-a", 1536, "text")
+        assert base == cache_key("model-a", 1536, "text")
+        assert base != cache_key("model-b", 1536, "text")
+        assert base != cache_key("model-a", 768, "text")
+
+
+class TestEmbeddingLRU:
+    def test_evicts_least_recently_used_by_size(self):
+        # Each entry is a 1-char key and a 2-element array("d"): ~140 bytes
+        lru = EmbeddingLRU(max_bytes=300)
+        lru.set("a", [0.1, 0.2])
+        lru.set("b", [0.1, 0.2])
+        lru.get("a")
+        lru.set("c", [0.1, 0.2])
+
+        assert lru.get("a") is not None
+        assert lru.get("b") is None
+        assert lru.get("c") is not None
+        assert lru.size_bytes <= 300
+
+    def test_skips_entries_larger_than_budget(self):
+        lru = EmbeddingLRU(max_bytes=500)
+        lru.set("a", [0.1] * 100)
+        assert len(lru) == 0
+
+    def test_budget_counts_real_memory(self):
+        lru = EmbeddingLRU(max_bytes=10**6)
+        lru.set("k" * 64, [0.1] * 1536)
+
+        # 8 bytes per element plus headers; a list of floats would be ~4x this
+        assert 1536 * 8 < lru.size_bytes < 1536 * 9
+        assert lru.get("k" * 64) == [0.1] * 1536
+
+
+class TestGetEmbedding:
+    @pytest.mark.asyncio
+    async def test_repeated_query_hits_memory(self, cache):
+        with patch("app.services.embedding.client") as mock_client:
+            mock_client.embeddings.create = AsyncMock(
+                return_value=_embedding_response([0.1, 0.2])
+            )
+
+            first = await get_embedding("python tutorials")
+            second = await get_embedding("python   tutorials ")
+
+        assert first == second == [0.1, 0.2]
+        mock_client.embeddings.create.assert_called_once()
+        assert cache.stats.misses == 1
+        assert cache.stats.memory_hits == 1
+
+    @pytest.mark.asyncio
+    async def test_model_change_invalidates(self, cache):
+        with patch("app.services.embedding.client") as mock_client:
+            mock_client.embeddings.create = AsyncMock(
+                return_value=_embedding_response([0.1, 0.2])
+            )
+
+            await get_embedding("query")
+            with patch(
+                "app.services.embedding.settings.embedding_model", "other/model"
+            ):
+                await get_embedding("query")
+
+        assert mock_client.embeddings.create.call_count == 2
+        assert mock_client.embeddings.create.call_args.kwargs["model"] == "other/model"
+
+    @pytest.mark.asyncio
+    async def test_other_model_keeps_memory_entries(self, cache):
+        # A shadow re-embed with another model must not evict the primary's
+        await cache.set("a", "m1", 4, [0.1])
+        await cache.set("b", "m2", 8, [0.2])
+
+        assert await cache.get("a") == [0.1]
+        assert await cache.get("b") == [0.2]
+        assert len(cache.memory) == 2
+
+    @pytest.mark.asyncio
+    async def test_persistent_tier_hit(self):
+        supabase = SupabaseMock()
+        query = supabase.table.return_value.select.return_value.eq.return_value
+        query = query.limit.return_value
+        query.execute.return_value = MagicMock(data=[{"embedding": "[0.5,0.25]"}])
+        cache = EmbeddingCache(
+            max_bytes=1024, supabase_factory=AsyncMock(return_value=supabase)
+        )
+
+        with (
+            patch("app.services.embedding.embedding_cache", cache),
+            patch("app.services.embedding.client") as mock_client,
+        ):
+            mock_client.embeddings.create = AsyncMock()
+            result = await get_embedding("stored text")
+
+        assert result == [0.5, 0.25]
+        mock_client.embeddings.create.assert_not_called()
+        assert cache.stats.persistent_hits == 1
+        supabase.table.assert_called_with("embedding_cache")
+
+    @pytest.mark.asyncio
+    async def test_miss_writes_through(self):
+        supabase = SupabaseMock()
+        query = supabase.table.return_value.select.return_value.eq.return_value
+        query = query.limit.return_value
+        query.execute.return_value = MagicMock(data=[])
+        cache = EmbeddingCache(
+            max_bytes=1024, supabase_factory=AsyncMock(return_value=supabase)
+        )
+
+        with (
+            patch("app.services.embedding.embedding_cache", cache),
+            patch("app.services.embedding.client") as mock_client,
+        ):
+            mock_client.embeddings.create = AsyncMock(
+                return_value=_embedding_response([0.3])
+            )
+            await get_embedding("new text")
+
+        row = supabase.table.return_value.upsert.call_args[0][0][0]
+        assert row["embedding"] == [0.3]
+        assert row["key"] == cache_key(row["model"], row["dimensions"], "new text")
+
+    @pytest.mark.asyncio
+    async def test_persistent_failure_falls_back_to_api(self):
+        async def broken():
+            raise RuntimeError("supabase down")
+
+        cache = EmbeddingCache(max_bytes=1024, supabase_factory=broken)
+
+        with (
+            patch("app.services.embedding.embedding_cache", cache),
+            patch("app.services.embedding.client") as mock_client,
+        ):
+            mock_client.embeddings.create = AsyncMock(
+                return_value=_embedding_response([0.7])
+            )
+            assert await get_embedding("text") == [0.7]
+
+
+def _batch_response(texts):
+    """Fake API response echoing a 1-d vector per input, in shuffled order."""
+    data = [MagicMock(index=i, embedding=[float(len(t))]) for i, t in enumerate(texts)]
+    return MagicMock(data=list(reversed(data)))
+
+
+class TestPackBatches:
+    def test_respects_token_budget(self):
+        texts = ["a" * 40, "b" * 40, "c" * 40]  # 10 tokens each
+        assert _pack_batches(texts, max_tokens=20, max_inputs=10) == [[0, 1], [2]]
+
+    def test_respects_input_limit(self):
+        assert _pack_batches(["a", "b", "c"], max_tokens=1000, max_inputs=2) == [
+            [0, 1],
+            [2],
+        ]
+
+    def test_oversized_text_gets_own_batch(self):
+        assert _pack_batches(["a" * 400, "b"], max_tokens=10, max_inputs=10) == [
+            [0],
+            [1],
+        ]
+
+
+class TestGetEmbeddings:
+    @pytest.mark.asyncio
+    async def test_returns_results_in_input_order(self, cache):
+        with patch("app.services.embedding.client") as mock_client:
+            mock_client.embeddings.create = AsyncMock(
+                side_effect=lambda **kw: _batch_response(kw["input"])
+            )
+            result = await get_embeddings(["a", "bbb", "cc"])
+
+        assert result == [[1.0], [3.0], [2.0]]
+        mock_client.embeddings.create.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_splits_into_batches(self, cache):
+        with (
+            patch("app.services.embedding.client") as mock_client,
+            patch("app.services.embedding.settings.embedding_batch_max_inputs", 2),
+        ):
+            mock_client.embeddings.create = AsyncMock(
+                side_effect=lambda **kw: _batch_response(kw["input"])
+            )
+            result = await get_embeddings(["a", "bb", "ccc", "dddd", "eeeee"])
+
+        assert result == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+        assert mock_client.embeddings.create.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_skips_cached_duplicate_and_empty_texts(self, cache):
+        with patch("app.services.embedding.client") as mock_client:
+            mock_client.embeddings.create = AsyncMock(
+                side_effect=lambda **kw: _batch_response(kw["input"])
+            )
+            await get_embeddings(["cached"])
+            result = await get_embeddings(["cached", "new", "new ", ""])
+
+        assert result == [[6.0], [3.0], [3.0], None]
+        assert mock_client.embeddings.create.call_args.kwargs["input"] == ["new"]
+
+    @pytest.mark.asyncio
+    async def test_no_cache_neither_reads_nor_stores(self, cache):
+        with patch("app.services.embedding.client") as mock_client:
+            mock_client.embeddings.create = AsyncMock(
+                side_effect=lambda **kw: _batch_response(kw["input"])
+            )
+            await get_embeddings(["cached"])
+            result = await get_embeddings(["cached", "bulk"], use_cache=False)
+
+        assert result == [[6.0], [4.0]]
+        assert mock_client.embeddings.create.call_args.kwargs["input"] == [
+            "cached",
+            "bulk",
+        ]
+        # Only the first call's entry
+        assert len(cache.memory) == 1
+
+    @pytest.mark.asyncio
+    async def test_retries_then_isolates_failures(self, cache):
+        def create(**kw):
+            if "bad" in kw["input"]:
+                raise _api_error(openai.BadRequestError, 400)
+            return _batch_response(kw["input"])
+
+        with (
+            patch("app.services.embedding.client") as mock_client,
+            patch("app.services.embedding.settings.embedding_retry_backoff", 0),
+        ):
+            mock_client.embeddings.create = AsyncMock(side_effect=create)
+            result = await get_embeddings(["ok", "bad", "fine"])
+
+        assert result == [[2.0], None, [4.0]]
+
+    @pytest.mark.asyncio
+    async def test_outage_fails_batch_without_splitting(self, cache):
+        with (
+            patch("app.services.embedding.client") as mock_client,
+            patch("app.services.embedding.settings.embedding_max_retries", 3),
+            patch(
+                "app.services.embedding.asyncio.sleep", new_callable=AsyncMock
+            ) as sleep,
+        ):
+            mock_client.embeddings.create = AsyncMock(
+                side_effect=_api_error(openai.InternalServerError, 503)
+            )
+            result = await get_embeddings(["a", "b", "c"])
+
+        assert result == [None, None, None]
+        # Retried as a batch only, with no sleep after the last attempt
+        assert mock_client.embeddings.create.call_count == 3
+        assert sleep.await_count == 2
@@ -0,0 +1,127 @@
+import gzip
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.export import ExportFormat, encode_export, gzip_stream, iter_bookmarks
+from tests.conftest import TEST_USER_ID
+
+
+def _rows(n):
+    return [
+        {
+            "id": f"bookmark-{i}",
+            "user_id": TEST_USER_ID,
+            "url": f"https://example.com/{i}",
+            "title": f"Bookmark {i}",
+            "created_at": f"2026-01-{20 - i:02d}T00:00:00+00:00",
+            "search_vector": "'exampl':1",
+            "categories": [{"name": "web"}, {"name": "python"}],
+            "bookmark_embeddings": {"embedding": "[0.5,0.25]"},
+        }
+        for i in range(n)
+    ]
+
+
+def _mock_batches(mock_supabase, first, rest):
+    """First batch has no cursor filter; later batches go through or_()."""
+    query = mock_supabase.table.return_value.select.return_value.eq.return_value
+    first_page = query.order.return_value.order.return_value.limit.return_value
+    first_page.execute.return_value = MagicMock(data=first)
+    next_page = query.or_.return_value.order.return_value.order.return_value
+    next_page.limit.return_value.execute.side_effect = [
+        MagicMock(data=batch) for batch in rest
+    ]
+    return query
+
+
+async def _collect(chunks):
+    return b"".join([chunk async for chunk in chunks])
+
+
+class TestIterBookmarks:
+    @pytest.mark.asyncio
+    async def test_reads_in_keyset_batches(self, mock_supabase):
+        rows = _rows(5)
+        query = _mock_batches(mock_supabase, rows[:2], [rows[2:4], rows[4:]])
+
+        exported = [
+            b async for b in iter_bookmarks(mock_supabase, TEST_USER_ID, batch_size=2)
+        ]
+
+        assert [b["id"] for b in exported] == [f"bookmark-{i}" for i in range(5)]
+        assert query.or_.call_count == 2
+        assert 'id.lt."bookmark-1"' in query.or_.call_args_list[0][0][0]
+
+    @pytest.mark.asyncio
+    async def test_row_shape(self, mock_supabase):
+        _mock_batches(mock_supabase, _rows(1), [])
+
+        [bookmark] = [
+            b
+            async for b in iter_bookmarks(
+                mock_supabase, TEST_USER_ID, include_embeddings=True
+            )
+        ]
+
+        assert bookmark["categories"] == ["python", "web"]
+        assert bookmark["embedding"] == [0.5, 0.25]
+        assert "user_id" not in bookmark
+        assert "search_vector" not in bookmark
+        columns = mock_supabase.table.return_value.select.call_args[0][0]
+        assert "bookmark_embeddings(embedding)" in columns
+
+
+class TestEncodeExport:
+    @pytest.mark.asyncio
+    async def test_json_document_is_valid(self):
+        async def bookmarks():
+            for i in range(3):
+                yield {"id": i}
+
+        document = json.loads(
+            await _collect(encode_export(bookmarks(), ExportFormat.JSON))
+        )
+
+        assert document["version"] == 1
+        assert [b["id"] for b in document["bookmarks"]] == [0, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_gzip_stream_round_trips(self):
+        async def chunks():
+            for i in range(100):
+                yield f"line {i}\n".encode()
+
+        data = gzip.decompress(await _collect(gzip_stream(chunks())))
+        assert data.splitlines()[-1] == b"line 99"
+
+
+class TestExportEndpoint:
+    def test_streams_ndjson(self, client, mock_supabase):
+        _mock_batches(mock_supabase, _rows(2), [])
+
+        response = client.get(
+            "/api/v1/bookmarks/export", headers={"Accept-Encoding": "identity"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert "attachment" in response.headers["content-disposition"]
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["id"] for line in lines] == ["bookmark-0", "bookmark-1"]
+        columns = mock_supabase.table.return_value.select.call_args[0][0]
+        assert "bookmark_embeddings" not in columns
+
+    def test_gzips_when_accepted(self, client, mock_supabase):
+        _mock_batches(mock_supabase, _rows(2), [])
+
+        with patch("app.services.export.settings.export_batch_size", 10):
+            response = client.get(
+                "/api/v1/bookmarks/export?format=json",
+                headers={"Accept-Encoding": "gzip"},
+            )
+
+        assert response.headers["content-encoding"] == "gzip"
+        # httpx transparently decompresses
+        assert len(response.json()["bookmarks"]) == 2
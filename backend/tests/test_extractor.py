@@ -0,0 +1,283 @@
+"""Single-pass extractor: parity with the BeautifulSoup scraper, plus a micro-benchmark.
+
+``legacy_scrape`` is the scraper as it was before the lxml extractor (one
+``soup.find`` per candidate, scripts decomposed in a separate pass). It's
+kept here as the reference the extractor has to match on the scraper test
+fixtures and, for metadata, on the saved pages in ``fixtures/pages``. Main
+content on real pages deliberately differs: the scoring extractor drops the
+boilerplate the first-container rule let through.
+"""
+
+import time
+from pathlib import Path
+from urllib.parse import urljoin, urlparse
+
+import pytest
+from bs4 import BeautifulSoup
+from lxml import html as lxml_html
+
+from app.services.extractor import PageExtractor, TextCounter, extract
+from app.services.scraper import ScrapedData
+
+PAGES_DIR = Path(__file__).parent / "fixtures" / "pages"
+PAGES = sorted(PAGES_DIR.glob("*.html"))
+URL = "https://example.com/blog/post"
+
+# The inline fixtures from test_scraper.py
+SNIPPETS = [
+    '<html><head><meta property="og:title" content="OG Title"></head></html>',
+    '<html><head><meta name="twitter:title" content="Twitter Title"></head></html>',
+    "<html><head><title>Page Title</title></head></html>",
+    """<html><head>
+        <meta property="og:title" content="OG Title">
+        <meta name="twitter:title" content="Twitter Title">
+        <title>Page Title</title>
+    </head></html>""",
+    "<html><head></head></html>",
+    "<html><head><title>  Spaced Title  </title></head></html>",
+    (
+        '<html><head><meta property="og:description" content="OG Description"></head>'
+        "</html>"
+    ),
+    '<html><head><meta name="description" content="Meta Description"></head></html>',
+    """<html><head>
+        <meta property="og:description" content="OG Description">
+        <meta name="description" content="Meta Description">
+    </head></html>""",
+    "<html><body><main>Main content here</main><nav>Navigation</nav></body></html>",
+    (
+        "<html><body><article>Article content</article><footer>Footer</footer></body>"
+        "</html>"
+    ),
+    """<html><body>
+        <script>var x = 1;</script>
+        <style>.foo { color: red; }</style>
+        <p>Actual content</p>
+    </body></html>""",
+    "<html><body><p>Text   with   spaces</p></body></html>",
+    f"<html><body><p>{'a' * 60000}</p></body></html>",
+    '<html><head><link rel="icon" href="/favicon.png"></head></html>',
+    '<html><head><link rel="shortcut icon" href="/shortcut.ico"></head></html>',
+    '<html><head><link rel="apple-touch-icon" href="/apple-icon.png"></head></html>',
+    (
+        '<html><head><link rel="icon" href="https://cdn.example.com/icon.png"></head>'
+        "</html>"
+    ),
+    """<html><head>
+        <link rel="icon" href="/icon.png">
+        <link rel="apple-touch-icon" href="/apple.png">
+    </head></html>""",
+    (
+        '<html><body><div class="MainContent">Classy</div><div id="content">By id</div>'
+        "</body></html>"
+    ),
+]
+
+
+def legacy_scrape(html: str, url: str) -> ScrapedData:
+    soup = BeautifulSoup(html, "lxml")
+    return ScrapedData(
+        title=_legacy_title(soup),
+        description=_legacy_description(soup),
+        favicon_url=_legacy_favicon(soup, url),
+        content=_legacy_content(soup),
+    )
+
+
+def _legacy_meta(soup, *selectors):
+    for attrs in selectors:
+        tag = soup.find("meta", attrs=attrs)
+        if tag and tag.get("content"):
+            return tag["content"].strip()
+    return None
+
+
+def _legacy_title(soup):
+    title = _legacy_meta(soup, {"property": "og:title"}, {"name": "twitter:title"})
+    if title is not None:
+        return title
+    title_tag = soup.find("title")
+    if title_tag and title_tag.string:
+        return title_tag.string.strip()
+    return None
+
+
+def _legacy_description(soup):
+    return _legacy_meta(
+        soup,
+        {"property": "og:description"},
+        {"name": "twitter:description"},
+        {"name": "description"},
+    )
+
+
+def _legacy_content(soup):
+    for element in soup(
+        ["script", "style", "nav", "header", "footer", "aside", "noscript"]
+    ):
+        element.decompose()
+    main_content = (
+        soup.find("main")
+        or soup.find("article")
+        or soup.find(
+            "div", class_=lambda x: x and "content" in x.lower() if x else False
+        )
+        or soup.find("div", id=lambda x: x and "content" in x.lower() if x else False)
+        or soup.body
+    )
+    if not main_content:
+        return None
+    text = " ".join(main_content.get_text(separator=" ", strip=True).split())
+    if len(text) > 50000:
+        text = text[:50000] + "..."
+    return text if text else None
+
+
+def _legacy_favicon(soup, url):
+    for rel in (
+        "icon",
+        "shortcut icon",
+        "apple-touch-icon",
+        "apple-touch-icon-precomposed",
+    ):
+        link = soup.find("link", {"rel": rel})
+        if link and link.get("href"):
+            return urljoin(url, link["href"])
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}/favicon.ico"
+
+
+class TestParity:
+    @pytest.mark.parametrize("html", SNIPPETS)
+    def test_matches_legacy_on_snippets(self, html):
+        assert ScrapedData(**extract(html.encode("utf-8"), URL)) == legacy_scrape(
+            html, URL
+        )
+
+    @pytest.mark.parametrize("path", PAGES, ids=lambda p: p.name)
+    def test_metadata_matches_legacy_on_saved_pages(self, path):
+        html = path.read_text(encoding="utf-8")
+        scraped = ScrapedData(**extract(html.encode("utf-8"), URL))
+        legacy = legacy_scrape(html, URL)
+
+        assert scraped.model_dump(exclude={"content"}) == legacy.model_dump(
+            exclude={"content"}
+        )
+        assert scraped.title and scraped.content
+
+    def test_skipped_subtrees_are_not_containers(self):
+        html = (
+            "<html><body><header><main>Banner</main></header>"
+            "<main>Story</main></body></html>"
+        )
+        assert extract(html.encode("utf-8"), URL)["content"] == "Story"
+
+    def test_empty_og_title_falls_back_to_twitter(self):
+        html = (
+            '<html><head><meta property="og:title" content="">'
+            '<meta property="og:title" content="Second OG">'
+            '<meta name="twitter:title" content="Twitter"></head></html>'
+        )
+        assert extract(html.encode("utf-8"), URL)["title"] == "Twitter"
+
+
+def _page(name: str) -> str:
+    return (PAGES_DIR / name).read_text(encoding="utf-8")
+
+
+class TestMainContent:
+    def test_drops_boilerplate_around_main_block(self):
+        html = _page("recipe_blog.html")
+        content = extract(html.encode("utf-8"), URL)["content"]
+
+        for junk in (
+            "cookies",
+            "You might also like",
+            "Loved this",
+            "Copyright",
+            "Home",
+        ):
+            assert junk not in content
+        assert len(content) < len(legacy_scrape(html, URL).content)
+
+    def test_drops_boilerplate_inside_main_block(self):
+        content = extract(_page("recipe_blog.html").encode("utf-8"), URL)["content"]
+
+        for junk in ("Pin it", "Get new recipes", "Subscribe", "sourdough\n"):
+            assert junk not in content
+
+    def test_keeps_every_article_paragraph(self):
+        html = _page("recipe_blog.html")
+        entry = lxml_html.fromstring(html).find_class("entry")[0]
+        # Headings, paragraphs and method steps; not the newsletter box or tags
+        expected = [
+            " ".join(el.text_content().split())
+            for el in entry.iter("h1", "h2", "p", "li")
+            if el.getparent() is entry or el.getparent().tag == "ol"
+        ]
+        paragraphs = extract(html.encode("utf-8"), URL)["content"].split("\n\n")
+
+        assert paragraphs == expected
+
+    def test_deduplicates_paragraphs_and_drops_link_lists(self):
+        content = extract(_page("blog_post.html").encode("utf-8"), URL)["content"]
+
+        assert content.count("Thanks for reading!") == 1
+        assert "Share on Twitter" not in content
+        assert "pgvector" not in content
+        assert content.startswith("Tuning Postgres for Vector Search\n\nBy Sam")
+
+    def test_paragraphless_page_falls_back_to_container(self):
+        html = (
+            b"<html><body><div>menu</div><main><span>Short</span> text</main></body>"
+            b"</html>"
+        )
+        assert extract(html, URL)["content"] == "Short text"
+
+
+class TestTextCounter:
+    @pytest.mark.parametrize("path", PAGES, ids=lambda path: path.name)
+    def test_tracks_extractor_text_count(self, path):
+        html = path.read_bytes()
+        extractor = PageExtractor(max_chars=10**9)
+        counter = TextCounter(max_chars=10**9)
+        # Odd chunk size so tags and multi-byte characters are split
+        for start in range(0, len(html), 1000):
+            extractor.feed(html[start : start + 1000])
+            counter.feed(html[start : start + 1000])
+
+        assert counter.text_chars == pytest.approx(extractor.text_chars, rel=0.05)
+
+    def test_skips_head_and_script_split_across_chunks(self):
+        counter = TextCounter(max_chars=10)
+        assert not counter.feed(b"<html><head><title>Long title</ti")
+        assert not counter.feed(b"tle></head><body><scr")
+        assert not counter.feed(b"ipt>var x = 'long script';</script>12345")
+        assert counter.text_chars == 5
+        assert counter.feed(b"67890</body>")
+
+
+def test_benchmark_extractor_vs_soup():
+    corpus = [path.read_text(encoding="utf-8") for path in PAGES]
+    encoded = [html.encode("utf-8") for html in corpus]
+    rounds = 10
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for html in corpus:
+            legacy_scrape(html, URL)
+    legacy = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for html in encoded:
+            extract(html, URL)
+    single_pass = time.perf_counter() - started
+
+    pages = rounds * len(corpus)
+    print(
+        f"{pages} pages: BeautifulSoup {legacy / pages * 1000:.2f}ms/page, "
+        f"single pass {single_pass / pages * 1000:.2f}ms/page "
+        f"({legacy / single_pass:.1f}x)"
+    )
+    assert single_pass < legacy
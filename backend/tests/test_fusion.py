@@ -0,0 +1,207 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.models.bookmark import FusionConfig, SearchMode
+from app.services.fusion import FusionMethod, RankedList, fuse
+from app.services.search import _resolve_fusion, hybrid_search
+from tests.conftest import TEST_USER_ID
+
+
+def _semantic(*scores):
+    return [
+        {"id": f"s{i}", "url": f"https://s{i}.example", "similarity": score}
+        for i, score in enumerate(scores)
+    ]
+
+
+def _category(*ids_and_scores):
+    return [
+        {
+            "id": id_,
+            "url": f"https://{id_}.example",
+            "category_score": score,
+            "matched_categories": ["python"],
+        }
+        for id_, score in ids_and_scores
+    ]
+
+
+class TestFuse:
+    def test_rrf_rewards_agreement(self):
+        lists = [
+            RankedList("semantic", _semantic(0.9, 0.8), "similarity"),
+            RankedList(
+                "category", _category(("s1", 3.0), ("c0", 2.0)), "category_score"
+            ),
+        ]
+        hits = fuse(lists, FusionMethod.RRF, rrf_k=60)
+
+        assert [hit.row["id"] for hit in hits] == ["s1", "s0", "c0"]
+        assert hits[0].score == pytest.approx(1 / 62 + 1 / 61)
+        assert hits[0].source_scores == {"semantic": 0.8, "category": 3.0}
+        # Columns only the category source returns are kept
+        assert hits[0].row["matched_categories"] == ["python"]
+
+    def test_rrf_ignores_weights(self):
+        lists = [
+            RankedList("semantic", _semantic(0.9), "similarity", weight=5.0),
+            RankedList(
+                "category", _category(("c0", 1.0)), "category_score", weight=0.0
+            ),
+        ]
+        hits = fuse(lists, FusionMethod.RRF)
+
+        assert hits[0].score == hits[1].score
+
+    def test_weighted_rrf(self):
+        lists = [
+            RankedList("semantic", _semantic(0.9), "similarity", weight=1.0),
+            RankedList(
+                "category", _category(("c0", 1.0)), "category_score", weight=3.0
+            ),
+        ]
+        hits = fuse(lists, FusionMethod.WEIGHTED_RRF, rrf_k=10)
+
+        assert [hit.row["id"] for hit in hits] == ["c0", "s0"]
+        assert hits[0].score == pytest.approx(3 / 11)
+
+    def test_linear_keeps_score_gaps(self):
+        # s1 is barely behind s0 on similarity and matches categories; s2 matches
+        # categories too but is far behind on similarity
+        lists = [
+            RankedList("semantic", _semantic(0.90, 0.89, 0.50), "similarity"),
+            RankedList(
+                "category",
+                _category(("s2", 1.0), ("s1", 1.0)),
+                "category_score",
+                weight=0.5,
+            ),
+        ]
+        hits = fuse(lists, FusionMethod.LINEAR)
+
+        assert [hit.row["id"] for hit in hits] == ["s1", "s0", "s2"]
+        assert hits[0].score == pytest.approx(0.39 / 0.40 + 0.5)
+        assert hits[2].score == pytest.approx(0.5)
+
+    def test_limit_and_empty_sources(self):
+        lists = [
+            RankedList("semantic", _semantic(0.9, 0.8, 0.7), "similarity"),
+            RankedList("category", [], "category_score"),
+        ]
+        assert len(fuse(lists, FusionMethod.LINEAR, limit=2)) == 2
+        assert fuse([RankedList("semantic", [], "similarity")]) == []
+
+
+class TestResolveFusion:
+    def test_defaults_from_settings(self):
+        fusion = _resolve_fusion(None, limit=20)
+
+        assert fusion.method == FusionMethod.RRF
+        assert fusion.rrf_k == 60
+        assert fusion.semantic_candidates == fusion.category_candidates == 40
+
+    def test_request_overrides_and_cap(self):
+        fusion = _resolve_fusion(
+            FusionConfig(
+                method=FusionMethod.LINEAR,
+                category_weight=0.0,
+                category_candidates=10**6,
+            ),
+            limit=20,
+        )
+
+        assert fusion.method == FusionMethod.LINEAR
+        assert fusion.category_weight == 0.0
+        assert fusion.semantic_weight == 1.0
+        assert fusion.category_candidates == 200
+
+    def test_settings_candidate_budget(self):
+        with patch("app.services.search.settings") as settings:
+            settings.search_fusion_method = FusionMethod.WEIGHTED_RRF
+            settings.search_rrf_k = 30
+            settings.search_semantic_weight = 1.0
+            settings.search_category_weight = 0.5
+            settings.search_text_weight = 1.0
+            settings.search_semantic_candidates = 100
+            settings.search_category_candidates = 0
+            settings.search_text_candidates = 0
+            settings.search_max_candidates = 200
+            fusion = _resolve_fusion(None, limit=10)
+
+        assert fusion.method == FusionMethod.WEIGHTED_RRF
+        assert fusion.semantic_candidates == 100
+        assert fusion.category_candidates == 20
+
+
+class TestHybridSources:
+    @pytest.mark.asyncio
+    @patch("app.services.search.get_embedding")
+    async def test_sources_run_concurrently(self, mock_get_embedding, mock_supabase):
+        # The keyword sources don't wait for the embedding either
+        async def slow_embedding(query):
+            await asyncio.sleep(0.05)
+            return [0.1] * 1536
+
+        mock_get_embedding.side_effect = slow_embedding
+        rows = {
+            "search_bookmarks": _semantic(0.9),
+            "search_by_categories": _category(("c0", 1.0)),
+            "search_bookmarks_text": [],
+        }
+
+        def rpc(name, params):
+            async def execute():
+                await asyncio.sleep(0.1)
+                return MagicMock(data=rows[name])
+
+            query = MagicMock()
+            query.execute = execute
+            return query
+
+        mock_supabase.rpc.side_effect = rpc
+
+        started = time.perf_counter()
+        results = await hybrid_search(
+            "python", TEST_USER_ID, mock_supabase, mode=SearchMode.HYBRID
+        )
+
+        assert time.perf_counter() - started < 0.2
+        assert {r.id for r in results} == {"s0", "c0"}
+
+    @pytest.mark.asyncio
+    @patch("app.services.search.get_embedding")
+    async def test_failed_source_degrades_to_the_others(
+        self, mock_get_embedding, mock_supabase
+    ):
+        mock_get_embedding.side_effect = RuntimeError("embedding API down")
+        rows = {
+            "search_by_categories": _category(("c0", 1.0)),
+            "search_bookmarks_text": [],
+        }
+
+        def rpc(name, params):
+            query = MagicMock()
+            query.execute = AsyncMock(return_value=MagicMock(data=rows[name]))
+            return query
+
+        mock_supabase.rpc.side_effect = rpc
+
+        results = await hybrid_search(
+            "python", TEST_USER_ID, mock_supabase, mode=SearchMode.HYBRID
+        )
+
+        assert [r.id for r in results] == ["c0"]
+
+    @pytest.mark.asyncio
+    @patch("app.services.search.get_embedding")
+    async def test_all_sources_failing_raises(self, mock_get_embedding, mock_supabase):
+        mock_get_embedding.side_effect = RuntimeError("embedding API down")
+        mock_supabase.rpc.return_value.execute.side_effect = RuntimeError("db down")
+
+        with pytest.raises(RuntimeError, match="embedding API down"):
+            await hybrid_search(
+                "python", TEST_USER_ID, mock_supabase, mode=SearchMode.HYBRID
+            )
@@ -0,0 +1,86 @@
+import asyncio
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.services.http_client import PooledHttpClient, PoolMetrics
+from app.services.scraper import scrape_url
+
+
+class TestPoolMetrics:
+    def test_reuse_ratio(self):
+        metrics = PoolMetrics(requests=10, connections_opened=2)
+        assert metrics.reuse_ratio == 0.8
+
+    def test_reuse_ratio_no_requests(self):
+        assert PoolMetrics().reuse_ratio == 0.0
+
+    def test_snapshot_keys(self):
+        snapshot = PoolMetrics(requests=4, wait_time_total=0.2).snapshot()
+        assert snapshot["wait_time_avg_ms"] == pytest.approx(50.0)
+        assert {"connections_in_use", "reuse_ratio", "waiting"} <= snapshot.keys()
+
+
+class TestPooledHttpClient:
+    @pytest.mark.asyncio
+    async def test_per_host_concurrency_cap(self):
+        active = {"a.test": 0, "b.test": 0}
+        peak = {"a.test": 0, "b.test": 0}
+
+        async def handler(request):
+            host = request.url.host
+            active[host] += 1
+            peak[host] = max(peak[host], active[host])
+            await asyncio.sleep(0.02)
+            active[host] -= 1
+            return httpx.Response(200, text="ok")
+
+        client = PooledHttpClient(
+            per_host_limit=2, http2=False, transport=httpx.MockTransport(handler)
+        )
+        urls = [f"https://a.test/{i}" for i in range(6)] + [
+            f"https://b.test/{i}" for i in range(6)
+        ]
+        await asyncio.gather(*(client.get(url) for url in urls))
+        await client.aclose()
+
+        assert peak == {"a.test": 2, "b.test": 2}
+        assert client.metrics.requests == 12
+        assert client.metrics.in_flight == 0
+        # Idle hosts are forgotten
+        assert client._host_slots == {}
+
+    @pytest.mark.asyncio
+    async def test_keep_alive_reuses_connection(self, stub_server):
+        stub_server.routes["/page"] = (
+            200,
+            {"Content-Type": "text/html"},
+            b"<html></html>",
+        )
+        client = PooledHttpClient(http2=False)
+
+        for _ in range(5):
+            response = await client.get(f"{stub_server.base_url}/page")
+            assert response.status_code == 200
+        await client.aclose()
+
+        assert client.metrics.requests == 5
+        assert client.metrics.connections_opened == 1
+        assert client.metrics.reuse_ratio == 0.8
+
+    @pytest.mark.asyncio
+    async def test_scrape_url_uses_shared_client(self, stub_server):
+        stub_server.routes["/"] = (
+            200,
+            {"Content-Type": "text/html"},
+            b"<html><head><title>Pooled</title></head><body>Body</body></html>",
+        )
+        client = PooledHttpClient(http2=False)
+
+        with patch("app.services.scraper.get_http_client", return_value=client):
+            result = await scrape_url(f"{stub_server.base_url}/")
+        await client.aclose()
+
+        assert result.title == "Pooled"
+        assert client.metrics.requests == 1
@@ -0,0 +1,230 @@
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.models.bookmark import ImportStatus, ProcessingStatus
+from app.services import importer
+from app.services.importer import ImportedBookmark, import_bookmarks, parse_import
+from app.services.ingestion import IngestionQueue
+from tests.conftest import TEST_USER_ID
+
+NETSCAPE_HTML = b"""<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks</H1>
+<DL><p>
+    <DT><H3>Dev</H3>
+    <DL><p>
+        <DT><A HREF="https://docs.python.org/" ADD_DATE="1700000000">Python docs</A>
+        <DD>The official documentation
+        <DT><A HREF="https://fastapi.tiangolo.com/">FastAPI</A>
+    </DL><p>
+    <DT><A HREF="javascript:alert(1)">Bookmarklet</A>
+</DL><p>
+"""
+
+
+def _mock_existing(mock_supabase, urls, count=None):
+    query = mock_supabase.table.return_value.select.return_value.eq.return_value
+    query.execute.return_value = MagicMock(
+        data=[{"url": url} for url in urls], count=len(urls) if count is None else count
+    )
+
+
+def _mock_upsert_echo(mock_supabase):
+    """upsert() returns every row it was given, with an id."""
+
+    def upsert(rows, **kwargs):
+        builder = MagicMock()
+
+        async def execute():
+            return MagicMock(data=[{**row, "id": f"id-{row['url']}"} for row in rows])
+
+        builder.execute = execute
+        return builder
+
+    mock_supabase.table.return_value.upsert.side_effect = upsert
+
+
+@pytest.fixture
+def queue():
+    fresh = IngestionQueue()
+    with patch("app.services.importer.ingestion_queue", fresh):
+        yield fresh
+
+
+class TestParseImport:
+    def test_netscape_html(self):
+        bookmarks = parse_import(NETSCAPE_HTML)
+
+        assert [b.url for b in bookmarks] == [
+            "https://docs.python.org/",
+            "https://fastapi.tiangolo.com/",
+            "javascript:alert(1)",
+        ]
+        assert bookmarks[0].title == "Python docs"
+        assert bookmarks[0].description == "The official documentation"
+        assert bookmarks[0].created_at.startswith("2023-11-14")
+        assert bookmarks[1].description is None
+
+    def test_chrome_json(self):
+        document = {
+            "roots": {
+                "bookmark_bar": {
+                    "type": "folder",
+                    "children": [
+                        {
+                            "type": "url",
+                            "name": "Example",
+                            "url": "https://example.com/",
+                            "date_added": "13345000000000000",
+                        },
+                    ],
+                }
+            }
+        }
+        [bookmark] = parse_import(json.dumps(document).encode())
+
+        assert bookmark.url == "https://example.com/"
+        assert bookmark.title == "Example"
+        assert bookmark.created_at.startswith("2023-")
+
+    def test_missing_or_bad_timestamps_are_ignored(self):
+        document = [
+            {"url": "https://a.example/", "dateAdded": None},
+            {"url": "https://b.example/", "dateAdded": "soon"},
+            {"url": "https://c.example/", "date_added": None},
+        ]
+
+        bookmarks = parse_import(json.dumps(document).encode())
+
+        assert [b.created_at for b in bookmarks] == [None, None, None]
+
+    def test_own_ndjson_export(self):
+        lines = [
+            {"id": "1", "url": "https://a.example/", "title": "A", "categories": ["x"]},
+            {"id": "2", "url": "https://b.example/", "title": "B", "categories": []},
+        ]
+        content = "\n".join(json.dumps(line) for line in lines).encode()
+
+        assert [b.title for b in parse_import(content)] == ["A", "B"]
+
+    def test_garbage_rejected(self):
+        with pytest.raises(ValueError):
+            parse_import(b"not a bookmark file")
+
+
+class TestImportBookmarks:
+    @pytest.mark.asyncio
+    async def test_dedupes_and_respects_limit(self, mock_supabase, queue):
+        _mock_existing(mock_supabase, ["https://old.example/"])
+        _mock_upsert_echo(mock_supabase)
+        bookmarks = [
+            ImportedBookmark(url="https://old.example/"),
+            ImportedBookmark(url="https://new1.example/"),
+            ImportedBookmark(url="https://NEW1.example"),  # same URL once normalized
+            ImportedBookmark(url="https://new2.example/"),
+            ImportedBookmark(url="https://new3.example/"),
+            ImportedBookmark(url="ftp://files.example/"),
+            ImportedBookmark(url="http://xn--/"),
+            ImportedBookmark(url="http://x.example:99999/"),
+            ImportedBookmark(url="http://a\x01b.example/"),
+        ]
+
+        job = await import_bookmarks(
+            mock_supabase, TEST_USER_ID, bookmarks, max_bookmarks=3
+        )
+
+        assert (job.total, job.duplicates, job.invalid) == (4, 1, 4)
+        assert job.inserted == 2
+        assert job.over_limit == 1
+        rows = mock_supabase.table.return_value.upsert.call_args[0][0]
+        assert [row["url"] for row in rows] == [
+            "https://new1.example/",
+            "https://new2.example/",
+        ]
+        assert mock_supabase.table.return_value.upsert.call_args.kwargs == {
+            "on_conflict": "user_id,url",
+            "ignore_duplicates": True,
+        }
+
+    @pytest.mark.asyncio
+    async def test_inserts_in_batches(self, mock_supabase, queue):
+        _mock_existing(mock_supabase, [])
+        _mock_upsert_echo(mock_supabase)
+        bookmarks = [ImportedBookmark(url=f"https://e.example/{i}") for i in range(5)]
+
+        with patch("app.services.importer.settings.import_batch_size", 2):
+            job = await import_bookmarks(
+                mock_supabase, TEST_USER_ID, bookmarks, max_bookmarks=50
+            )
+
+        assert job.inserted == 5
+        assert mock_supabase.table.return_value.upsert.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_progress_tracks_ingestion(self, mock_supabase, queue):
+        _mock_existing(mock_supabase, [])
+        _mock_upsert_echo(mock_supabase)
+        bookmarks = [ImportedBookmark(url=f"https://e.example/{i}") for i in range(3)]
+        outcomes = iter(
+            [
+                ProcessingStatus.COMPLETED,
+                ProcessingStatus.FAILED,
+                ProcessingStatus.COMPLETED,
+            ]
+        )
+
+        async def process(job, supabase):
+            return next(outcomes)
+
+        with (
+            patch("app.services.ingestion.process_bookmark", side_effect=process),
+            patch(
+                "app.services.ingestion.get_supabase_client", return_value=mock_supabase
+            ),
+        ):
+            job = await import_bookmarks(
+                mock_supabase, TEST_USER_ID, bookmarks, max_bookmarks=50
+            )
+            assert job.status == ImportStatus.PROCESSING
+            await queue.start(2)
+            await asyncio.gather(*importer._feeders)
+            await queue.join()
+            await queue.stop()
+
+        assert (job.processed, job.failed) == (2, 1)
+        assert job.status == ImportStatus.COMPLETED
+
+
+class TestImportEndpoint:
+    def test_import_upload(self, client, mock_supabase, queue):
+        _mock_existing(mock_supabase, [])
+        _mock_upsert_echo(mock_supabase)
+
+        response = client.post(
+            "/api/v1/bookmarks/import",
+            files={"file": ("bookmarks.html", NETSCAPE_HTML, "text/html")},
+        )
+
+        assert response.status_code == 202
+        body = response.json()
+        assert body["inserted"] == 2
+        assert body["invalid"] == 1
+
+        status = client.get(f"/api/v1/bookmarks/imports/{body['id']}")
+        assert status.status_code == 200
+        assert status.json()["id"] == body["id"]
+
+    def test_unknown_import_is_404(self, client):
+        assert client.get("/api/v1/bookmarks/imports/nope").status_code == 404
+
+    def test_rejects_unparseable_file(self, client):
+        response = client.post(
+            "/api/v1/bookmarks/import",
+            files={"file": ("x.txt", b"hello", "text/plain")},
+        )
+
+        assert response.status_code == 400
@@ -0,0 +1,419 @@
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.models.bookmark import ProcessingStatus
+from app.services.archive import compress_html, decompress_html
+from app.services.ingestion import (
+    IngestionJob,
+    IngestionQueue,
+    process_bookmark,
+    save_categories,
+    save_embeddings,
+)
+from app.services.scraper import FetchedPage, ScrapedData
+from tests.conftest import TEST_USER_ID
+
+
+def _job(**data):
+    return IngestionJob(
+        bookmark_id="bookmark-1",
+        user_id=TEST_USER_ID,
+        url="https://example.com/",
+        data=data,
+    )
+
+
+def _progress_updates(mock_supabase):
+    """All payloads written to bookmarks via update()."""
+    return [c[0][0] for c in mock_supabase.table.return_value.update.call_args_list]
+
+
+@pytest.fixture
+def pipeline():
+    """Patch every external call made by the ingestion pipeline."""
+    with (
+        patch("app.services.ingestion.fetch_page", new_callable=AsyncMock) as fetch,
+        patch("app.services.ingestion.parse_page", new_callable=AsyncMock) as scrape,
+        patch(
+            "app.services.ingestion.summarize_content", new_callable=AsyncMock
+        ) as summarize,
+        patch("app.services.ingestion.get_embedding", new_callable=AsyncMock) as embed,
+        patch(
+            "app.services.ingestion.generate_categories", new_callable=AsyncMock
+        ) as categorize,
+    ):
+        scraped = ScrapedData(
+            title="Scraped Title",
+            description="Scraped description",
+            content="Scraped content",
+            favicon_url="https://example.com/scraped-favicon.ico",
+        )
+        # Fetching extracts while streaming; parse_page is only used on archives
+        fetch.return_value = FetchedPage(
+            url="https://example.com/",
+            status_code=200,
+            body=b"<html></html>",
+            etag='"v1"',
+            scraped=scraped,
+        )
+        scrape.return_value = scraped
+        summarize.return_value = "A summary."
+        embed.return_value = [0.1] * 1536
+        categorize.return_value = ["python", "web"]
+        yield MagicMock(
+            fetch=fetch,
+            scrape=scrape,
+            summarize=summarize,
+            embed=embed,
+            categorize=categorize,
+        )
+
+
+class TestProcessBookmark:
+    @pytest.mark.asyncio
+    async def test_uses_scraped_data_when_not_provided(self, pipeline, mock_supabase):
+        status = await process_bookmark(_job(), mock_supabase)
+
+        assert status == ProcessingStatus.COMPLETED
+        assert pipeline.fetch.call_args[0][0] == "https://example.com/"
+        fields = _progress_updates(mock_supabase)[1]
+        assert fields["title"] == "Scraped Title"
+        assert fields["description"] == "Scraped description"
+        assert fields["content"] == "Scraped content"
+        assert fields["favicon_url"] == "https://example.com/scraped-favicon.ico"
+        assert _progress_updates(mock_supabase)[-1]["summary"] == "A summary."
+
+    @pytest.mark.asyncio
+    async def test_user_data_takes_precedence(self, pipeline, mock_supabase):
+        await process_bookmark(
+            _job(title="User Title", description="User description"), mock_supabase
+        )
+
+        fields = _progress_updates(mock_supabase)[1]
+        assert "title" not in fields
+        assert "description" not in fields
+        # Content should be from scraper since user didn't provide it
+        assert fields["content"] == "Scraped content"
+
+    @pytest.mark.asyncio
+    async def test_records_stage_progress(self, pipeline, mock_supabase):
+        await process_bookmark(_job(), mock_supabase)
+
+        final = _progress_updates(mock_supabase)[-1]
+        assert final["processing_status"] == "completed"
+        assert final["processing_stages"] == {
+            "scrape": "completed",
+            "summarize": "completed",
+            "embed": "completed",
+            "categorize": "completed",
+        }
+
+    @pytest.mark.asyncio
+    async def test_scraper_failure_doesnt_block(self, pipeline, mock_supabase):
+        pipeline.fetch.side_effect = Exception("Network error")
+
+        status = await process_bookmark(_job(title="Manual Title"), mock_supabase)
+
+        assert status == ProcessingStatus.FAILED
+        final = _progress_updates(mock_supabase)[-1]
+        assert final["processing_stages"]["scrape"] == "failed"
+        assert final["processing_stages"]["summarize"] == "skipped"
+        # Embedding and categories still generated from the user's title
+        assert final["processing_stages"]["embed"] == "completed"
+        assert final["processing_stages"]["categorize"] == "completed"
+        pipeline.embed.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_ai_stages_run_concurrently(self, pipeline, mock_supabase):
+        def slow(result):
+            async def call(*args, **kwargs):
+                await asyncio.sleep(0.2)
+                return result
+
+            return call
+
+        pipeline.summarize.side_effect = slow("A summary.")
+        pipeline.embed.side_effect = slow([0.1] * 1536)
+        pipeline.categorize.side_effect = slow(["python"])
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        status = await process_bookmark(_job(), mock_supabase)
+        elapsed = loop.time() - started
+
+        assert status == ProcessingStatus.COMPLETED
+        # Roughly the slowest stage, not the sum of all three
+        assert elapsed < 0.5
+
+    @pytest.mark.asyncio
+    async def test_stage_timeout_is_isolated(self, pipeline, mock_supabase):
+        async def hang(*args, **kwargs):
+            await asyncio.sleep(10)
+
+        pipeline.summarize.side_effect = hang
+
+        with patch("app.services.ingestion.settings.summary_timeout", 0.05):
+            status = await process_bookmark(_job(), mock_supabase)
+
+        assert status == ProcessingStatus.FAILED
+        final = _progress_updates(mock_supabase)[-1]
+        assert final["processing_stages"]["summarize"] == "failed"
+        assert final["processing_stages"]["embed"] == "completed"
+        assert final["processing_stages"]["categorize"] == "completed"
+        assert "summary" not in final
+
+
+def _archive_row(mock_supabase, **row):
+    archive = mock_supabase.table.return_value.select.return_value.eq.return_value
+    archive.limit.return_value.execute.return_value = MagicMock(
+        data=[
+            {"bookmark_id": "bookmark-1", "etag": '"v1"', "last_modified": None, **row}
+        ]
+    )
+
+
+class TestArchive:
+    @pytest.mark.asyncio
+    async def test_scrape_archives_raw_page(self, pipeline, mock_supabase):
+        await process_bookmark(_job(), mock_supabase)
+
+        [archived] = [
+            c[0][0]
+            for c in mock_supabase.table.return_value.upsert.call_args_list
+            if "html_compressed" in c[0][0]
+        ]
+        assert decompress_html(archived["html_compressed"]) == "<html></html>"
+        assert archived["etag"] == '"v1"'
+        assert archived["text_content"] == "Scraped content"
+        assert archived["truncated"] is False
+
+    @pytest.mark.asyncio
+    async def test_refresh_not_modified_skips_processing(self, pipeline, mock_supabase):
+        _archive_row(mock_supabase)
+        pipeline.fetch.return_value = FetchedPage(
+            url="https://example.com/", status_code=304
+        )
+        job = IngestionJob(
+            "bookmark-1", TEST_USER_ID, "https://example.com/", refresh=True
+        )
+
+        status = await process_bookmark(job, mock_supabase)
+
+        assert status == ProcessingStatus.COMPLETED
+        assert pipeline.fetch.call_args.kwargs["etag"] == '"v1"'
+        pipeline.summarize.assert_not_called()
+        pipeline.embed.assert_not_called()
+        pipeline.categorize.assert_not_called()
+        final = _progress_updates(mock_supabase)[-1]
+        assert final["processing_stages"]["embed"] == "skipped"
+
+    @pytest.mark.asyncio
+    async def test_reprocess_from_archive_without_network(
+        self, pipeline, mock_supabase
+    ):
+        _archive_row(mock_supabase, html_compressed=compress_html("<p>archived</p>"))
+        job = IngestionJob(
+            "bookmark-1", TEST_USER_ID, "https://example.com/", from_archive=True
+        )
+
+        status = await process_bookmark(job, mock_supabase)
+
+        assert status == ProcessingStatus.COMPLETED
+        pipeline.fetch.assert_not_called()
+        pipeline.scrape.assert_awaited_once_with(
+            "<p>archived</p>", "https://example.com/"
+        )
+        pipeline.embed.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_truncated_archive_is_fetched_again(self, pipeline, mock_supabase):
+        _archive_row(
+            mock_supabase,
+            html_compressed=compress_html("<p>start of the pa"),
+            truncated=True,
+        )
+        job = IngestionJob(
+            "bookmark-1", TEST_USER_ID, "https://example.com/", from_archive=True
+        )
+
+        status = await process_bookmark(job, mock_supabase)
+
+        assert status == ProcessingStatus.COMPLETED
+        pipeline.fetch.assert_awaited_once()
+        # Unconditional: a 304 would leave only the truncated copy to work from
+        assert pipeline.fetch.call_args.kwargs["etag"] is None
+        pipeline.scrape.assert_not_called()
+
+
+class TestSaveEmbeddings:
+    @pytest.mark.asyncio
+    async def test_single_upsert_for_batch(self, mock_supabase):
+        with patch(
+            "app.services.ingestion.get_embeddings",
+            new_callable=AsyncMock,
+            return_value=[[0.1], None, [0.3]],
+        ):
+            written = await save_embeddings(
+                mock_supabase, [("b1", "one"), ("b2", "two"), ("b3", "three")]
+            )
+
+        assert written == ["b1", "b3"]
+        mock_supabase.table.return_value.upsert.assert_called_once_with(
+            [
+                {"bookmark_id": "b1", "embedding": [0.1]},
+                {"bookmark_id": "b3", "embedding": [0.3]},
+            ],
+            on_conflict="bookmark_id",
+        )
+
+
+class TestSaveCategories:
+    @pytest.mark.asyncio
+    async def test_single_rpc_for_all_categories(self, pipeline, mock_supabase):
+        await process_bookmark(_job(), mock_supabase)
+
+        mock_supabase.rpc.assert_called_once_with(
+            "assign_bookmark_categories",
+            {
+                "p_bookmark_id": "bookmark-1",
+                "p_user_id": TEST_USER_ID,
+                "p_names": ["python", "web"],
+                "p_replace": False,
+            },
+        )
+        tables = [c[0][0] for c in mock_supabase.table.call_args_list]
+        assert "categories" not in tables
+        assert "bookmark_categories" not in tables
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("flag", ["refresh", "from_archive"])
+    async def test_reprocessing_replaces_categories(
+        self, pipeline, mock_supabase, flag
+    ):
+        _archive_row(mock_supabase, html_compressed=compress_html("<p>archived</p>"))
+        job = IngestionJob(
+            "bookmark-1", TEST_USER_ID, "https://example.com/", **{flag: True}
+        )
+
+        await process_bookmark(job, mock_supabase)
+
+        assert mock_supabase.rpc.call_args[0][1]["p_replace"] is True
+
+    @pytest.mark.asyncio
+    async def test_replace_diffs_in_the_same_call(self, pipeline, mock_supabase):
+        result = await save_categories(
+            mock_supabase, TEST_USER_ID, "bookmark-1", {"title": "T"}, replace=True
+        )
+
+        assert result == ["python", "web"]
+        assert mock_supabase.rpc.call_args[0][1]["p_replace"] is True
+        mock_supabase.table.assert_not_called()
+
+
+class TestIngestionQueue:
+    @pytest.mark.asyncio
+    async def test_workers_drain_queue(self):
+        queue = IngestionQueue()
+        processed = []
+
+        async def fake_process(job, supabase):
+            processed.append(job.bookmark_id)
+
+        with (
+            patch("app.services.ingestion.process_bookmark", side_effect=fake_process),
+            patch("app.services.ingestion.get_supabase_client"),
+        ):
+            await queue.start(workers=2)
+            for i in range(5):
+                queue.enqueue(
+                    IngestionJob(bookmark_id=f"b{i}", user_id=TEST_USER_ID, url="u")
+                )
+            await asyncio.wait_for(queue.join(), timeout=1)
+            await queue.stop()
+
+        assert sorted(processed) == ["b0", "b1", "b2", "b3", "b4"]
+
+    @pytest.mark.asyncio
+    async def test_worker_survives_job_failure(self):
+        queue = IngestionQueue()
+
+        with (
+            patch(
+                "app.services.ingestion.process_bookmark",
+                side_effect=[Exception("boom"), None],
+            ) as process,
+            patch("app.services.ingestion.get_supabase_client"),
+        ):
+            await queue.start(workers=1)
+            queue.enqueue(IngestionJob(bookmark_id="b0", user_id=TEST_USER_ID, url="u"))
+            queue.enqueue(IngestionJob(bookmark_id="b1", user_id=TEST_USER_ID, url="u"))
+            await asyncio.wait_for(queue.join(), timeout=1)
+            await queue.stop()
+
+        assert process.call_count == 2
+
+    def test_full_when_maxsize_reached(self):
+        queue = IngestionQueue(maxsize=1)
+        queue.enqueue(IngestionJob(bookmark_id="b0", user_id=TEST_USER_ID, url="u"))
+        assert queue.full()
+
+    @pytest.mark.asyncio
+    async def test_recover_requeues_claimed_bookmarks(self, mock_supabase):
+        queue = IngestionQueue()
+        rows = [
+            {
+                "id": f"b{i}",
+                "user_id": TEST_USER_ID,
+                "url": f"https://e.com/{i}",
+                "ingestion_input": {"title": "Mine"} if i == 0 else {},
+            }
+            for i in range(3)
+        ]
+        mock_supabase.rpc.return_value.execute.side_effect = [
+            MagicMock(data=rows[:2]),
+            MagicMock(data=rows[2:]),
+        ]
+        before = datetime.now(timezone.utc)
+
+        recovered = await queue.recover(mock_supabase, before, batch_size=2)
+
+        assert recovered == 3
+        assert queue.qsize() == 3
+        first, second = mock_supabase.rpc.call_args_list
+        assert first.args[0] == "claim_unfinished_bookmarks"
+        assert first.args[1]["p_before"] == before.isoformat()
+        assert (first.args[1]["p_limit"], first.args[1]["p_after"]) == (2, None)
+        assert second.args[1]["p_after"] == "b1"
+        # Only what the user sent comes back as overrides, never scraped fields
+        jobs = [await queue.queue.get() for _ in range(3)]
+        assert {job.bookmark_id: job.data for job in jobs} == {
+            "b0": {"title": "Mine"},
+            "b1": {},
+            "b2": {},
+        }
+
+    @pytest.mark.asyncio
+    async def test_recover_queues_nothing_another_worker_claimed(self, mock_supabase):
+        queue = IngestionQueue()
+        mock_supabase.rpc.return_value.execute.return_value = MagicMock(data=[])
+
+        assert await queue.recover(mock_supabase, datetime.now(timezone.utc)) == 0
+        assert queue.qsize() == 0
+
+    @pytest.mark.asyncio
+    async def test_deferred_job_waits_for_space(self):
+        queue = IngestionQueue(maxsize=1)
+        queue.enqueue(IngestionJob(bookmark_id="b0", user_id=TEST_USER_ID, url="u"))
+        queue.defer(IngestionJob(bookmark_id="b1", user_id=TEST_USER_ID, url="v"))
+        await asyncio.sleep(0)
+        assert queue.qsize() == 1
+
+        first = await queue.queue.get()
+        queue.queue.task_done(first)
+        await asyncio.sleep(0)
+        assert queue.qsize() == 1
+        assert (await queue.queue.get()).bookmark_id == "b1"
+        await queue.stop()
@@ -0,0 +1,238 @@
+import asyncio
+import socket
+import time
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.services.http_client import PooledHttpClient
+from app.services.link_checker import Histogram, LinkChecker, TokenBucket
+
+HTML = {"Content-Type": "text/html"}
+
+
+def _unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest_asyncio.fixture
+async def checker():
+    client = PooledHttpClient(http2=False)
+    checker = LinkChecker(
+        per_domain_rate=1000, per_domain_burst=100, timeout=2, client=client
+    )
+    yield checker
+    await client.aclose()
+
+
+class TestHistogram:
+    def test_cumulative_buckets(self):
+        histogram = Histogram([0.1, 1.0])
+        for value in (0.05, 0.5, 0.7, 5.0):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+        assert snapshot["count"] == 4
+        assert snapshot["buckets"] == {"0.1": 1, "1.0": 3, "+Inf": 4}
+
+
+class TestTokenBucket:
+    @pytest.mark.asyncio
+    async def test_limits_rate_after_burst(self):
+        bucket = TokenBucket(rate=20, burst=2)
+        started = time.perf_counter()
+        for _ in range(6):
+            await bucket.acquire()
+        # 2 immediate, then 4 more at 20/s
+        assert time.perf_counter() - started >= 0.18
+
+
+class TestCheck:
+    @pytest.mark.asyncio
+    async def test_live_and_dead_links(self, checker, stub_server):
+        stub_server.routes["/ok"] = (200, HTML, b"ok")
+        stub_server.routes["/gone"] = (404, HTML, b"gone")
+        stub_server.routes["/flaky"] = (503, HTML, b"busy")
+
+        ok = await checker.check("b1", f"{stub_server.base_url}/ok")
+        gone = await checker.check("b2", f"{stub_server.base_url}/gone")
+        flaky = await checker.check("b3", f"{stub_server.base_url}/flaky")
+
+        assert (ok.is_dead, ok.status_code) == (False, 200)
+        assert (gone.is_dead, gone.status_code) == (True, 404)
+        # Server errors are inconclusive: neither dead nor alive
+        assert (flaky.is_dead, flaky.status_code) == (None, 503)
+        assert [m for m, path, _ in stub_server.requests if path == "/ok"] == ["HEAD"]
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_ranged_get(self, checker, stub_server):
+        stub_server.routes[("HEAD", "/nohead")] = (405, HTML, b"")
+        stub_server.routes[("GET", "/nohead")] = (200, HTML, b"page")
+
+        result = await checker.check("b1", f"{stub_server.base_url}/nohead")
+
+        assert (result.is_dead, result.status_code) == (False, 200)
+        method, _, headers = stub_server.requests[-1]
+        assert method == "GET"
+        assert headers["Range"] == "bytes=0-0"
+
+    @pytest.mark.asyncio
+    async def test_refused_connection_is_unreachable_not_dead(self, checker):
+        result = await checker.check("b1", f"http://127.0.0.1:{_unused_port()}/")
+
+        # One failed connection may be our own network; the RPC counts them
+        assert result.is_dead is None
+        assert result.unreachable
+        assert result.error
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("url", ["http://xn--/", "http://[::1/", "http://a\x01b/"])
+    async def test_unparseable_url_is_inconclusive(self, checker, url):
+        result = await checker.check("b1", url)
+
+        assert result.is_dead is None
+        assert not result.unreachable
+        assert result.error
+        assert checker.metrics.snapshot()["errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_timeout_is_inconclusive(self):
+        def handler(request):
+            raise httpx.ReadTimeout("timed out", request=request)
+
+        client = PooledHttpClient(http2=False, transport=httpx.MockTransport(handler))
+        checker = LinkChecker(client=client)
+        result = await checker.check("b1", "https://slow.test/")
+        await client.aclose()
+
+        assert result.is_dead is None
+        assert result.error
+        assert checker.metrics.snapshot()["dead"] == 0
+
+    @pytest.mark.asyncio
+    async def test_per_domain_concurrency_cap(self):
+        active, peak = {}, {}
+
+        async def handler(request):
+            host = request.url.host
+            active[host] = active.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), active[host])
+            await asyncio.sleep(0.02)
+            active[host] -= 1
+            return httpx.Response(200)
+
+        client = PooledHttpClient(http2=False, transport=httpx.MockTransport(handler))
+        checker = LinkChecker(
+            per_domain_concurrency=1,
+            per_domain_rate=1000,
+            per_domain_burst=100,
+            client=client,
+        )
+        urls = [
+            f"https://{host}/{i}" for host in ("a.test", "b.test") for i in range(4)
+        ]
+        await asyncio.gather(
+            *(checker.check(str(i), url) for i, url in enumerate(urls))
+        )
+        await client.aclose()
+
+        assert peak == {"a.test": 1, "b.test": 1}
+        assert checker._domains == {}
+
+
+class TestRunOnce:
+    @pytest.mark.asyncio
+    async def test_checks_batch_and_writes_back_once(
+        self, checker, stub_server, mock_supabase
+    ):
+        stub_server.routes["/ok"] = (200, HTML, b"ok")
+        stub_server.routes["/gone"] = (410, HTML, b"")
+        query = mock_supabase.table.return_value.select.return_value.or_.return_value
+        query = query.order.return_value.limit.return_value
+        query.execute.return_value = MagicMock(
+            data=[
+                {"id": "b1", "url": f"{stub_server.base_url}/ok"},
+                {"id": "b2", "url": f"{stub_server.base_url}/gone"},
+            ]
+        )
+
+        checked = await checker.run_once(mock_supabase)
+
+        assert checked == 2
+        mock_supabase.rpc.assert_called_once()
+        name, params = mock_supabase.rpc.call_args[0]
+        assert name == "record_link_checks"
+        assert {r["id"]: r["is_dead"] for r in params["p_results"]} == {
+            "b1": False,
+            "b2": True,
+        }
+        assert params["p_dead_after"] == checker.dead_after_failures
+        order = (
+            mock_supabase.table.return_value.select.return_value.or_.return_value.order
+        )
+        assert order.call_args.kwargs == {"nullsfirst": True}
+
+        snapshot = checker.metrics.snapshot()
+        assert snapshot["checked"] == 2
+        assert snapshot["dead"] == 1
+        assert snapshot["latency_seconds"]["count"] == 2
+        assert snapshot["batch_duration_seconds"]["count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_timeout_keeps_stored_verdict(self, mock_supabase):
+        # b1 was marked dead on an earlier run; a timeout now must not revive it
+        def handler(request):
+            raise httpx.ConnectTimeout("timed out", request=request)
+
+        client = PooledHttpClient(http2=False, transport=httpx.MockTransport(handler))
+        checker = LinkChecker(client=client)
+        query = mock_supabase.table.return_value.select.return_value.or_.return_value
+        query = query.order.return_value.limit.return_value
+        query.execute.return_value = MagicMock(
+            data=[{"id": "b1", "url": "https://slow.test/"}]
+        )
+
+        await checker.run_once(mock_supabase)
+        await client.aclose()
+
+        # NULL is_dead: record_link_checks keeps the stored value (COALESCE)
+        # and only moves last_checked_at
+        _, params = mock_supabase.rpc.call_args[0]
+        assert params["p_results"][0]["is_dead"] is None
+        assert params["p_results"][0]["checked_at"]
+
+    @pytest.mark.asyncio
+    async def test_bad_url_does_not_sink_the_batch(
+        self, checker, stub_server, mock_supabase
+    ):
+        stub_server.routes["/ok"] = (200, HTML, b"ok")
+        query = mock_supabase.table.return_value.select.return_value.or_.return_value
+        query = query.order.return_value.limit.return_value
+        query.execute.return_value = MagicMock(
+            data=[
+                {"id": "b1", "url": f"{stub_server.base_url}/ok"},
+                {"id": "b2", "url": "http://xn--/"},
+                {"id": "b3", "url": f"http://127.0.0.1:{_unused_port()}/"},
+            ]
+        )
+
+        assert await checker.run_once(mock_supabase) == 3
+
+        _, params = mock_supabase.rpc.call_args[0]
+        results = {r["id"]: r for r in params["p_results"]}
+        assert results["b1"]["is_dead"] is False
+        assert results["b2"]["is_dead"] is None
+        assert (results["b3"]["is_dead"], results["b3"]["unreachable"]) == (None, True)
+
+    @pytest.mark.asyncio
+    async def test_nothing_stale(self, checker, mock_supabase):
+        query = mock_supabase.table.return_value.select.return_value.or_.return_value
+        query = query.order.return_value.limit.return_value
+        query.execute.return_value = MagicMock(data=[])
+
+        assert await checker.run_once(mock_supabase) == 0
+        mock_supabase.rpc.assert_not_called()
@@ -0,0 +1,60 @@
+"""Load test: concurrent requests must overlap their database round trips.
+
+Every Supabase call is simulated as a 100ms network round trip. With the
+async client, N concurrent requests should finish in about one round trip
+rather than N of them back to back.
+"""
+
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from app.core.deps import get_current_user_id, get_supabase_client
+from app.main import app
+from tests.conftest import TEST_USER_ID, SupabaseMock
+
+ROUND_TRIP = 0.1
+CONCURRENCY = 20
+
+
+@pytest.fixture
+def slow_supabase(sample_bookmark):
+    supabase = SupabaseMock()
+
+    async def execute():
+        await asyncio.sleep(ROUND_TRIP)
+        return MagicMock(data=sample_bookmark)
+
+    query = (
+        supabase.table.return_value.select.return_value.eq.return_value.eq.return_value
+    )
+    query = query.single.return_value
+    query.execute.side_effect = execute
+
+    async def mock_user_id():
+        return TEST_USER_ID
+
+    app.dependency_overrides[get_current_user_id] = mock_user_id
+    app.dependency_overrides[get_supabase_client] = lambda: supabase
+    yield supabase
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_do_not_serialize(slow_supabase):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        started = time.perf_counter()
+        responses = await asyncio.gather(
+            *(client.get("/api/v1/bookmarks/bookmark-1") for _ in range(CONCURRENCY))
+        )
+        elapsed = time.perf_counter() - started
+
+    assert all(r.status_code == 200 for r in responses)
+    throughput = CONCURRENCY / elapsed
+    print(f"{CONCURRENCY} requests in {elapsed:.2f}s ({throughput:.0f} req/s)")
+    # Serialized DB calls would take CONCURRENCY * ROUND_TRIP = 2s
+    assert elapsed < CONCURRENCY * ROUND_TRIP / 4
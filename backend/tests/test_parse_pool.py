@@ -0,0 +1,150 @@
+"""Parse pool: extraction in worker processes, and its effect on latency.
+
+The benchmark serves deliberately expensive pages (tens of thousands of small
+elements) from a local server, scrapes several at once and measures how long
+an unrelated request to the same app takes meanwhile. Parsing on the event
+loop makes those requests wait behind every page; with the pool they don't.
+It asserts on wall-clock latency, so it only runs when asked for:
+
+    RUN_BENCHMARKS=1 pytest tests/test_parse_pool.py -s
+"""
+
+import asyncio
+import os
+import statistics
+import time
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.main import app
+from app.services.extractor import extract
+from app.services.parse_pool import ParsePool
+from app.services.scraper import fetch_page, scrape_url
+
+HEAVY_PAGE = (
+    b"<html><head><title>Heavy</title></head><body><main>"
+    + b"<div><span>x</span><a href='#'>y</a></div>" * 30000
+    + b"</main></body></html>"
+)
+CONCURRENT_SCRAPES = 4
+
+
+@pytest_asyncio.fixture
+async def pool():
+    pool = ParsePool(workers=2)
+    pool.start()
+    # Pay process start-up before anything is measured
+    await asyncio.gather(
+        *(pool.extract(b"<html></html>", "https://example.com/") for _ in range(4))
+    )
+    with patch("app.services.scraper.parse_pool", pool):
+        yield pool
+    await pool.stop()
+
+
+@pytest.fixture
+def heavy_server(stub_server):
+    stub_server.routes["/heavy"] = (200, {"Content-Type": "text/html"}, HEAVY_PAGE)
+    return stub_server
+
+
+class TestParsePool:
+    @pytest.mark.asyncio
+    async def test_worker_result_matches_in_process(self, pool):
+        html = (
+            b"<html><head><title>T</title><meta name='description' content='D'>"
+            b"<link rel='icon' href='/i.png'></head>"
+            b"<body><main>Hello</main></body></html>"
+        )
+        result = await pool.extract(html, "https://example.com/page")
+
+        assert result == extract(html, "https://example.com/page")
+        assert pool.metrics.pages == 5
+        assert pool.metrics.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_fetch_page_parses_in_pool(self, pool, heavy_server):
+        page = await fetch_page(f"{heavy_server.base_url}/heavy")
+
+        assert page.scraped.title == "Heavy"
+        # Text is counted on the loop, so the download still stops early
+        assert page.truncated
+        assert len(page.body) < len(HEAVY_PAGE)
+        assert HEAVY_PAGE.startswith(page.body)
+        assert pool.metrics.bytes >= len(page.body)
+
+    @pytest.mark.asyncio
+    async def test_not_running_parses_in_process(self):
+        pool = ParsePool(workers=0)
+        pool.start()
+
+        assert not pool.running
+        result = await pool.extract(b"<title>Inline</title>", "https://example.com/")
+        assert result["title"] == "Inline"
+
+    @pytest.mark.asyncio
+    async def test_broken_pool_is_replaced(self, pool):
+        broken = pool._executor
+        with patch.object(
+            asyncio.get_running_loop(),
+            "run_in_executor",
+            side_effect=BrokenProcessPool(),
+        ):
+            with pytest.raises(BrokenProcessPool):
+                await pool.extract(b"<html></html>", "https://example.com/")
+
+        assert pool._executor is not broken
+        assert pool.metrics.restarts == 1
+        result = await pool.extract(b"<title>Again</title>", "https://example.com/")
+        assert result["title"] == "Again"
+
+
+async def _latency_under_load(base_url: str) -> list[float]:
+    """Latencies of /health requests sent every 10ms while heavy pages are scraped.
+
+    Measured from when each request was due, as an outside client sees it: a
+    request due while the loop is busy parsing waits for the parse to finish.
+    """
+    latencies = []
+    scraping = asyncio.gather(
+        *(scrape_url(f"{base_url}/heavy") for _ in range(CONCURRENT_SCRAPES))
+    )
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        due = time.perf_counter()
+        while not scraping.done():
+            due += 0.01
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            response = await client.get("/health")
+            assert response.status_code == 200
+            latencies.append(time.perf_counter() - due)
+    results = await scraping
+    assert all(r.title == "Heavy" for r in results)
+    return latencies
+
+
+@pytest.mark.skipif(
+    not os.getenv("RUN_BENCHMARKS"), reason="timing benchmark; set RUN_BENCHMARKS=1"
+)
+@pytest.mark.asyncio
+async def test_benchmark_latency_under_scraping_load(heavy_server, pool):
+    with patch("app.services.scraper.parse_pool", ParsePool(workers=0)):
+        inline = await _latency_under_load(heavy_server.base_url)
+    offloaded = await _latency_under_load(heavy_server.base_url)
+
+    for name, latencies in (("event loop", inline), ("process pool", offloaded)):
+        print(
+            f"{name}: {len(latencies)} requests, "
+            f"median {statistics.median(latencies) * 1000:.1f}ms, "
+            f"p95 {statistics.quantiles(latencies, n=20)[-1] * 1000:.1f}ms, "
+            f"max {max(latencies) * 1000:.1f}ms"
+        )
+    # Inline, a request can wait behind a whole page parse; offloaded it can't
+    assert (
+        statistics.quantiles(offloaded, n=20)[-1]
+        < statistics.quantiles(inline, n=20)[-1]
+    )
@@ -0,0 +1,238 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.services.http_client import PooledHttpClient, set_http_client
+from app.services.politeness import (
+    DomainFairQueue,
+    PolitenessScheduler,
+    RateLimited,
+    RobotsDisallowed,
+    domain_of,
+    parse_retry_after,
+)
+from app.services.scraper import fetch_page
+
+PAGE = b"<html><head><title>Polite</title></head><body><p>Hi</p></body></html>"
+
+
+@pytest.fixture
+def site():
+    """Serve ``responses[path]`` (consumed in order) through a mock transport."""
+    responses: dict[str, list[httpx.Response]] = {}
+    requests: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        queue = responses.get(request.url.path)
+        if not queue:
+            return httpx.Response(404)
+        return queue.pop(0) if len(queue) > 1 else queue[0]
+
+    set_http_client(
+        PooledHttpClient(http2=False, transport=httpx.MockTransport(handler))
+    )
+    yield responses, requests
+    set_http_client(None)
+
+
+def _html():
+    return httpx.Response(200, headers={"Content-Type": "text/html"}, content=PAGE)
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = PolitenessScheduler(
+        rate=100, burst=10, backoff_base=0.01, backoff_max=1.0, max_retries=2
+    )
+    scheduler.start()
+    with patch("app.services.scraper.politeness", scheduler):
+        yield scheduler
+
+
+class TestRetryAfter:
+    def test_seconds(self):
+        assert parse_retry_after("120") == 120.0
+
+    def test_http_date(self):
+        when = datetime.now(timezone.utc) + timedelta(seconds=30)
+        assert 25 < parse_retry_after(format_datetime(when, usegmt=True)) <= 30
+
+    def test_garbage(self):
+        assert parse_retry_after("soon") is None
+        assert parse_retry_after(None) is None
+
+
+class TestRobots:
+    @pytest.mark.asyncio
+    async def test_disallowed_url_is_not_fetched(self, site, scheduler):
+        responses, requests = site
+        responses["/robots.txt"] = [
+            httpx.Response(200, text="User-agent: *\nDisallow: /private/\n")
+        ]
+        responses["/private/page"] = [_html()]
+
+        with pytest.raises(RobotsDisallowed):
+            await fetch_page("https://example.com/private/page")
+        assert requests == ["/robots.txt"]
+        assert scheduler.metrics.disallowed == 1
+
+    @pytest.mark.asyncio
+    async def test_robots_fetched_once_per_origin(self, site, scheduler):
+        responses, requests = site
+        responses["/robots.txt"] = [
+            httpx.Response(200, text="User-agent: *\nAllow: /\n")
+        ]
+        responses["/a"] = [_html()]
+        responses["/b"] = [_html()]
+
+        await asyncio.gather(*(fetch_page(f"https://example.com/{p}") for p in "abab"))
+
+        assert requests.count("/robots.txt") == 1
+        assert scheduler.robots.fetches == 1
+
+    @pytest.mark.asyncio
+    async def test_missing_robots_allows_everything(self, site, scheduler):
+        responses, _ = site
+        responses["/page"] = [_html()]
+
+        page = await fetch_page("https://example.com/page")
+
+        assert page.scraped.title == "Polite"
+
+    @pytest.mark.asyncio
+    async def test_crawl_delay_slows_the_domain(self, site, scheduler):
+        responses, _ = site
+        responses["/robots.txt"] = [
+            httpx.Response(200, text="User-agent: *\nCrawl-delay: 5\n")
+        ]
+        responses["/page"] = [_html()]
+
+        await fetch_page("https://example.com/page")
+
+        bucket = scheduler._domains["example.com"].bucket
+        assert bucket.rate == 0.2
+        assert bucket.capacity == 1
+
+
+class TestBackoff:
+    @pytest.mark.asyncio
+    async def test_retries_after_429(self, site, scheduler):
+        responses, requests = site
+        responses["/page"] = [
+            httpx.Response(429, headers={"Retry-After": "0"}),
+            _html(),
+        ]
+
+        page = await fetch_page("https://example.com/page")
+
+        assert page.scraped.title == "Polite"
+        assert requests.count("/page") == 2
+        assert scheduler.metrics.throttled == 1
+        assert scheduler.metrics.retries == 1
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self, site, scheduler):
+        responses, requests = site
+        responses["/page"] = [httpx.Response(503)]
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await fetch_page("https://example.com/page")
+        assert requests.count("/page") == 3
+
+    @pytest.mark.asyncio
+    async def test_backoff_doubles(self, scheduler):
+        delays = [scheduler.record("https://example.com/", 429) for _ in range(3)]
+        assert delays == [0.01, 0.02, 0.04]
+        assert scheduler.record("https://example.com/", 200) is None
+        assert scheduler.record("https://example.com/", 429) == 0.01
+
+    def test_domain_state_is_bounded(self, scheduler):
+        with patch("app.services.politeness.MAX_TRACKED_DOMAINS", 2):
+            scheduler.record("https://a.test/", 429)
+            scheduler.record("https://b.test/", 200)
+            scheduler.record("https://a.test/", 429)  # a.test is now the most recent
+            scheduler.record("https://c.test/", 200)
+
+        assert list(scheduler._domains) == ["a.test", "c.test"]
+        assert scheduler._domains["a.test"].failures == 2
+
+    @pytest.mark.asyncio
+    async def test_long_retry_after_fails_fast(self, site, scheduler):
+        responses, requests = site
+        responses["/page"] = [httpx.Response(429, headers={"Retry-After": "3600"})]
+
+        started = time.monotonic()
+        with pytest.raises(RateLimited):
+            await fetch_page("https://example.com/page")
+        # Other pages on the domain don't wait either
+        with pytest.raises(RateLimited):
+            await fetch_page("https://example.com/other")
+
+        assert time.monotonic() - started < 0.5
+        assert requests.count("/page") == 1
+        assert "/other" not in requests
+
+    @pytest.mark.asyncio
+    async def test_inactive_scheduler_is_bypassed(self, site):
+        responses, requests = site
+        responses["/page"] = [_html()]
+        with patch("app.services.scraper.politeness", PolitenessScheduler()):
+            await fetch_page("https://example.com/page")
+        assert requests == ["/page"]
+
+
+class TestDomainFairQueue:
+    @pytest.mark.asyncio
+    async def test_round_robin_across_domains(self):
+        queue = DomainFairQueue(key=domain_of)
+        for i in range(3):
+            queue.put_nowait(f"https://big.example/{i}")
+        queue.put_nowait("https://a.example/")
+        queue.put_nowait("https://b.example/")
+
+        order = [domain_of(await queue.get()) for _ in range(5)]
+
+        assert order == [
+            "big.example",
+            "a.example",
+            "b.example",
+            "big.example",
+            "big.example",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_per_domain_limit(self):
+        queue = DomainFairQueue(key=domain_of, per_domain_limit=1)
+        queue.put_nowait("https://big.example/1")
+        queue.put_nowait("https://big.example/2")
+
+        first = await queue.get()
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(queue.get(), timeout=0.05)
+
+        queue.task_done(first)
+        assert await asyncio.wait_for(queue.get(), timeout=1) == "https://big.example/2"
+
+    @pytest.mark.asyncio
+    async def test_bounded_put_and_join(self):
+        queue = DomainFairQueue(key=domain_of, maxsize=1)
+        queue.put_nowait("https://a.example/")
+        with pytest.raises(asyncio.QueueFull):
+            queue.put_nowait("https://b.example/")
+
+        async def consume():
+            for _ in range(2):
+                item = await queue.get()
+                queue.task_done(item)
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.wait_for(queue.put("https://b.example/"), timeout=1)
+        await asyncio.wait_for(queue.join(), timeout=1)
+        await consumer
+        assert queue.qsize() == 0
@@ -0,0 +1,120 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.cli.reembed import Checkpoint, main, reembed
+from tests.conftest import SupabaseMock
+
+
+def _bookmarks(*ids):
+    return [
+        {"id": i, "title": f"Title {i}", "description": None, "content": None}
+        for i in ids
+    ]
+
+
+@pytest.fixture
+def supabase_pages():
+    """Mock Supabase returning successive keyset pages, then an empty page."""
+    supabase = SupabaseMock()
+
+    def pages(*chunks):
+        query = supabase.table.return_value.select.return_value
+        responses = iter([MagicMock(data=chunk) for chunk in (*chunks, [])])
+        query.order.return_value.limit.return_value.execute.side_effect = lambda: next(
+            responses
+        )
+        next_page = query.gt.return_value.order.return_value.limit.return_value
+        next_page.execute.side_effect = lambda: next(responses)
+        return query
+
+    supabase.pages = pages
+    return supabase
+
+
+class TestReembed:
+    @pytest.mark.asyncio
+    async def test_processes_chunks_and_checkpoints(self, supabase_pages, tmp_path):
+        query = supabase_pages.pages(_bookmarks("a", "b"), _bookmarks("c"))
+        path = tmp_path / "checkpoint.json"
+        checkpoint = Checkpoint(
+            table="bookmark_embeddings_next", model="m", dimensions=8
+        )
+
+        with patch(
+            "app.cli.reembed.save_embeddings",
+            new_callable=AsyncMock,
+            side_effect=[["a", "b"], ["c"]],
+        ) as save:
+            result = await reembed(supabase_pages, checkpoint, path, chunk_size=2)
+
+        assert result.rows == 3
+        assert result.written == 3
+        assert result.last_id == "c"
+        assert Checkpoint.load(path) == result
+        # Second page continues after the last id of the first
+        assert query.gt.call_args_list[0].args == ("id", "b")
+        assert save.call_args.kwargs == {
+            "table": "bookmark_embeddings_next",
+            "model": "m",
+            "dimensions": 8,
+            "use_cache": False,
+        }
+
+    @pytest.mark.asyncio
+    async def test_resumes_after_checkpoint(self, supabase_pages, tmp_path):
+        query = supabase_pages.pages(_bookmarks("d"))
+        checkpoint = Checkpoint(
+            table="bookmark_embeddings", model="m", dimensions=8, last_id="c", rows=3
+        )
+
+        with patch(
+            "app.cli.reembed.save_embeddings",
+            new_callable=AsyncMock,
+            return_value=["d"],
+        ):
+            result = await reembed(supabase_pages, checkpoint, tmp_path / "cp.json")
+
+        assert query.gt.call_args_list[0].args == ("id", "c")
+        assert result.rows == 4
+
+    @pytest.mark.asyncio
+    async def test_failed_rows_are_kept_and_retried(self, supabase_pages, tmp_path):
+        query = supabase_pages.pages(_bookmarks("a", "b"))
+        query.in_.return_value.execute.return_value = MagicMock(data=_bookmarks("b"))
+        path = tmp_path / "cp.json"
+        checkpoint = Checkpoint(table="bookmark_embeddings", model="m", dimensions=8)
+
+        # "b" fails in its chunk and again on the end-of-run retry
+        with patch(
+            "app.cli.reembed.save_embeddings",
+            new_callable=AsyncMock,
+            side_effect=[["a"], []],
+        ):
+            result = await reembed(supabase_pages, checkpoint, path)
+
+        assert result.last_id == "b"
+        assert result.failed == ["b"]
+        assert Checkpoint.load(path).failed == ["b"]
+
+        # A later run of the finished checkpoint retries only "b"
+        supabase_pages.pages()
+        with patch(
+            "app.cli.reembed.save_embeddings",
+            new_callable=AsyncMock,
+            return_value=["b"],
+        ) as save:
+            result = await reembed(supabase_pages, result, path)
+
+        assert query.in_.call_args.args == ("id", ["b"])
+        assert [bookmark_id for bookmark_id, _ in save.call_args.args[1]] == ["b"]
+        assert result.failed == []
+        assert result.written == 2
+
+    def test_refuses_mismatched_checkpoint(self, tmp_path):
+        path = tmp_path / "cp.json"
+        Checkpoint(table="bookmark_embeddings", model="old", dimensions=8).save(path)
+
+        code = main(["--model", "new", "--dimensions", "8", "--checkpoint", str(path)])
+
+        assert code == 1
@@ -1,104 +1,112 @@
-import pytest
-from unittest.mock import AsyncMock, patch, MagicMock
 import httpx
+import pytest
 
+from app.core.config import settings
+from app.services.extractor import extract
+from app.services.http_client import PooledHttpClient, set_http_client
 from app.services.scraper import (
-    scrape_url,
     ScrapedData,
-    _extract_title,
-    _extract_description,
-    _extract_content,
-    _extract_favicon,
+    UnsupportedContentType,
+    fetch_page,
+    scrape_url,
 )
-from bs4 import BeautifulSoup
+
+
+def _fields(html: str, url: str = "") -> dict[str, str | None]:
+    return extract(html.encode("utf-8"), url)
 
 
 class TestExtractTitle:
     def test_extract_og_title(self):
         html = '<html><head><meta property="og:title" content="OG Title"></head></html>'
-        soup = BeautifulSoup(html, "lxml")
-        assert _extract_title(soup) == "OG Title"
+        assert _fields(html)["title"] == "OG Title"
 
     def test_extract_twitter_title(self):
-        html = '<html><head><meta name="twitter:title" content="Twitter Title"></head></html>'
-        soup = BeautifulSoup(html, "lxml")
-        assert _extract_title(soup) == "Twitter Title"
+        html = (
+            '<html><head><meta name="twitter:title" content="Twitter Title"></head>'
+            "</html>"
+        )
+        assert _fields(html)["title"] == "Twitter Title"
 
     def test_extract_title_tag(self):
         html = "<html><head><title>Page Title</title></head></html>"
-        soup = BeautifulSoup(html, "lxml")
-        assert _extract_title(soup) == "Page Title"
+        assert _fields(html)["title"] == "Page Title"
 
     def test_og_title_takes_precedence(self):
-        html = '''<html><head>
+        html = """<html><head>
             <meta property="og:title" content="OG Title">
             <meta name="twitter:title" content="Twitter Title">
             <title>Page Title</title>
-        </head></html>'''
-        soup = BeautifulSoup(html, "lxml")
-        assert _extract_title(soup) == "OG Title"
+        </head></html>"""
+        assert _fields(html)["title"] == "OG Title"
 
     def test_twitter_title_over_title_tag(self):
-        html = '''<html><head>
+        html = """<html><head>
             <meta name="twitter:title" content="Twitter Title">
             <title>Page Title</title>
-        </head></html>'''
-        soup = BeautifulSoup(html, "lxml")
-        assert _extract_title(soup) == "Twitter Title"
+        </head></html>"""
+        assert _fields(html)["title"] == "Twitter Title"
 
     def test_no_title(self):
         html = "<html><head></head></html>"
-        soup = BeautifulSoup(html, "lxml")
-        assert _extract_title(soup) is None
+        assert _fields(html)["title"] is None
 
     def test_strips_whitespace(self):
         html = "<html><head><title>  Spaced Title  </title></head></html>"
-        soup = BeautifulSoup(html, "lxml")
-        assert _extract_title(soup) == "Spaced Title"
+        assert _fields(html)["title"] == "Spaced Title"
 
 
 class TestExtractDescription:
     def test_extract_og_description(self):
-        html = '<html><head><meta property="og:description" content="OG Description"></head></html>'
-        soup = BeautifulSoup(html, "lxml")
-        assert _extract_description(soup) == "OG Description"
+        html = (
+            '<html><head><meta property="og:description" content="OG Description">'
+            "</head></html>"
+        )
+        assert _fields(html)["description"] == "OG Description"
 
     def test_extract_twitter_description(self):
-        html = '<html><head><meta name="twitter:description" content="Twitter Description"></head></html>'
-        soup = BeautifulSoup(html, "lxml")
-        assert _extract_description(soup) == "Twitter Description"
+        html = (
+            "<html><head>"
+            '<meta name="twitter:description" content="Twitter Description"></head>'
+            "</html>"
+        )
+        assert _fields(html)["description"] == "Twitter Description"
 
     def test_extract_meta_description(self):
-        html = '<html><head><meta name="description" content="Meta Description"></head></html>'
-        soup = BeautifulSoup(html, "lxml")
-        assert _extract_description(soup) == "Meta Description"
+        html = (
+            '<html><head><meta name="description" content="Meta Description"></head>'
+            "</html>"
+        )
+        assert _fields(html)["description"] == "Meta Description"
 
     def test_og_description_takes_precedence(self):
-        html = '''<html><head>
+        html = """<html><head>
             <meta property="og:description" content="OG Description">
             <meta name="description" content="Meta Description">
-        </head></html>'''
-        soup = BeautifulSoup(html, "lxml")
-        assert _extract_description(soup) == "OG Description"
+        </head></html>"""
+        assert _fields(html)["description"] == "OG Description"
 
     def test_no_description(self):
         html = "<html><head></head></html>"
-        soup = BeautifulSoup(html, "lxml")
-        assert _extract_description(soup) is None
+        assert _fields(html)["description"] is None
 
 
 class TestExtractContent:
     def test_extract_from_main(self):
-        html = "<html><body><main>Main content here</main><nav>Navigation</nav></body></html>"
-        soup = BeautifulSoup(html, "lxml")
-        content = _extract_content(soup)
+        html = (
+            "<html><body><main>Main content here</main><nav>Navigation</nav></body>"
+            "</html>"
+        )
+        content = _fields(html)["content"]
         assert "Main content here" in content
         assert "Navigation" not in content
 
     def test_extract_from_article(self):
-        html = "<html><body><article>Article content</article><footer>Footer</footer></body></html>"
-        soup = BeautifulSoup(html, "lxml")
-        content = _extract_content(soup)
+        html = (
+            "<html><body><article>Article content</article><footer>Footer</footer>"
+            "</body></html>"
+        )
+        content = _fields(html)["content"]
         assert "Article content" in content
         assert "Footer" not in content
 
@@ -108,29 +116,25 @@ class TestExtractContent:
             <style>.foo { color: red; }</style>
             <p>Actual content</p>
         </body></html>"""
-        soup = BeautifulSoup(html, "lxml")
-        content = _extract_content(soup)
+        content = _fields(html)["content"]
         assert "Actual content" in content
         assert "var x" not in content
         assert "color: red" not in content
 
     def test_normalizes_whitespace(self):
         html = "<html><body><p>Text   with   spaces</p></body></html>"
-        soup = BeautifulSoup(html, "lxml")
-        content = _extract_content(soup)
+        content = _fields(html)["content"]
         assert "Text with spaces" in content
 
     def test_empty_body_returns_none(self):
         html = "<html><head></head></html>"
-        soup = BeautifulSoup(html, "lxml")
-        content = _extract_content(soup)
+        content = _fields(html)["content"]
         assert content is None
 
     def test_truncates_long_content(self):
         long_text = "a" * 60000
         html = f"<html><body><p>{long_text}</p></body></html>"
-        soup = BeautifulSoup(html, "lxml")
-        content = _extract_content(soup)
+        content = _fields(html)["content"]
         assert len(content) <= 50003  # 50000 + "..."
         assert content.endswith("...")
 
@@ -138,50 +142,65 @@ class TestExtractContent:
 class TestExtractFavicon:
     def test_extract_icon_link(self):
         html = '<html><head><link rel="icon" href="/favicon.png"></head></html>'
-        soup = BeautifulSoup(html, "lxml")
-        favicon = _extract_favicon(soup, "https://example.com/page")
+        favicon = _fields(html, "https://example.com/page")["favicon_url"]
         assert favicon == "https://example.com/favicon.png"
 
     def test_extract_shortcut_icon(self):
-        html = '<html><head><link rel="shortcut icon" href="/shortcut.ico"></head></html>'
-        soup = BeautifulSoup(html, "lxml")
-        favicon = _extract_favicon(soup, "https://example.com/page")
+        html = (
+            '<html><head><link rel="shortcut icon" href="/shortcut.ico"></head></html>'
+        )
+        favicon = _fields(html, "https://example.com/page")["favicon_url"]
         assert favicon == "https://example.com/shortcut.ico"
 
     def test_extract_apple_touch_icon(self):
-        html = '<html><head><link rel="apple-touch-icon" href="/apple-icon.png"></head></html>'
-        soup = BeautifulSoup(html, "lxml")
-        favicon = _extract_favicon(soup, "https://example.com/page")
+        html = (
+            '<html><head><link rel="apple-touch-icon" href="/apple-icon.png"></head>'
+            "</html>"
+        )
+        favicon = _fields(html, "https://example.com/page")["favicon_url"]
         assert favicon == "https://example.com/apple-icon.png"
 
     def test_absolute_favicon_url(self):
-        html = '<html><head><link rel="icon" href="https://cdn.example.com/icon.png"></head></html>'
-        soup = BeautifulSoup(html, "lxml")
-        favicon = _extract_favicon(soup, "https://example.com/page")
+        html = (
+            '<html><head><link rel="icon" href="https://cdn.example.com/icon.png">'
+            "</head></html>"
+        )
+        favicon = _fields(html, "https://example.com/page")["favicon_url"]
         assert favicon == "https://cdn.example.com/icon.png"
 
     def test_fallback_to_default_favicon(self):
         html = "<html><head></head></html>"
-        soup = BeautifulSoup(html, "lxml")
-        favicon = _extract_favicon(soup, "https://example.com/page")
+        favicon = _fields(html, "https://example.com/page")["favicon_url"]
         assert favicon == "https://example.com/favicon.ico"
 
     def test_icon_link_takes_precedence(self):
-        html = '''<html><head>
+        html = """<html><head>
             <link rel="icon" href="/icon.png">
             <link rel="apple-touch-icon" href="/apple.png">
-        </head></html>'''
-        soup = BeautifulSoup(html, "lxml")
-        favicon = _extract_favicon(soup, "https://example.com/page")
+        </head></html>"""
+        favicon = _fields(html, "https://example.com/page")["favicon_url"]
         assert favicon == "https://example.com/icon.png"
 
 
-class TestScrapeUrl:
-    test_url = "https://www.google.com"
+@pytest.fixture
+def mock_transport():
+    """Install a pooled client whose requests are answered by ``handler``."""
+    clients = []
+
+    def install(handler):
+        client = PooledHttpClient(http2=False, transport=httpx.MockTransport(handler))
+        clients.append(client)
+        set_http_client(client)
+        return client
+
+    yield install
+    set_http_client(None)
+
 
+class TestScrapeUrl:
     @pytest.mark.asyncio
-    async def test_scrape_url_success(self):
-        html_content = """
+    async def test_scrape_url_success(self, stub_server):
+        html_content = b"""
         <html>
         <head>
             <title>Test Page</title>
@@ -193,69 +212,144 @@ class TestScrapeUrl:
         </body>
         </html>
         """
+        stub_server.routes["/"] = (200, {"Content-Type": "text/html"}, html_content)
+
+        result = await scrape_url(stub_server.base_url)
+
+        assert result.title == "Test Page"
+        assert result.description == "Test description"
+        assert "main content" in result.content
+        assert result.favicon_url == f"{stub_server.base_url}/favicon.ico"
+
+    @pytest.mark.asyncio
+    async def test_scrape_url_http_error(self, stub_server):
+        with pytest.raises(httpx.HTTPStatusError):
+            await scrape_url(f"{stub_server.base_url}/nonexistent")
+
+    @pytest.mark.asyncio
+    async def test_scrape_url_timeout(self, mock_transport):
+        def handler(request):
+            raise httpx.TimeoutException("Timeout", request=request)
+
+        mock_transport(handler)
+
+        with pytest.raises(httpx.TimeoutException):
+            await scrape_url("https://slow-site.com")
+
+    @pytest.mark.asyncio
+    async def test_scrape_url_returns_scraped_data_model(self, stub_server):
+        stub_server.routes["/"] = (
+            200,
+            {"Content-Type": "text/html"},
+            b"<html><head><title>Test</title></head><body>Content</body></html>",
+        )
+
+        result = await scrape_url(stub_server.base_url)
+
+        assert isinstance(result, ScrapedData)
+
 
-        mock_response = MagicMock()
-        mock_response.text = html_content
-        mock_response.raise_for_status = MagicMock()
+class TestStreamingFetch:
+    @pytest.mark.asyncio
+    async def test_rejects_non_html_before_reading_body(self, mock_transport):
+        read = []
 
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_instance = AsyncMock()
-            mock_instance.get.return_value = mock_response
-            mock_instance.__aenter__.return_value = mock_instance
-            mock_instance.__aexit__.return_value = None
-            mock_client.return_value = mock_instance
+        async def body():
+            read.append(True)
+            yield b"%PDF-1.7"
 
-            result = await scrape_url(self.test_url)
+        mock_transport(
+            lambda request: httpx.Response(
+                200, headers={"Content-Type": "application/pdf"}, content=body()
+            )
+        )
 
-            assert result.title == "Test Page"
-            assert result.description == "Test description"
-            assert "main content" in result.content
-            assert result.favicon_url == f"{self.test_url}/favicon.ico"
+        with pytest.raises(UnsupportedContentType):
+            await fetch_page("https://example.com/file.pdf")
+        assert read == []
 
     @pytest.mark.asyncio
-    async def test_scrape_url_http_error(self):
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_instance = AsyncMock()
-            mock_instance.get.side_effect = httpx.HTTPStatusError(
-                "Not Found", request=MagicMock(), response=MagicMock(status_code=404)
+    async def test_stops_at_byte_cap(self, mock_transport):
+        chunks = []
+
+        async def body():
+            yield b"<html><head><title>Big</title></head><body><main>"
+            for _ in range(1000):
+                chunks.append(True)
+                yield b"<div></div>" * 100
+
+        mock_transport(
+            lambda request: httpx.Response(
+                200, headers={"Content-Type": "text/html"}, content=body()
             )
-            mock_instance.__aenter__.return_value = mock_instance
-            mock_instance.__aexit__.return_value = None
-            mock_client.return_value = mock_instance
+        )
 
-            with pytest.raises(httpx.HTTPStatusError):
-                await scrape_url(f"{self.test_url}/nonexistent")
+        page = await fetch_page("https://example.com/", max_bytes=10_000)
+
+        assert page.truncated
+        assert len(page.body) == 10_000
+        assert len(chunks) < 20
+        assert page.scraped.title == "Big"
 
     @pytest.mark.asyncio
-    async def test_scrape_url_timeout(self):
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_instance = AsyncMock()
-            mock_instance.get.side_effect = httpx.TimeoutException("Timeout")
-            mock_instance.__aenter__.return_value = mock_instance
-            mock_instance.__aexit__.return_value = None
-            mock_client.return_value = mock_instance
+    async def test_stops_once_enough_text(self, mock_transport):
+        chunks = []
+
+        async def body():
+            yield b"<html><head><meta name='description' content='Long'></head><body>"
+            for i in range(1000):
+                chunks.append(True)
+                # Distinct paragraphs: repeated ones are deduplicated
+                yield f"<p>{i} ".encode() + b"word " * 200 + b"</p>"
+
+        mock_transport(
+            lambda request: httpx.Response(
+                200, headers={"Content-Type": "text/html"}, content=body()
+            )
+        )
+
+        page = await fetch_page("https://example.com/")
 
-            with pytest.raises(httpx.TimeoutException):
-                await scrape_url("https://slow-site.com")
+        assert page.truncated
+        assert len(chunks) < 100
+        assert page.scraped.description == "Long"
+        # Whitespace is collapsed after counting, so the text ends just under the cap
+        assert 45000 < len(page.scraped.content) <= 50003
 
     @pytest.mark.asyncio
-    async def test_scrape_url_returns_scraped_data_model(self):
-        html_content = "<html><head><title>Test</title></head><body>Content</body></html>"
+    async def test_body_of_exactly_max_bytes_is_not_truncated(self, mock_transport):
+        html = b"<html><body><p>" + b"x" * 80 + b"</p></body></html>"
+
+        async def body():
+            yield html[:50]
+            yield html[50:]
+
+        mock_transport(
+            lambda request: httpx.Response(
+                200, headers={"Content-Type": "text/html"}, content=body()
+            )
+        )
+
+        page = await fetch_page("https://example.com/", max_bytes=len(html))
 
-        mock_response = MagicMock()
-        mock_response.text = html_content
-        mock_response.raise_for_status = MagicMock()
+        assert not page.truncated
+        assert page.body == html
 
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_instance = AsyncMock()
-            mock_instance.get.return_value = mock_response
-            mock_instance.__aenter__.return_value = mock_instance
-            mock_instance.__aexit__.return_value = None
-            mock_client.return_value = mock_instance
+    @pytest.mark.asyncio
+    async def test_decodes_declared_charset(self, mock_transport):
+        html = "<html><head><title>Café</title></head><body>naïve</body></html>"
+        mock_transport(
+            lambda request: httpx.Response(
+                200,
+                headers={"Content-Type": "text/html; charset=iso-8859-1"},
+                content=html.encode("latin-1"),
+            )
+        )
 
-            result = await scrape_url(self.test_url)
+        page = await fetch_page("https://example.com/")
 
-            assert isinstance(result, ScrapedData)
+        assert page.scraped.title == "Café"
+        assert page.text == html
 
 
 class TestScrapedDataModel:
@@ -277,3 +371,32 @@ class TestScrapedDataModel:
         assert data.description == "Test Description"
         assert data.content == "Test Content"
         assert data.favicon_url == "https://example.com/favicon.ico"
+
+
+class TestFetchPage:
+    @pytest.mark.asyncio
+    async def test_sends_validators_and_handles_304(self, stub_server):
+        stub_server.routes["/"] = (304, {"ETag": '"abc"'}, b"")
+
+        page = await fetch_page(
+            f"{stub_server.base_url}/",
+            etag='"abc"',
+            last_modified="Wed, 01 Jan 2025 00:00:00 GMT",
+        )
+
+        headers = stub_server.requests[-1][2]
+        assert headers["If-None-Match"] == '"abc"'
+        assert headers["If-Modified-Since"] == "Wed, 01 Jan 2025 00:00:00 GMT"
+        assert page.not_modified
+        assert page.body is None
+        assert page.etag == '"abc"'
+
+    @pytest.mark.asyncio
+    async def test_identifies_as_the_robots_user_agent(self, stub_server):
+        stub_server.routes["/"] = (200, {"Content-Type": "text/html"}, b"<p>hi</p>")
+
+        await fetch_page(f"{stub_server.base_url}/")
+
+        user_agent = stub_server.requests[-1][2]["User-Agent"]
+        assert user_agent.split("/")[0] == settings.robots_user_agent
+        assert "Mozilla" not in user_agent
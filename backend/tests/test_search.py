@@ -1,8 +1,22 @@
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
 
 from tests.conftest import TEST_USER_ID
 
 
+def _rpc_results(mock_supabase, **rows_by_function):
+    """Make each RPC return its own rows, keyed by function name (default none)."""
+
+    def rpc(name, params):
+        query = MagicMock()
+        rows = rows_by_function.get(name, [])
+        query.execute = AsyncMock(return_value=MagicMock(data=rows))
+        return query
+
+    mock_supabase.rpc.side_effect = rpc
+
+
 class TestSearchBookmarks:
     @patch("app.services.search.get_embedding")
     def test_search_hybrid_mode(
@@ -10,16 +24,16 @@ class TestSearchBookmarks:
     ):
         """Test hybrid search (default mode) combining semantic and category results."""
         mock_get_embedding.return_value = [0.1] * 1536
-        mock_supabase.rpc.return_value.execute.return_value = MagicMock(
-            data=[
+        _rpc_results(
+            mock_supabase,
+            search_bookmarks=[{**sample_bookmark, "similarity": 0.85}],
+            search_by_categories=[
                 {
                     **sample_bookmark,
-                    "semantic_score": 0.85,
                     "category_score": 2.0,
-                    "rrf_score": 0.032,
                     "matched_categories": ["python", "web"],
                 }
-            ]
+            ],
         )
 
         response = client.post(
@@ -32,17 +46,35 @@ class TestSearchBookmarks:
         assert len(data) == 1
         assert data[0]["semantic_score"] == 0.85
         assert data[0]["category_score"] == 2.0
-        assert data[0]["rrf_score"] == 0.032
+        assert data[0]["rrf_score"] == pytest.approx(2 / 61)
         assert data[0]["matched_categories"] == ["python", "web"]
 
-        mock_supabase.rpc.assert_called_once_with(
-            "hybrid_search_bookmarks",
+        # Each source runs as its own query with a 2 x limit candidate budget
+        assert mock_supabase.rpc.call_count == 3
+        mock_supabase.rpc.assert_any_call(
+            "search_bookmarks",
             {
                 "query_embedding": [0.1] * 1536,
+                "match_threshold": 0.5,
+                "match_count": 40,
+                "p_user_id": TEST_USER_ID,
+                "ef_search": 100,
+            },
+        )
+        mock_supabase.rpc.assert_any_call(
+            "search_by_categories",
+            {
                 "query_terms": ["python", "web"],
                 "p_user_id": TEST_USER_ID,
-                "semantic_threshold": 0.5,
-                "match_count": 20,
+                "match_count": 40,
+            },
+        )
+        mock_supabase.rpc.assert_any_call(
+            "search_bookmarks_text",
+            {
+                "query_text": "python web",
+                "p_user_id": TEST_USER_ID,
+                "match_count": 40,
             },
         )
 
@@ -73,19 +105,57 @@ class TestSearchBookmarks:
                 "match_threshold": 0.5,
                 "match_count": 20,
                 "p_user_id": TEST_USER_ID,
+                "ef_search": 100,
             },
         )
 
-    def test_search_keyword_mode(self, client, mock_supabase, sample_bookmark):
-        """Test keyword/category-only search mode (no embedding needed)."""
+    @patch("app.services.search.settings.embedding_search_index", "binary")
+    @patch("app.services.search.get_embedding")
+    def test_search_semantic_mode_quantized(
+        self, mock_get_embedding, client, mock_supabase, sample_bookmark
+    ):
+        """Test that a quantized EMBEDDING_SEARCH_INDEX uses the re-ranking RPC."""
+        mock_get_embedding.return_value = [0.1] * 1536
         mock_supabase.rpc.return_value.execute.return_value = MagicMock(
-            data=[
+            data=[{**sample_bookmark, "similarity": 0.9}]
+        )
+
+        response = client.post(
+            "/api/v1/search",
+            json={"query": "example search", "mode": "semantic"},
+        )
+
+        assert response.status_code == 200
+        assert response.json()[0]["semantic_score"] == 0.9
+        mock_supabase.rpc.assert_called_once_with(
+            "search_bookmarks_quantized",
+            {
+                "query_embedding": [0.1] * 1536,
+                "match_threshold": 0.5,
+                "match_count": 20,
+                "p_user_id": TEST_USER_ID,
+                "ef_search": 100,
+                "index_mode": "binary",
+                "rerank_factor": 4,
+            },
+        )
+
+    def test_search_keyword_mode(self, client, mock_supabase, sample_bookmark):
+        """Test keyword search: categories plus full text, no embedding needed."""
+        other = {**sample_bookmark, "id": "bookmark-2", "url": "https://example.org"}
+        _rpc_results(
+            mock_supabase,
+            search_by_categories=[
                 {
                     **sample_bookmark,
                     "category_score": 1.0,
                     "matched_categories": ["python"],
                 }
-            ]
+            ],
+            search_bookmarks_text=[
+                {**other, "text_score": 0.4},
+                {**sample_bookmark, "text_score": 0.2},
+            ],
         )
 
         response = client.post(
@@ -95,19 +165,51 @@ class TestSearchBookmarks:
 
         assert response.status_code == 200
         data = response.json()
-        assert len(data) == 1
+        assert [row["id"] for row in data] == ["bookmark-1", "bookmark-2"]
         assert data[0]["category_score"] == 1.0
+        assert data[0]["text_score"] == 0.2
         assert data[0]["matched_categories"] == ["python"]
+        assert data[1]["text_score"] == 0.4
+        assert data[1]["semantic_score"] == 0.0
 
-        mock_supabase.rpc.assert_called_once_with(
+        assert mock_supabase.rpc.call_count == 2
+        mock_supabase.rpc.assert_any_call(
             "search_by_categories",
             {
                 "query_terms": ["python"],
                 "p_user_id": TEST_USER_ID,
-                "match_count": 20,
+                "match_count": 40,
+            },
+        )
+        mock_supabase.rpc.assert_any_call(
+            "search_bookmarks_text",
+            {
+                "query_text": "python",
+                "p_user_id": TEST_USER_ID,
+                "match_count": 40,
             },
         )
 
+    @patch("app.services.search.settings.search_full_text", False)
+    def test_search_keyword_mode_without_full_text(
+        self, client, mock_supabase, sample_bookmark
+    ):
+        """Test that SEARCH_FULL_TEXT=false leaves only the category source."""
+        _rpc_results(
+            mock_supabase,
+            search_by_categories=[{**sample_bookmark, "category_score": 1.0}],
+        )
+
+        response = client.post(
+            "/api/v1/search",
+            json={"query": "python", "mode": "keyword"},
+        )
+
+        assert response.status_code == 200
+        assert len(response.json()) == 1
+        called = [call.args[0] for call in mock_supabase.rpc.call_args_list]
+        assert called == ["search_by_categories"]
+
     @patch("app.services.search.get_embedding")
     def test_search_empty_results(self, mock_get_embedding, client, mock_supabase):
         """Test search with no matching results."""
@@ -126,38 +228,67 @@ class TestSearchBookmarks:
     def test_search_with_custom_params(
         self, mock_get_embedding, client, mock_supabase, sample_bookmark
     ):
-        """Test search with custom limit and threshold."""
+        """Test search with custom limit, threshold and fusion settings."""
         mock_get_embedding.return_value = [0.1] * 1536
-        mock_supabase.rpc.return_value.execute.return_value = MagicMock(
-            data=[
-                {
-                    **sample_bookmark,
-                    "semantic_score": 0.85,
-                    "category_score": 0.0,
-                    "rrf_score": 0.016,
-                    "matched_categories": [],
-                }
-            ]
+        _rpc_results(
+            mock_supabase,
+            search_bookmarks=[{**sample_bookmark, "similarity": 0.85}],
+            search_by_categories=[],
         )
 
         response = client.post(
             "/api/v1/search",
-            json={"query": "custom search", "limit": 5, "threshold": 0.8},
+            json={
+                "query": "custom search",
+                "limit": 5,
+                "threshold": 0.8,
+                "fusion": {
+                    "method": "weighted_rrf",
+                    "rrf_k": 10,
+                    "semantic_weight": 2.0,
+                    "semantic_candidates": 50,
+                    "category_candidates": 500,
+                },
+            },
         )
 
         assert response.status_code == 200
+        assert response.json()[0]["rrf_score"] == pytest.approx(2.0 / 11)
 
-        mock_supabase.rpc.assert_called_once_with(
-            "hybrid_search_bookmarks",
+        mock_supabase.rpc.assert_any_call(
+            "search_bookmarks",
             {
                 "query_embedding": [0.1] * 1536,
+                "match_threshold": 0.8,
+                "match_count": 50,
+                "p_user_id": TEST_USER_ID,
+                "ef_search": 100,
+            },
+        )
+        # Capped at SEARCH_MAX_CANDIDATES
+        mock_supabase.rpc.assert_any_call(
+            "search_by_categories",
+            {
                 "query_terms": ["custom", "search"],
                 "p_user_id": TEST_USER_ID,
-                "semantic_threshold": 0.8,
-                "match_count": 5,
+                "match_count": 200,
             },
         )
 
+    def test_search_invalid_fusion(self, client):
+        """Test that out-of-range fusion settings are rejected."""
+        response = client.post(
+            "/api/v1/search",
+            json={"query": "test", "fusion": {"method": "magic"}},
+        )
+        assert response.status_code == 422
+
+        response = client.post(
+            "/api/v1/search",
+            json={"query": "test", "fusion": {"semantic_candidates": 0}},
+        )
+        assert response.status_code == 422
+
     def test_search_missing_query(self, client):
         """Test search with missing query parameter."""
         response = client.post(
@@ -187,16 +318,10 @@ class TestSearchBookmarks:
     ):
         """Test that default mode is hybrid when not specified."""
         mock_get_embedding.return_value = [0.1] * 1536
-        mock_supabase.rpc.return_value.execute.return_value = MagicMock(
-            data=[
-                {
-                    **sample_bookmark,
-                    "semantic_score": 0.8,
-                    "category_score": 1.0,
-                    "rrf_score": 0.03,
-                    "matched_categories": ["test"],
-                }
-            ]
+        _rpc_results(
+            mock_supabase,
+            search_bookmarks=[{**sample_bookmark, "similarity": 0.8}],
+            search_by_categories=[],
         )
 
         response = client.post(
@@ -205,7 +330,20 @@ class TestSearchBookmarks:
         )
 
         assert response.status_code == 200
-        # Verify hybrid_search_bookmarks was called (not search_bookmarks)
-        mock_supabase.rpc.assert_called_once()
-        call_args = mock_supabase.rpc.call_args
-        assert call_args[0][0] == "hybrid_search_bookmarks"
+        # Every source was queried (not just search_bookmarks)
+        called = sorted(call.args[0] for call in mock_supabase.rpc.call_args_list)
+        assert called == [
+            "search_bookmarks",
+            "search_bookmarks_text",
+            "search_by_categories",
+        ]
+
+    def test_search_limit_is_capped(self, client, mock_supabase):
+        """Test that an oversized limit is rejected before any RPC runs."""
+        response = client.post(
+            "/api/v1/search",
+            json={"query": "test", "limit": 5000},
+        )
+
+        assert response.status_code == 422
+        mock_supabase.rpc.assert_not_called()
@@ -0,0 +1,190 @@
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+from fastapi import HTTPException
+
+from app.core.deps import get_current_user_id
+from app.core.security import (
+    JWKSCache,
+    LocalVerificationUnavailable,
+    VerifiedTokenCache,
+    verify_token,
+)
+from tests.conftest import TEST_USER_ID
+
+SECRET = "test-jwt-secret-with-enough-length-for-hs256"
+
+
+def _claims(**overrides):
+    claims = {
+        "sub": TEST_USER_ID,
+        "aud": "authenticated",
+        "exp": int(time.time()) + 3600,
+    }
+    claims.update(overrides)
+    return claims
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    """Isolated token/JWKS caches and a configured JWT secret."""
+    with (
+        patch("app.core.security.token_cache", VerifiedTokenCache(max_size=100)),
+        patch("app.core.security.jwks_cache", JWKSCache(ttl=600)),
+        patch("app.core.security.settings.supabase_jwt_secret", SECRET),
+    ):
+        yield
+
+
+class TestVerifyToken:
+    @pytest.mark.asyncio
+    async def test_valid_hs256_token(self):
+        token = jwt.encode(_claims(), SECRET, algorithm="HS256")
+        assert await verify_token(token) == TEST_USER_ID
+
+    @pytest.mark.asyncio
+    async def test_expired_token_rejected(self):
+        token = jwt.encode(
+            _claims(exp=int(time.time()) - 10), SECRET, algorithm="HS256"
+        )
+        with pytest.raises(jwt.ExpiredSignatureError):
+            await verify_token(token)
+
+    @pytest.mark.asyncio
+    async def test_wrong_audience_rejected(self):
+        token = jwt.encode(_claims(aud="anon"), SECRET, algorithm="HS256")
+        with pytest.raises(jwt.InvalidAudienceError):
+            await verify_token(token)
+
+    @pytest.mark.asyncio
+    async def test_bad_signature_rejected(self):
+        token = jwt.encode(
+            _claims(), "some-other-secret-of-sufficient-length!", algorithm="HS256"
+        )
+        with pytest.raises(jwt.InvalidSignatureError):
+            await verify_token(token)
+
+    @pytest.mark.asyncio
+    async def test_verified_token_is_cached(self):
+        token = jwt.encode(_claims(), SECRET, algorithm="HS256")
+        await verify_token(token)
+        with patch("app.core.security.jwt.decode") as mock_decode:
+            assert await verify_token(token) == TEST_USER_ID
+        mock_decode.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_es256_token_uses_cached_jwks(self):
+        private_key = ec.generate_private_key(ec.SECP256R1())
+        jwk = jwt.algorithms.ECAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+        jwk.update({"kid": "key-1", "alg": "ES256", "use": "sig"})
+
+        cache = JWKSCache(ttl=600)
+        cache._fetch = AsyncMock(return_value={"keys": [jwk]})
+        with patch("app.core.security.jwks_cache", cache):
+            for sub in ("user-a", "user-b"):
+                token = jwt.encode(
+                    _claims(sub=sub),
+                    private_key,
+                    algorithm="ES256",
+                    headers={"kid": "key-1"},
+                )
+                assert await verify_token(token) == sub
+
+        cache._fetch.assert_called_once()
+
+
+class TestJWKSCache:
+    @staticmethod
+    def _cache(min_refresh_interval):
+        private_key = ec.generate_private_key(ec.SECP256R1())
+        jwk = jwt.algorithms.ECAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+        jwk.update({"kid": "key-1", "alg": "ES256", "use": "sig"})
+        cache = JWKSCache(ttl=600, min_refresh_interval=min_refresh_interval)
+        cache._fetch = AsyncMock(return_value={"keys": [jwk]})
+        return cache
+
+    @pytest.mark.asyncio
+    async def test_unknown_kids_refetch_at_most_once_per_interval(self):
+        cache = self._cache(min_refresh_interval=60)
+        await cache.get_key("key-1")
+
+        for kid in ("forged-1", "forged-2", "forged-3"):
+            with pytest.raises(LocalVerificationUnavailable):
+                await cache.get_key(kid)
+
+        cache._fetch.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_unknown_kid_refetches_after_interval(self):
+        cache = self._cache(min_refresh_interval=0)
+        await cache.get_key("key-1")
+
+        with pytest.raises(LocalVerificationUnavailable):
+            await cache.get_key("rotated")
+
+        assert cache._fetch.call_count == 2
+
+
+class TestGetCurrentUserId:
+    @pytest.mark.asyncio
+    async def test_local_verification_skips_auth_server(self, mock_supabase):
+        mock_supabase.auth.get_user = AsyncMock()
+        token = jwt.encode(_claims(), SECRET, algorithm="HS256")
+
+        user_id = await get_current_user_id(f"Bearer {token}", mock_supabase)
+
+        assert user_id == TEST_USER_ID
+        mock_supabase.auth.get_user.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_invalid_token_is_401_without_fallback(self, mock_supabase):
+        mock_supabase.auth.get_user = AsyncMock()
+        token = jwt.encode(
+            _claims(exp=int(time.time()) - 10), SECRET, algorithm="HS256"
+        )
+
+        with pytest.raises(HTTPException) as exc:
+            await get_current_user_id(f"Bearer {token}", mock_supabase)
+
+        assert exc.value.status_code == 401
+        mock_supabase.auth.get_user.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_auth_server_without_secret(self, mock_supabase):
+        mock_supabase.auth.get_user = AsyncMock(
+            return_value=MagicMock(user=MagicMock(id=TEST_USER_ID))
+        )
+        token = jwt.encode(_claims(), SECRET, algorithm="HS256")
+
+        with patch("app.core.security.settings.supabase_jwt_secret", ""):
+            user_id = await get_current_user_id(f"Bearer {token}", mock_supabase)
+
+        assert user_id == TEST_USER_ID
+        mock_supabase.auth.get_user.assert_awaited_once_with(token)
+
+
+class TestMetricsEndpoint:
+    def test_disabled_without_token(self, client):
+        with patch("app.core.deps.settings.metrics_token", ""):
+            response = client.get("/metrics", headers={"Authorization": "Bearer x"})
+
+        assert response.status_code == 404
+
+    @pytest.mark.parametrize("headers", [{}, {"Authorization": "Bearer wrong"}])
+    def test_rejects_missing_or_wrong_token(self, client, headers):
+        with patch("app.core.deps.settings.metrics_token", "s3cret"):
+            response = client.get("/metrics", headers=headers)
+
+        assert response.status_code == 401
+
+    def test_serves_metrics_with_token(self, client):
+        with patch("app.core.deps.settings.metrics_token", "s3cret"):
+            response = client.get(
+                "/metrics", headers={"Authorization": "Bearer s3cret"}
+            )
+
+        assert response.status_code == 200
+        assert "ingestion_queue_size" in response.json()
@@ -0,0 +1,15 @@
+-- Background ingestion status
+-- Bookmarks are inserted immediately and processed by the backend ingestion
+-- workers (scrape -> summarize -> embed -> categorize). Progress is tracked on
+-- the row so clients can poll the status endpoint or subscribe via Realtime.
+
+ALTER TABLE public.bookmarks
+  ADD COLUMN IF NOT EXISTS processing_status TEXT NOT NULL DEFAULT 'completed'
+    CHECK (processing_status IN ('pending', 'processing', 'completed', 'failed')),
+  -- Per-stage status, e.g. {"scrape": "completed", "embed": "running"}
+  ADD COLUMN IF NOT EXISTS processing_stages JSONB NOT NULL DEFAULT '{}'::jsonb;
+
+-- Index for finding bookmarks that still need processing
+CREATE INDEX IF NOT EXISTS bookmarks_processing_status_idx
+  ON public.bookmarks(processing_status)
+  WHERE processing_status IN ('pending', 'processing');
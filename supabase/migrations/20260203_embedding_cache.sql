@@ -0,0 +1,18 @@
+-- Content-addressed embedding cache
+-- key = sha256(model, dimensions, normalized text). Entries for a previous
+-- model are never hit again and are purged by the backend on startup.
+
+CREATE TABLE IF NOT EXISTS public.embedding_cache (
+  key TEXT PRIMARY KEY,
+  model TEXT NOT NULL,
+  dimensions INT NOT NULL,
+  embedding VECTOR NOT NULL,  -- unconstrained so the dimension setting can change
+  created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Index for purging entries from old models
+CREATE INDEX IF NOT EXISTS embedding_cache_model_idx
+  ON public.embedding_cache(model, dimensions);
+
+-- Only the backend (service role) reads or writes the cache
+ALTER TABLE public.embedding_cache ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,18 @@
+-- One embedding row per bookmark, so embeddings can be bulk-upserted
+-- with ON CONFLICT (bookmark_id).
+
+-- Keep only the newest embedding for bookmarks that have duplicates
+DELETE FROM public.bookmark_embeddings be
+USING public.bookmark_embeddings newer
+WHERE be.bookmark_id = newer.bookmark_id
+  AND (be.created_at, be.id) < (newer.created_at, newer.id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS bookmark_embeddings_bookmark_id_key
+  ON public.bookmark_embeddings(bookmark_id);
+
+-- Keep updated_at current on re-embedding
+DROP TRIGGER IF EXISTS bookmark_embeddings_updated_at ON public.bookmark_embeddings;
+CREATE TRIGGER bookmark_embeddings_updated_at
+  BEFORE UPDATE ON public.bookmark_embeddings
+  FOR EACH ROW
+  EXECUTE FUNCTION public.handle_updated_at();
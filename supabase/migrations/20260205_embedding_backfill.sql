@@ -0,0 +1,30 @@
+-- Shadow embeddings table for zero-downtime re-embedding
+-- The backend dual-writes here when EMBEDDING_SHADOW_TABLE is set, and
+-- `recollect-reembed --table bookmark_embeddings_next` backfills the rest.
+-- The dimension is left unconstrained so a new model/dimension can be staged.
+--
+-- Cutover, once the backfill has finished:
+--   BEGIN;
+--   ALTER TABLE public.bookmark_embeddings RENAME TO bookmark_embeddings_old;
+--   ALTER TABLE public.bookmark_embeddings_next RENAME TO bookmark_embeddings;
+--   COMMIT;
+-- then recreate the HNSW index / search functions for the new dimension.
+
+CREATE TABLE IF NOT EXISTS public.bookmark_embeddings_next (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  bookmark_id UUID REFERENCES bookmarks(id) ON DELETE CASCADE NOT NULL,
+  embedding VECTOR NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS bookmark_embeddings_next_bookmark_id_key
+  ON public.bookmark_embeddings_next(bookmark_id);
+
+DROP TRIGGER IF EXISTS bookmark_embeddings_next_updated_at ON public.bookmark_embeddings_next;
+CREATE TRIGGER bookmark_embeddings_next_updated_at
+  BEFORE UPDATE ON public.bookmark_embeddings_next
+  FOR EACH ROW
+  EXECUTE FUNCTION public.handle_updated_at();
+
+ALTER TABLE public.bookmark_embeddings_next ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,47 @@
+-- Set-based category assignment: upsert every category name and sync the
+-- bookmark's links in a single round trip (replaces one SELECT/INSERT per
+-- category plus one link INSERT per category).
+
+CREATE OR REPLACE FUNCTION public.assign_bookmark_categories(
+  p_bookmark_id UUID,
+  p_user_id UUID,
+  p_names TEXT[],
+  p_replace BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (category_id UUID, name TEXT)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_ids UUID[];
+BEGIN
+  -- Upsert on categories_user_name_unique. The no-op DO UPDATE makes
+  -- RETURNING include categories that already existed.
+  WITH names AS (
+    SELECT DISTINCT lower(btrim(n)) AS name
+    FROM unnest(p_names) n
+    WHERE btrim(n) <> ''
+  ),
+  upserted AS (
+    INSERT INTO public.categories (user_id, name, type)
+    SELECT p_user_id, names.name, 'ai' FROM names
+    ON CONFLICT (user_id, name) DO UPDATE SET name = EXCLUDED.name
+    RETURNING categories.id
+  )
+  SELECT COALESCE(array_agg(upserted.id), '{}') INTO v_ids FROM upserted;
+
+  -- Diff against existing links: drop only the links that went away...
+  IF p_replace THEN
+    DELETE FROM public.bookmark_categories bc
+    WHERE bc.bookmark_id = p_bookmark_id
+      AND NOT (bc.category_id = ANY (v_ids));
+  END IF;
+
+  -- ...and add only the links that are new
+  INSERT INTO public.bookmark_categories (bookmark_id, category_id)
+  SELECT p_bookmark_id, unnest(v_ids)
+  ON CONFLICT (bookmark_id, category_id) DO NOTHING;
+
+  RETURN QUERY
+    SELECT c.id, c.name FROM public.categories c WHERE c.id = ANY (v_ids);
+END;
+$$;
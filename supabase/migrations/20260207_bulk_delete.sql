@@ -0,0 +1,32 @@
+-- Set-based bookmark deletion. bookmark_embeddings, bookmark_categories and
+-- archived_content all reference bookmarks ON DELETE CASCADE, so a single
+-- DELETE removes everything that belongs to the matched bookmarks.
+
+-- Filters are ANDed; NULL means "don't filter on this".
+CREATE OR REPLACE FUNCTION public.delete_bookmarks(
+  p_user_id UUID,
+  p_ids UUID[] DEFAULT NULL,
+  p_category_id UUID DEFAULT NULL,
+  p_is_dead BOOLEAN DEFAULT NULL,
+  p_older_than TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS INTEGER
+LANGUAGE SQL
+AS $$
+  WITH deleted AS (
+    DELETE FROM public.bookmarks b
+    WHERE b.user_id = p_user_id
+      AND (p_ids IS NULL OR b.id = ANY (p_ids))
+      AND (p_category_id IS NULL OR EXISTS (
+        SELECT 1 FROM public.bookmark_categories bc
+        WHERE bc.bookmark_id = b.id AND bc.category_id = p_category_id
+      ))
+      AND (p_is_dead IS NULL OR b.is_dead = p_is_dead)
+      AND (p_older_than IS NULL OR b.created_at < p_older_than)
+      -- Never delete a whole library by accident
+      AND (p_ids IS NOT NULL OR p_category_id IS NOT NULL
+           OR p_is_dead IS NOT NULL OR p_older_than IS NOT NULL)
+    RETURNING 1
+  )
+  SELECT COUNT(*)::INTEGER FROM deleted;
+$$;
@@ -0,0 +1,5 @@
+-- Keyset pagination for the bookmark list: pages are read newest-first by
+-- (created_at, id) and continue with "(created_at, id) < cursor", which this
+-- index answers with a range scan regardless of how deep the page is.
+CREATE INDEX IF NOT EXISTS bookmarks_user_created_id_idx
+  ON public.bookmarks(user_id, created_at DESC, id DESC);
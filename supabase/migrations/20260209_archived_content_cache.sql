@@ -0,0 +1,24 @@
+-- Raw page archive. Each scrape stores the gzipped HTML next to the
+-- extracted text, plus the response's cache validators. Re-scrapes can then
+-- send If-None-Match / If-Modified-Since and skip all work on a 304, and
+-- bookmarks can be re-extracted or re-embedded from the archive offline.
+
+-- One archive row per bookmark, so scrapes can upsert on bookmark_id
+DELETE FROM public.archived_content ac
+USING public.archived_content newer
+WHERE ac.bookmark_id = newer.bookmark_id
+  AND (ac.archived_at, ac.id) < (newer.archived_at, newer.id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS archived_content_bookmark_id_key
+  ON public.archived_content(bookmark_id);
+
+ALTER TABLE public.archived_content
+  ADD COLUMN IF NOT EXISTS html_compressed BYTEA,  -- gzip of the UTF-8 HTML
+  ADD COLUMN IF NOT EXISTS content_type TEXT,
+  ADD COLUMN IF NOT EXISTS etag TEXT,
+  ADD COLUMN IF NOT EXISTS last_modified TEXT,     -- verbatim Last-Modified header
+  ADD COLUMN IF NOT EXISTS checked_at TIMESTAMPTZ DEFAULT NOW();
+
+-- Raw HTML is stored compressed; the old uncompressed column stays for
+-- existing rows but is no longer written.
+COMMENT ON COLUMN public.archived_content.html_content IS 'Deprecated: see html_compressed';
@@ -0,0 +1,22 @@
+-- Dead-link checker: pick stale links cheaply and write results in bulk.
+
+-- Never-checked links first, then the oldest checks
+CREATE INDEX IF NOT EXISTS bookmarks_last_checked_at_idx
+  ON public.bookmarks(last_checked_at NULLS FIRST);
+
+-- p_results: [{"id": uuid, "is_dead": bool, "checked_at": timestamptz}, ...]
+-- A whole batch is applied with one UPDATE ... FROM.
+CREATE OR REPLACE FUNCTION public.record_link_checks(p_results JSONB)
+RETURNS INTEGER
+LANGUAGE SQL
+AS $$
+  WITH updated AS (
+    UPDATE public.bookmarks b
+    SET is_dead = r.is_dead,
+        last_checked_at = r.checked_at
+    FROM jsonb_to_recordset(p_results) AS r(id UUID, is_dead BOOLEAN, checked_at TIMESTAMPTZ)
+    WHERE b.id = r.id
+    RETURNING 1
+  )
+  SELECT COUNT(*)::INTEGER FROM updated;
+$$;
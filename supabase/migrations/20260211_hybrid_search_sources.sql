@@ -0,0 +1,45 @@
+-- Hybrid search sources
+-- HYBRID mode now runs search_bookmarks and search_by_categories as separate,
+-- concurrently executed queries (each with its own match_count budget) and
+-- fuses them in the backend (app/services/fusion.py). search_bookmarks has
+-- to return the same display columns as search_by_categories for that.
+--
+-- hybrid_search_bookmarks is no longer called by the backend; it is left in
+-- place for existing clients.
+
+-- The return type changes, so the function has to be dropped first
+DROP FUNCTION IF EXISTS public.search_bookmarks(VECTOR(1536), FLOAT, INT, UUID);
+CREATE OR REPLACE FUNCTION public.search_bookmarks(
+  query_embedding VECTOR(1536),
+  match_threshold FLOAT DEFAULT 0.7,
+  match_count INT DEFAULT 10,
+  p_user_id UUID DEFAULT auth.uid()
+)
+RETURNS TABLE (
+  id UUID,
+  url TEXT,
+  title TEXT,
+  description TEXT,
+  summary TEXT,
+  favicon_url TEXT,
+  created_at TIMESTAMPTZ,
+  similarity FLOAT
+)
+LANGUAGE SQL STABLE
+AS $$
+  SELECT
+    b.id,
+    b.url,
+    b.title,
+    b.description,
+    b.summary,
+    b.favicon_url,
+    b.created_at,
+    1 - (be.embedding <=> query_embedding) AS similarity
+  FROM public.bookmarks b
+  INNER JOIN public.bookmark_embeddings be ON be.bookmark_id = b.id
+  WHERE b.user_id = p_user_id
+    AND 1 - (be.embedding <=> query_embedding) > match_threshold
+  ORDER BY be.embedding <=> query_embedding
+  LIMIT match_count;
+$$;
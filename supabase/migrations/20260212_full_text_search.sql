@@ -0,0 +1,106 @@
+-- Full-text search over bookmarks.search_vector
+-- The column has been in the schema since the start but nothing filled it.
+-- A trigger now keeps it in sync with the text columns, weighted so a term in
+-- the title counts for more than one buried in the page content:
+--   A: title   B: description   C: summary   D: content
+-- and a GIN index lets search_bookmarks_text() find matches without reading
+-- any text. The backend uses it as a ranked source in KEYWORD and HYBRID
+-- search (SEARCH_FULL_TEXT), fused with the category and semantic sources.
+
+CREATE OR REPLACE FUNCTION public.bookmarks_search_vector(
+  p_title TEXT,
+  p_description TEXT,
+  p_summary TEXT,
+  p_content TEXT
+)
+RETURNS TSVECTOR
+LANGUAGE SQL IMMUTABLE
+AS $$
+  SELECT
+    setweight(to_tsvector('english', COALESCE(p_title, '')), 'A') ||
+    setweight(to_tsvector('english', COALESCE(p_description, '')), 'B') ||
+    setweight(to_tsvector('english', COALESCE(p_summary, '')), 'C') ||
+    setweight(to_tsvector('english', COALESCE(p_content, '')), 'D');
+$$;
+
+CREATE OR REPLACE FUNCTION public.bookmarks_search_vector_update()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.search_vector := public.bookmarks_search_vector(
+    NEW.title, NEW.description, NEW.summary, NEW.content
+  );
+  RETURN NEW;
+END;
+$$;
+
+-- Only fires when a text column is written, so status/visit updates don't
+-- pay for re-parsing the content
+DROP TRIGGER IF EXISTS bookmarks_search_vector_update ON public.bookmarks;
+CREATE TRIGGER bookmarks_search_vector_update
+  BEFORE INSERT OR UPDATE OF title, description, summary, content ON public.bookmarks
+  FOR EACH ROW
+  EXECUTE FUNCTION public.bookmarks_search_vector_update();
+
+-- Backfill existing rows. bookmarks_updated_at sets updated_at = NOW() on
+-- every UPDATE, which would wipe real modification times (and make ingestion
+-- recovery, which filters on updated_at, see every row as fresh), so it is
+-- switched off for the backfill; ALTER TABLE is transactional, so a failure
+-- leaves it enabled. On a large table run this in batches instead, e.g.
+--   UPDATE public.bookmarks SET search_vector = public.bookmarks_search_vector(
+--     title, description, summary, content)
+--   WHERE id IN (SELECT id FROM public.bookmarks WHERE search_vector IS NULL LIMIT 5000);
+-- with the same DISABLE/ENABLE around each batch.
+ALTER TABLE public.bookmarks DISABLE TRIGGER bookmarks_updated_at;
+
+UPDATE public.bookmarks
+SET search_vector = public.bookmarks_search_vector(title, description, summary, content)
+WHERE search_vector IS NULL;
+
+ALTER TABLE public.bookmarks ENABLE TRIGGER bookmarks_updated_at;
+
+CREATE INDEX IF NOT EXISTS bookmarks_search_vector_idx
+  ON public.bookmarks USING GIN (search_vector);
+
+-- Full-text source: bookmarks matching any of the query's terms, ranked by
+-- ts_rank_cd (cover density, so terms close together rank higher; the 32
+-- flag scales it into [0, 1)). plainto_tsquery does the parsing/stemming and
+-- its AND is turned into OR so a partial match still comes back, ranked lower.
+CREATE OR REPLACE FUNCTION public.search_bookmarks_text(
+  query_text TEXT,
+  p_user_id UUID,
+  match_count INT DEFAULT 20
+)
+RETURNS TABLE (
+  id UUID,
+  url TEXT,
+  title TEXT,
+  description TEXT,
+  summary TEXT,
+  favicon_url TEXT,
+  created_at TIMESTAMPTZ,
+  text_score FLOAT
+)
+LANGUAGE SQL STABLE
+AS $$
+  WITH q AS (
+    SELECT NULLIF(
+      replace(plainto_tsquery('english', query_text)::TEXT, ' & ', ' | '), ''
+    )::TSQUERY AS query
+  )
+  SELECT
+    b.id,
+    b.url,
+    b.title,
+    b.description,
+    b.summary,
+    b.favicon_url,
+    b.created_at,
+    ts_rank_cd(b.search_vector, q.query, 32)::FLOAT AS text_score
+  FROM public.bookmarks b, q
+  WHERE b.search_vector @@ q.query
+    AND b.user_id = p_user_id
+  ORDER BY text_score DESC
+  LIMIT match_count;
+$$;
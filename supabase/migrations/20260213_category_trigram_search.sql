@@ -0,0 +1,179 @@
+-- Trigram-indexed category matching
+-- search_by_categories / hybrid_search_bookmarks matched categories with
+--   WHERE c.user_id = p_user_id
+--     AND EXISTS (SELECT 1 FROM unnest(query_terms) qt WHERE c.name ILIKE '%' || qt || '%')
+-- plus the same correlated unnest again to count matches: every category the
+-- user has is read and each term is tested against it twice. A leading
+-- wildcard can't use a B-tree, so nothing better was possible.
+--
+-- With a pg_trgm GIN index the match stage becomes a join from the (distinct)
+-- query terms to categories: each term is one index probe, and only the
+-- categories it hits are read. The match count per category is the number of
+-- terms that joined to it. Terms shorter than 3 characters have no trigrams
+-- and fall back to checking the user's rows, as before.
+--
+-- See 20260214_category_search_benchmark.sql for before/after plans.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public;
+-- btree_gin lets user_id sit in the same GIN index as the trigrams, so one
+-- index scan answers "this user's categories containing this term"
+CREATE EXTENSION IF NOT EXISTS btree_gin WITH SCHEMA public;
+
+CREATE INDEX IF NOT EXISTS categories_user_name_trgm_idx
+  ON public.categories USING GIN (user_id, name gin_trgm_ops);
+
+CREATE OR REPLACE FUNCTION public.search_by_categories(
+  query_terms TEXT[],
+  p_user_id UUID,
+  match_count INT DEFAULT 20
+)
+RETURNS TABLE (
+  id UUID,
+  url TEXT,
+  title TEXT,
+  description TEXT,
+  summary TEXT,
+  favicon_url TEXT,
+  created_at TIMESTAMPTZ,
+  category_score FLOAT,
+  matched_categories TEXT[]
+)
+LANGUAGE SQL STABLE
+AS $$
+  WITH terms AS (
+    SELECT DISTINCT qt AS term
+    FROM unnest(query_terms) qt
+    WHERE qt <> ''
+  ),
+  category_matches AS (
+    -- One index probe per term; match_count = number of terms matched
+    SELECT
+      c.id AS category_id,
+      c.name AS category_name,
+      COUNT(*)::FLOAT AS match_count
+    FROM terms t
+    INNER JOIN public.categories c
+      ON c.user_id = p_user_id
+     AND c.name ILIKE '%' || t.term || '%'
+    GROUP BY c.id, c.name
+  ),
+  bookmark_category_scores AS (
+    -- Aggregate category matches per bookmark
+    SELECT
+      bc.bookmark_id,
+      SUM(cm.match_count) AS category_score,
+      ARRAY_AGG(DISTINCT cm.category_name) AS matched_categories
+    FROM public.bookmark_categories bc
+    INNER JOIN category_matches cm ON cm.category_id = bc.category_id
+    GROUP BY bc.bookmark_id
+  )
+  SELECT
+    b.id,
+    b.url,
+    b.title,
+    b.description,
+    b.summary,
+    b.favicon_url,
+    b.created_at,
+    bcs.category_score,
+    bcs.matched_categories
+  FROM public.bookmarks b
+  INNER JOIN bookmark_category_scores bcs ON bcs.bookmark_id = b.id
+  WHERE b.user_id = p_user_id
+  ORDER BY bcs.category_score DESC
+  LIMIT match_count;
+$$;
+
+-- No longer called by the backend (see 20260211_hybrid_search_sources.sql),
+-- but kept consistent for existing clients: same category stage as above.
+CREATE OR REPLACE FUNCTION public.hybrid_search_bookmarks(
+  query_embedding VECTOR(1536),
+  query_terms TEXT[],
+  p_user_id UUID,
+  semantic_threshold FLOAT DEFAULT 0.5,
+  match_count INT DEFAULT 20,
+  rrf_k INT DEFAULT 60
+)
+RETURNS TABLE (
+  id UUID,
+  url TEXT,
+  title TEXT,
+  description TEXT,
+  summary TEXT,
+  favicon_url TEXT,
+  created_at TIMESTAMPTZ,
+  semantic_score FLOAT,
+  category_score FLOAT,
+  rrf_score FLOAT,
+  matched_categories TEXT[]
+)
+LANGUAGE SQL STABLE
+AS $$
+  WITH semantic_results AS (
+    SELECT
+      b.id AS bookmark_id,
+      1 - (be.embedding <=> query_embedding) AS similarity,
+      ROW_NUMBER() OVER (ORDER BY be.embedding <=> query_embedding) AS semantic_rank
+    FROM public.bookmarks b
+    INNER JOIN public.bookmark_embeddings be ON be.bookmark_id = b.id
+    WHERE b.user_id = p_user_id
+      AND 1 - (be.embedding <=> query_embedding) > semantic_threshold
+    ORDER BY be.embedding <=> query_embedding
+    LIMIT match_count * 2
+  ),
+  terms AS (
+    SELECT DISTINCT qt AS term
+    FROM unnest(query_terms) qt
+    WHERE qt <> ''
+  ),
+  category_matches AS (
+    SELECT
+      c.id AS category_id,
+      c.name AS category_name,
+      COUNT(*)::FLOAT AS match_count
+    FROM terms t
+    INNER JOIN public.categories c
+      ON c.user_id = p_user_id
+     AND c.name ILIKE '%' || t.term || '%'
+    GROUP BY c.id, c.name
+  ),
+  category_results AS (
+    SELECT
+      bc.bookmark_id,
+      SUM(cm.match_count) AS cat_score,
+      ARRAY_AGG(DISTINCT cm.category_name) AS matched_cats,
+      ROW_NUMBER() OVER (ORDER BY SUM(cm.match_count) DESC) AS category_rank
+    FROM public.bookmark_categories bc
+    INNER JOIN category_matches cm ON cm.category_id = bc.category_id
+    INNER JOIN public.bookmarks b ON b.id = bc.bookmark_id
+    WHERE b.user_id = p_user_id
+    GROUP BY bc.bookmark_id
+  ),
+  combined_results AS (
+    SELECT
+      COALESCE(sr.bookmark_id, cr.bookmark_id) AS bookmark_id,
+      COALESCE(sr.similarity, 0) AS semantic_score,
+      COALESCE(cr.cat_score, 0) AS category_score,
+      COALESCE(cr.matched_cats, ARRAY[]::TEXT[]) AS matched_categories,
+      COALESCE(1.0 / (rrf_k + sr.semantic_rank), 0) +
+      COALESCE(1.0 / (rrf_k + cr.category_rank), 0) AS rrf_score
+    FROM semantic_results sr
+    FULL OUTER JOIN category_results cr ON sr.bookmark_id = cr.bookmark_id
+  )
+  SELECT
+    b.id,
+    b.url,
+    b.title,
+    b.description,
+    b.summary,
+    b.favicon_url,
+    b.created_at,
+    cr.semantic_score,
+    cr.category_score,
+    cr.rrf_score,
+    cr.matched_categories
+  FROM combined_results cr
+  INNER JOIN public.bookmarks b ON b.id = cr.bookmark_id
+  ORDER BY cr.rrf_score DESC
+  LIMIT match_count;
+$$;
@@ -0,0 +1,119 @@
+-- Benchmark for category matching (see 20260213_category_trigram_search.sql)
+-- Nothing runs on migrate; this only installs the function. Run it by hand:
+--
+--   SELECT * FROM public.benchmark_category_search();             -- 10k categories
+--   SELECT * FROM public.benchmark_category_search(50000, 20000);
+--
+-- It seeds a throwaway user with p_categories categories and p_bookmarks
+-- bookmarks (5 categories each), prints EXPLAIN ANALYZE for
+--   1. the old category-match stage (correlated unnest, run twice per row)
+--   2. the new one (term -> categories join on the trigram index)
+--   3. search_by_categories() end to end
+-- and then rolls all of the seed data back, so it is safe on a real database
+-- (it does take write locks on the tables it seeds for the duration).
+
+CREATE OR REPLACE FUNCTION public.benchmark_category_search(
+  p_categories INT DEFAULT 10000,
+  p_bookmarks INT DEFAULT 5000,
+  p_terms TEXT[] DEFAULT ARRAY['python', 'data', 'ml']
+)
+RETURNS SETOF TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_user UUID := gen_random_uuid();
+  v_words TEXT[] := ARRAY[
+    'python', 'rust', 'postgres', 'data', 'design', 'cooking', 'travel',
+    'finance', 'ml', 'security', 'music', 'history', 'health', 'devops'
+  ];
+  v_out TEXT[] := '{}';
+  v_line TEXT;
+BEGIN
+  BEGIN
+    INSERT INTO auth.users (id, email)
+    VALUES (v_user, v_user::TEXT || '@benchmark.invalid');
+
+    INSERT INTO public.categories (user_id, name, type)
+    SELECT
+      v_user,
+      v_words[1 + i % array_length(v_words, 1)] || '-'
+        || v_words[1 + (i / 7) % array_length(v_words, 1)] || '-' || i,
+      'ai'
+    FROM generate_series(1, p_categories) i;
+
+    INSERT INTO public.bookmarks (user_id, url, title)
+    SELECT v_user, 'https://benchmark.invalid/' || i, 'Bookmark ' || i
+    FROM generate_series(1, p_bookmarks) i;
+
+    INSERT INTO public.bookmark_categories (bookmark_id, category_id)
+    SELECT DISTINCT b.id, c.id
+    FROM (
+      SELECT id, row_number() OVER () AS n
+      FROM public.bookmarks WHERE user_id = v_user
+    ) b
+    CROSS JOIN generate_series(0, 4) k
+    INNER JOIN (
+      SELECT id, row_number() OVER () AS n
+      FROM public.categories WHERE user_id = v_user
+    ) c ON c.n = 1 + (b.n * 5 + k * 7919) % p_categories;
+
+    ANALYZE public.categories;
+    ANALYZE public.bookmark_categories;
+    ANALYZE public.bookmarks;
+
+    v_out := v_out || format(
+      '-- %s categories, %s bookmarks, terms %s', p_categories, p_bookmarks, p_terms
+    );
+
+    v_out := v_out || '-- 1. old category match (correlated unnest)'::TEXT;
+    FOR v_line IN EXECUTE format($q$
+      EXPLAIN (ANALYZE, BUFFERS)
+      SELECT
+        c.id,
+        (SELECT COUNT(*) FROM unnest(%1$L::TEXT[]) qt WHERE c.name ILIKE '%%' || qt || '%%')::FLOAT
+      FROM public.categories c
+      WHERE c.user_id = %2$L
+        AND EXISTS (
+          SELECT 1 FROM unnest(%1$L::TEXT[]) qt WHERE c.name ILIKE '%%' || qt || '%%'
+        )
+    $q$, p_terms, v_user)
+    LOOP
+      v_out := v_out || v_line;
+    END LOOP;
+
+    v_out := v_out || '-- 2. new category match (trigram index join)'::TEXT;
+    FOR v_line IN EXECUTE format($q$
+      EXPLAIN (ANALYZE, BUFFERS)
+      SELECT c.id, COUNT(*)::FLOAT
+      FROM (SELECT DISTINCT qt AS term FROM unnest(%1$L::TEXT[]) qt WHERE qt <> '') t
+      INNER JOIN public.categories c
+        ON c.user_id = %2$L
+       AND c.name ILIKE '%%' || t.term || '%%'
+      GROUP BY c.id
+    $q$, p_terms, v_user)
+    LOOP
+      v_out := v_out || v_line;
+    END LOOP;
+
+    v_out := v_out || '-- 3. search_by_categories()'::TEXT;
+    FOR v_line IN EXECUTE format(
+      'EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM public.search_by_categories(%L, %L, 20)',
+      p_terms, v_user
+    )
+    LOOP
+      v_out := v_out || v_line;
+    END LOOP;
+
+    -- Undo the seed data; v_out survives since it's a variable
+    RAISE EXCEPTION USING ERRCODE = 'RCBNR', MESSAGE = 'benchmark rollback';
+  EXCEPTION
+    WHEN SQLSTATE 'RCBNR' THEN NULL;
+  END;
+
+  RETURN QUERY SELECT unnest(v_out);
+END;
+$$;
+
+-- Seeds auth.users; not for API roles
+REVOKE ALL ON FUNCTION public.benchmark_category_search(INT, INT, TEXT[])
+  FROM PUBLIC, anon, authenticated;
@@ -0,0 +1,237 @@
+-- Per-user ANN search on bookmark_embeddings
+-- The HNSW index is global, but every search is for one user. Filtering on
+-- b.user_id through a join to bookmarks left the planner two bad options:
+-- read all of the user's embeddings (ignoring the index), or walk the index
+-- and post-filter, which returns too few rows once the user's bookmarks are
+-- a small share of the table (ef_search candidates, most of them other
+-- users'). And `1 - distance > threshold` is an expression the index can't
+-- order by, evaluated on every candidate.
+--
+-- Now:
+-- - user_id lives on bookmark_embeddings itself (kept in sync by a trigger,
+--   so writers don't change), with its own index, so the planner can
+--   estimate a user's share and choose between an exact per-user scan and
+--   the HNSW index;
+-- - the HNSW path uses pgvector's iterative index scans (0.8+): when the
+--   user filter discards candidates the scan keeps going instead of
+--   returning short, and ef_search is set per query (EF_SEARCH);
+-- - the threshold is a distance bound applied to the nearest match_count
+--   rows, the pattern pgvector recommends for filtered ANN.
+--
+-- Requires pgvector 0.8.0 or later.
+
+ALTER EXTENSION vector UPDATE;
+
+ALTER TABLE public.bookmark_embeddings ADD COLUMN IF NOT EXISTS user_id UUID;
+
+UPDATE public.bookmark_embeddings be
+SET user_id = b.user_id
+FROM public.bookmarks b
+WHERE b.id = be.bookmark_id
+  AND be.user_id IS NULL;
+
+-- Orphans can't be searched anyway (bookmark_id is ON DELETE CASCADE)
+DELETE FROM public.bookmark_embeddings WHERE user_id IS NULL;
+
+ALTER TABLE public.bookmark_embeddings ALTER COLUMN user_id SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS bookmark_embeddings_user_id_idx
+  ON public.bookmark_embeddings(user_id);
+
+-- Writers only send (bookmark_id, embedding); copy the owner from the bookmark
+CREATE OR REPLACE FUNCTION public.bookmark_embeddings_set_user_id()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  SELECT b.user_id INTO NEW.user_id
+  FROM public.bookmarks b
+  WHERE b.id = NEW.bookmark_id;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS bookmark_embeddings_set_user_id ON public.bookmark_embeddings;
+CREATE TRIGGER bookmark_embeddings_set_user_id
+  BEFORE INSERT OR UPDATE OF bookmark_id ON public.bookmark_embeddings
+  FOR EACH ROW
+  EXECUTE FUNCTION public.bookmark_embeddings_set_user_id();
+
+-- Same for the re-embedding shadow table, so it has the column at cutover
+ALTER TABLE public.bookmark_embeddings_next ADD COLUMN IF NOT EXISTS user_id UUID;
+
+UPDATE public.bookmark_embeddings_next be
+SET user_id = b.user_id
+FROM public.bookmarks b
+WHERE b.id = be.bookmark_id
+  AND be.user_id IS NULL;
+
+DELETE FROM public.bookmark_embeddings_next WHERE user_id IS NULL;
+
+ALTER TABLE public.bookmark_embeddings_next ALTER COLUMN user_id SET NOT NULL;
+
+DROP TRIGGER IF EXISTS bookmark_embeddings_next_set_user_id ON public.bookmark_embeddings_next;
+CREATE TRIGGER bookmark_embeddings_next_set_user_id
+  BEFORE INSERT OR UPDATE OF bookmark_id ON public.bookmark_embeddings_next
+  FOR EACH ROW
+  EXECUTE FUNCTION public.bookmark_embeddings_set_user_id();
+
+-- Semantic search. The inner query is the ANN part: filter on the
+-- embedding's own user_id, order by distance, take match_count. It's
+-- MATERIALIZED so the distance bound is applied to its result rather than
+-- pushed into the index scan. relaxed_order can return rows slightly out of
+-- order, hence the outer ORDER BY.
+DROP FUNCTION IF EXISTS public.search_bookmarks(VECTOR(1536), FLOAT, INT, UUID);
+CREATE OR REPLACE FUNCTION public.search_bookmarks(
+  query_embedding VECTOR(1536),
+  match_threshold FLOAT DEFAULT 0.7,
+  match_count INT DEFAULT 10,
+  p_user_id UUID DEFAULT auth.uid(),
+  ef_search INT DEFAULT 100
+)
+RETURNS TABLE (
+  id UUID,
+  url TEXT,
+  title TEXT,
+  description TEXT,
+  summary TEXT,
+  favicon_url TEXT,
+  created_at TIMESTAMPTZ,
+  similarity FLOAT
+)
+LANGUAGE plpgsql STABLE
+SET hnsw.iterative_scan = 'relaxed_order'
+AS $$
+BEGIN
+  -- Local to the transaction PostgREST runs this call in; hnsw.ef_search
+  -- accepts at most 1000
+  PERFORM set_config(
+    'hnsw.ef_search', LEAST(GREATEST(ef_search, match_count), 1000)::TEXT, TRUE
+  );
+
+  RETURN QUERY
+  WITH nearest AS MATERIALIZED (
+    SELECT
+      be.bookmark_id,
+      be.embedding <=> query_embedding AS distance
+    FROM public.bookmark_embeddings be
+    WHERE be.user_id = p_user_id
+    ORDER BY be.embedding <=> query_embedding
+    LIMIT match_count
+  )
+  SELECT
+    b.id,
+    b.url,
+    b.title,
+    b.description,
+    b.summary,
+    b.favicon_url,
+    b.created_at,
+    (1 - n.distance)::FLOAT AS similarity
+  FROM nearest n
+  INNER JOIN public.bookmarks b ON b.id = n.bookmark_id
+  -- similarity > match_threshold, as a bound on the distance itself
+  WHERE n.distance < 1 - match_threshold
+  ORDER BY n.distance;
+END;
+$$;
+
+-- hybrid_search_bookmarks (kept for existing clients) gets the same
+-- semantic stage, with the default ef_search
+CREATE OR REPLACE FUNCTION public.hybrid_search_bookmarks(
+  query_embedding VECTOR(1536),
+  query_terms TEXT[],
+  p_user_id UUID,
+  semantic_threshold FLOAT DEFAULT 0.5,
+  match_count INT DEFAULT 20,
+  rrf_k INT DEFAULT 60
+)
+RETURNS TABLE (
+  id UUID,
+  url TEXT,
+  title TEXT,
+  description TEXT,
+  summary TEXT,
+  favicon_url TEXT,
+  created_at TIMESTAMPTZ,
+  semantic_score FLOAT,
+  category_score FLOAT,
+  rrf_score FLOAT,
+  matched_categories TEXT[]
+)
+LANGUAGE SQL STABLE
+SET hnsw.iterative_scan = 'relaxed_order'
+AS $$
+  WITH nearest AS MATERIALIZED (
+    SELECT
+      be.bookmark_id,
+      be.embedding <=> query_embedding AS distance
+    FROM public.bookmark_embeddings be
+    WHERE be.user_id = p_user_id
+    ORDER BY be.embedding <=> query_embedding
+    LIMIT match_count * 2
+  ),
+  semantic_results AS (
+    SELECT
+      n.bookmark_id,
+      1 - n.distance AS similarity,
+      ROW_NUMBER() OVER (ORDER BY n.distance) AS semantic_rank
+    FROM nearest n
+    WHERE n.distance < 1 - semantic_threshold
+  ),
+  terms AS (
+    SELECT DISTINCT qt AS term
+    FROM unnest(query_terms) qt
+    WHERE qt <> ''
+  ),
+  category_matches AS (
+    SELECT
+      c.id AS category_id,
+      c.name AS category_name,
+      COUNT(*)::FLOAT AS match_count
+    FROM terms t
+    INNER JOIN public.categories c
+      ON c.user_id = p_user_id
+     AND c.name ILIKE '%' || t.term || '%'
+    GROUP BY c.id, c.name
+  ),
+  category_results AS (
+    SELECT
+      bc.bookmark_id,
+      SUM(cm.match_count) AS cat_score,
+      ARRAY_AGG(DISTINCT cm.category_name) AS matched_cats,
+      ROW_NUMBER() OVER (ORDER BY SUM(cm.match_count) DESC) AS category_rank
+    FROM public.bookmark_categories bc
+    INNER JOIN category_matches cm ON cm.category_id = bc.category_id
+    INNER JOIN public.bookmarks b ON b.id = bc.bookmark_id
+    WHERE b.user_id = p_user_id
+    GROUP BY bc.bookmark_id
+  ),
+  combined_results AS (
+    SELECT
+      COALESCE(sr.bookmark_id, cr.bookmark_id) AS bookmark_id,
+      COALESCE(sr.similarity, 0) AS semantic_score,
+      COALESCE(cr.cat_score, 0) AS category_score,
+      COALESCE(cr.matched_cats, ARRAY[]::TEXT[]) AS matched_categories,
+      COALESCE(1.0 / (rrf_k + sr.semantic_rank), 0) +
+      COALESCE(1.0 / (rrf_k + cr.category_rank), 0) AS rrf_score
+    FROM semantic_results sr
+    FULL OUTER JOIN category_results cr ON sr.bookmark_id = cr.bookmark_id
+  )
+  SELECT
+    b.id,
+    b.url,
+    b.title,
+    b.description,
+    b.summary,
+    b.favicon_url,
+    b.created_at,
+    cr.semantic_score,
+    cr.category_score,
+    cr.rrf_score,
+    cr.matched_categories
+  FROM combined_results cr
+  INNER JOIN public.bookmarks b ON b.id = cr.bookmark_id
+  ORDER BY cr.rrf_score DESC
+  LIMIT match_count;
+$$;
@@ -0,0 +1,209 @@
+-- Quantized first-pass search with exact re-ranking
+-- Full VECTOR(1536) rows are 6KB each and the HNSW graph over them has to
+-- stay in memory to be fast. pgvector can index a compressed copy instead:
+--   halfvec: float16, half the size, recall close to the full index
+--   binary:  1 bit per dimension (32x smaller), hamming distance
+-- Both are expression indexes, so there is no extra column to keep in sync
+-- and writers don't change. search_bookmarks_quantized() walks the selected
+-- index for match_count * rerank_factor candidates, then re-ranks those by
+-- exact cosine distance on the stored full vectors (heap reads, no index).
+--
+-- The indexes are opt-in: this migration only installs the functions.
+-- Building an HNSW index over every embedding takes a long time and a lot of
+-- maintenance_work_mem, and each one is another graph to keep in memory, so
+-- build only the one matching EMBEDDING_SEARCH_INDEX (halfvec | binary), by
+-- hand and CONCURRENTLY (which can't run inside a migration's transaction),
+-- before switching the backend to it:
+--
+--   CREATE INDEX CONCURRENTLY IF NOT EXISTS bookmark_embeddings_halfvec_idx
+--     ON public.bookmark_embeddings
+--     USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops)
+--     WITH (m = 16, ef_construction = 64);
+--
+--   CREATE INDEX CONCURRENTLY IF NOT EXISTS bookmark_embeddings_binary_idx
+--     ON public.bookmark_embeddings
+--     USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)
+--     WITH (m = 16, ef_construction = 64);
+--
+-- Without its index a quantized mode still returns correct results, from a
+-- per-user scan. To compare recall and latency on real data (build both
+-- indexes first, then drop the one not chosen):
+--
+--   SELECT * FROM public.benchmark_vector_search('<user uuid>');
+--
+-- Once a quantized mode is in use, bookmark_embeddings_idx (the full HNSW
+-- index) is no longer read by search and can be dropped to free its memory.
+
+-- Same arguments and result as search_bookmarks, plus the index to search
+-- ('full' just calls search_bookmarks) and how many candidates per result
+-- to re-rank.
+CREATE OR REPLACE FUNCTION public.search_bookmarks_quantized(
+  query_embedding VECTOR(1536),
+  match_threshold FLOAT DEFAULT 0.7,
+  match_count INT DEFAULT 10,
+  p_user_id UUID DEFAULT auth.uid(),
+  ef_search INT DEFAULT 100,
+  index_mode TEXT DEFAULT 'halfvec',
+  rerank_factor INT DEFAULT 4
+)
+RETURNS TABLE (
+  id UUID,
+  url TEXT,
+  title TEXT,
+  description TEXT,
+  summary TEXT,
+  favicon_url TEXT,
+  created_at TIMESTAMPTZ,
+  similarity FLOAT
+)
+LANGUAGE plpgsql STABLE
+SET hnsw.iterative_scan = 'relaxed_order'
+AS $$
+DECLARE
+  v_candidates INT := match_count * GREATEST(rerank_factor, 1);
+  v_ids UUID[];
+BEGIN
+  IF index_mode = 'full' THEN
+    RETURN QUERY
+    SELECT * FROM public.search_bookmarks(
+      query_embedding, match_threshold, match_count, p_user_id, ef_search
+    );
+    RETURN;
+  END IF;
+
+  -- hnsw.ef_search accepts at most 1000
+  PERFORM set_config(
+    'hnsw.ef_search', LEAST(GREATEST(ef_search, v_candidates), 1000)::TEXT, TRUE
+  );
+
+  -- First pass on the compressed index
+  IF index_mode = 'halfvec' THEN
+    SELECT array_agg(c.bookmark_id) INTO v_ids
+    FROM (
+      SELECT be.bookmark_id
+      FROM public.bookmark_embeddings be
+      WHERE be.user_id = p_user_id
+      ORDER BY be.embedding::halfvec(1536) <=> query_embedding::halfvec(1536)
+      LIMIT v_candidates
+    ) c;
+  ELSIF index_mode = 'binary' THEN
+    SELECT array_agg(c.bookmark_id) INTO v_ids
+    FROM (
+      SELECT be.bookmark_id
+      FROM public.bookmark_embeddings be
+      WHERE be.user_id = p_user_id
+      ORDER BY binary_quantize(be.embedding)::bit(1536) <~> binary_quantize(query_embedding)
+      LIMIT v_candidates
+    ) c;
+  ELSE
+    RAISE EXCEPTION 'Unknown index_mode: %', index_mode;
+  END IF;
+
+  -- Exact distances on the full vectors, for the candidates only
+  RETURN QUERY
+  WITH reranked AS MATERIALIZED (
+    SELECT
+      be.bookmark_id,
+      be.embedding <=> query_embedding AS distance
+    FROM public.bookmark_embeddings be
+    WHERE be.bookmark_id = ANY (v_ids)
+    ORDER BY distance
+    LIMIT match_count
+  )
+  SELECT
+    b.id,
+    b.url,
+    b.title,
+    b.description,
+    b.summary,
+    b.favicon_url,
+    b.created_at,
+    (1 - r.distance)::FLOAT AS similarity
+  FROM reranked r
+  INNER JOIN public.bookmarks b ON b.id = r.bookmark_id
+  WHERE r.distance < 1 - match_threshold
+  ORDER BY r.distance;
+END;
+$$;
+
+-- Recall@k and latency of each index mode against exact search, on one
+-- user's real embeddings. Query vectors are sampled from that user's own
+-- bookmarks (so each query's own bookmark is in every result list); the
+-- ground truth is a full per-user scan with index scans disabled. Changes no data.
+CREATE OR REPLACE FUNCTION public.benchmark_vector_search(
+  p_user_id UUID,
+  p_queries INT DEFAULT 50,
+  k INT DEFAULT 10,
+  rerank_factor INT DEFAULT 4,
+  ef_search INT DEFAULT 100
+)
+RETURNS TABLE (
+  index_mode TEXT,
+  recall_at_k FLOAT,
+  avg_ms FLOAT,
+  p95_ms FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_query VECTOR(1536);
+  v_exact UUID[];
+  v_found UUID[];
+  v_mode TEXT;
+  v_started TIMESTAMPTZ;
+BEGIN
+  CREATE TEMP TABLE IF NOT EXISTS _benchmark_runs (
+    run_mode TEXT,
+    run_recall FLOAT,
+    run_ms FLOAT
+  ) ON COMMIT DROP;
+  TRUNCATE _benchmark_runs;
+
+  FOR v_query IN
+    SELECT be.embedding
+    FROM public.bookmark_embeddings be
+    WHERE be.user_id = p_user_id
+    ORDER BY random()
+    LIMIT p_queries
+  LOOP
+    SET LOCAL enable_indexscan = off;
+    SELECT array_agg(t.bookmark_id) INTO v_exact
+    FROM (
+      SELECT be.bookmark_id
+      FROM public.bookmark_embeddings be
+      WHERE be.user_id = p_user_id
+      ORDER BY be.embedding <=> v_query
+      LIMIT k
+    ) t;
+    RESET enable_indexscan;
+
+    FOREACH v_mode IN ARRAY ARRAY['full', 'halfvec', 'binary'] LOOP
+      v_started := clock_timestamp();
+      SELECT array_agg(s.id) INTO v_found
+      FROM public.search_bookmarks_quantized(
+        v_query, -1, k, p_user_id, ef_search, v_mode, rerank_factor
+      ) s;
+      INSERT INTO _benchmark_runs VALUES (
+        v_mode,
+        cardinality(ARRAY(
+          SELECT unnest(v_found) INTERSECT SELECT unnest(v_exact)
+        ))::FLOAT / GREATEST(cardinality(v_exact), 1),
+        EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000
+      );
+    END LOOP;
+  END LOOP;
+
+  RETURN QUERY
+  SELECT
+    r.run_mode,
+    avg(r.run_recall)::FLOAT,
+    avg(r.run_ms)::FLOAT,
+    (percentile_cont(0.95) WITHIN GROUP (ORDER BY r.run_ms))::FLOAT
+  FROM _benchmark_runs r
+  GROUP BY r.run_mode
+  ORDER BY array_position(ARRAY['full', 'halfvec', 'binary'], r.run_mode);
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.benchmark_vector_search(UUID, INT, INT, INT, INT)
+  FROM PUBLIC, anon, authenticated;
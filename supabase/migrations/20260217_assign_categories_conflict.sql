@@ -0,0 +1,87 @@
+-- Fix assign_bookmark_categories (20260206_assign_categories.sql)
+-- Its output columns (category_id, name) are plpgsql variables inside the
+-- body, so `ON CONFLICT (user_id, name)` and `ON CONFLICT (bookmark_id,
+-- category_id)` were ambiguous and every call failed with
+--   ERROR: column reference "name" is ambiguous
+-- `#variable_conflict use_column` resolves such names to the table columns;
+-- nothing in the body means the output variables. The arbiters stay column
+-- lists because categories_user_name_unique is a unique index, not a
+-- constraint, so ON CONFLICT ON CONSTRAINT can't name it.
+--
+-- Manual check (seeds a throwaway user, calls the function twice, then rolls
+-- everything back; raises if a result is wrong):
+--
+--   DO $check$
+--   DECLARE
+--     v_user UUID := gen_random_uuid();
+--     v_bookmark UUID;
+--     v_names TEXT[];
+--   BEGIN
+--     INSERT INTO auth.users (id, email)
+--     VALUES (v_user, v_user::TEXT || '@check.invalid');
+--     INSERT INTO public.bookmarks (user_id, url)
+--     VALUES (v_user, 'https://check.invalid/') RETURNING id INTO v_bookmark;
+--
+--     PERFORM public.assign_bookmark_categories(
+--       v_bookmark, v_user, ARRAY['Python', 'data ', 'python']);
+--     SELECT array_agg(r.name ORDER BY r.name) INTO v_names
+--     FROM public.assign_bookmark_categories(
+--       v_bookmark, v_user, ARRAY['data', 'ml'], TRUE) r;
+--     ASSERT v_names = ARRAY['data', 'ml'], format('returned %s', v_names);
+--
+--     SELECT array_agg(c.name ORDER BY c.name) INTO v_names
+--     FROM public.bookmark_categories bc
+--     JOIN public.categories c ON c.id = bc.category_id
+--     WHERE bc.bookmark_id = v_bookmark;
+--     ASSERT v_names = ARRAY['data', 'ml'], format('linked %s', v_names);
+--
+--     RAISE EXCEPTION USING ERRCODE = 'RCCHK', MESSAGE = 'check passed, rolled back';
+--   END
+--   $check$;
+--
+-- Expected: ERROR: check passed, rolled back. Any other error is a failure.
+
+CREATE OR REPLACE FUNCTION public.assign_bookmark_categories(
+  p_bookmark_id UUID,
+  p_user_id UUID,
+  p_names TEXT[],
+  p_replace BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (category_id UUID, name TEXT)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+  v_ids UUID[];
+BEGIN
+  -- Upsert on categories_user_name_unique. The no-op DO UPDATE makes
+  -- RETURNING include categories that already existed.
+  WITH names AS (
+    SELECT DISTINCT lower(btrim(n)) AS name
+    FROM unnest(p_names) n
+    WHERE btrim(n) <> ''
+  ),
+  upserted AS (
+    INSERT INTO public.categories (user_id, name, type)
+    SELECT p_user_id, names.name, 'ai' FROM names
+    ON CONFLICT (user_id, name) DO UPDATE SET name = EXCLUDED.name
+    RETURNING categories.id
+  )
+  SELECT COALESCE(array_agg(upserted.id), '{}') INTO v_ids FROM upserted;
+
+  -- Diff against existing links: drop only the links that went away...
+  IF p_replace THEN
+    DELETE FROM public.bookmark_categories bc
+    WHERE bc.bookmark_id = p_bookmark_id
+      AND NOT (bc.category_id = ANY (v_ids));
+  END IF;
+
+  -- ...and add only the links that are new
+  INSERT INTO public.bookmark_categories (bookmark_id, category_id)
+  SELECT p_bookmark_id, unnest(v_ids)
+  ON CONFLICT (bookmark_id, category_id) DO NOTHING;
+
+  RETURN QUERY
+    SELECT c.id, c.name FROM public.categories c WHERE c.id = ANY (v_ids);
+END;
+$$;
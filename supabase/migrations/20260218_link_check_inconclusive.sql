@@ -0,0 +1,22 @@
+-- Inconclusive link checks keep the stored verdict
+-- The checker sends is_dead = null for probes that say nothing about the page
+-- (timeouts, 429, 5xx). Writing that through as false revived links already
+-- known to be dead whenever their server was slow. Now a null leaves is_dead
+-- as it is and only last_checked_at moves, so the link waits a full
+-- max-age interval before the next probe either way.
+
+-- p_results: [{"id": uuid, "is_dead": bool | null, "checked_at": timestamptz}, ...]
+CREATE OR REPLACE FUNCTION public.record_link_checks(p_results JSONB)
+RETURNS INTEGER
+LANGUAGE SQL
+AS $$
+  WITH updated AS (
+    UPDATE public.bookmarks b
+    SET is_dead = COALESCE(r.is_dead, b.is_dead),
+        last_checked_at = r.checked_at
+    FROM jsonb_to_recordset(p_results) AS r(id UUID, is_dead BOOLEAN, checked_at TIMESTAMPTZ)
+    WHERE b.id = r.id
+    RETURNING 1
+  )
+  SELECT COUNT(*)::INTEGER FROM updated;
+$$;
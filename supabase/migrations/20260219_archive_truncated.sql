@@ -0,0 +1,5 @@
+-- Flag archived pages whose download stopped early (byte cap, or the
+-- extractor had enough text). Such a copy is missing the rest of the page,
+-- so re-extraction from the archive fetches the page again instead.
+ALTER TABLE public.archived_content
+  ADD COLUMN IF NOT EXISTS truncated BOOLEAN NOT NULL DEFAULT FALSE;
@@ -0,0 +1,44 @@
+-- Count unreachable link checks before calling a link dead
+-- A DNS failure or refused connection used to mark a link dead at once, so a
+-- resolver hiccup or an outage on our side flagged every link in the batch.
+-- The checker now sends "unreachable": true for those with is_dead = null;
+-- each one bumps link_check_failures, and only p_dead_after of them in a row
+-- set is_dead. Any conclusive probe resets the count.
+
+ALTER TABLE public.bookmarks
+  ADD COLUMN IF NOT EXISTS link_check_failures INTEGER NOT NULL DEFAULT 0;
+
+-- The new parameter has a default, so the old one-argument signature would
+-- make calls with just p_results ambiguous
+DROP FUNCTION IF EXISTS public.record_link_checks(JSONB);
+
+-- p_results: [{"id": uuid, "is_dead": bool | null, "unreachable": bool,
+--              "checked_at": timestamptz}, ...]
+CREATE OR REPLACE FUNCTION public.record_link_checks(
+  p_results JSONB,
+  p_dead_after INTEGER DEFAULT 2
+)
+RETURNS INTEGER
+LANGUAGE SQL
+AS $$
+  WITH updated AS (
+    UPDATE public.bookmarks b
+    SET is_dead = CASE
+          WHEN COALESCE(r.unreachable, FALSE)
+           AND b.link_check_failures + 1 >= p_dead_after THEN TRUE
+          WHEN COALESCE(r.unreachable, FALSE) THEN b.is_dead
+          ELSE COALESCE(r.is_dead, b.is_dead)
+        END,
+        link_check_failures = CASE
+          WHEN COALESCE(r.unreachable, FALSE) THEN b.link_check_failures + 1
+          WHEN r.is_dead IS NULL THEN b.link_check_failures
+          ELSE 0
+        END,
+        last_checked_at = r.checked_at
+    FROM jsonb_to_recordset(p_results)
+      AS r(id UUID, is_dead BOOLEAN, unreachable BOOLEAN, checked_at TIMESTAMPTZ)
+    WHERE b.id = r.id
+    RETURNING 1
+  )
+  SELECT COUNT(*)::INTEGER FROM updated;
+$$;
@@ -0,0 +1,45 @@
+-- Startup recovery claims unfinished bookmarks instead of just reading them
+-- Every worker process re-queued every pending/processing row on start, so
+-- with several uvicorn workers each bookmark was processed once per worker.
+-- claim_unfinished_bookmarks() stamps ingestion_claimed_at on the rows it
+-- returns (FOR UPDATE SKIP LOCKED, so concurrent callers get disjoint rows)
+-- and skips rows claimed within the last p_lease_seconds.
+--
+-- Recovery also rebuilt the job's user-provided fields from the row, where an
+-- interrupted run may already have written scraped values, so those came
+-- back as overrides. ingestion_input keeps what the user actually sent.
+
+ALTER TABLE public.bookmarks
+  ADD COLUMN IF NOT EXISTS ingestion_input JSONB NOT NULL DEFAULT '{}'::jsonb,
+  ADD COLUMN IF NOT EXISTS ingestion_claimed_at TIMESTAMPTZ;
+
+-- Rows in id order after p_after (keyset pagination across calls)
+CREATE OR REPLACE FUNCTION public.claim_unfinished_bookmarks(
+  p_before TIMESTAMPTZ,
+  p_lease_seconds DOUBLE PRECISION,
+  p_limit INT DEFAULT 500,
+  p_after UUID DEFAULT NULL
+)
+RETURNS TABLE (id UUID, user_id UUID, url TEXT, ingestion_input JSONB)
+LANGUAGE SQL
+AS $$
+  WITH picked AS (
+    SELECT b.id
+    FROM public.bookmarks b
+    WHERE b.processing_status IN ('pending', 'processing')
+      AND b.updated_at < p_before
+      AND (p_after IS NULL OR b.id > p_after)
+      AND (
+        b.ingestion_claimed_at IS NULL
+        OR b.ingestion_claimed_at < NOW() - make_interval(secs => p_lease_seconds)
+      )
+    ORDER BY b.id
+    LIMIT p_limit
+    FOR UPDATE SKIP LOCKED
+  )
+  UPDATE public.bookmarks b
+  SET ingestion_claimed_at = NOW()
+  FROM picked
+  WHERE b.id = picked.id
+  RETURNING b.id, b.user_id, b.url, b.ingestion_input;
+$$;